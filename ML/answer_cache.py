@@ -0,0 +1,16 @@
+# answer_cache.py - Normalized-question keys for cached chatbot answers
+import re
+import unicodedata
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Canonical form of a question: NFC, case-folded, punctuation and symbols
+    (including the Bengali danda) turned into spaces, whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFC", question).casefold()
+    text = "".join(" " if unicodedata.category(ch)[0] in "PSZ" else ch for ch in text)
+    return _SPACES.sub(" ", text).strip()
+
@@ -0,0 +1,185 @@
+# bench_chat.py - Load benchmark for /chat/farmer and /chat/stream
+#
+# Usage (API running against mock_deepseek.py):
+#   python bench_chat.py                                # both endpoints, concurrency 1,4,16,64
+#   python bench_chat.py --endpoint stream --levels 8,32 --requests 200
+#   python bench_chat.py --unique                        # fresh questions, bypasses the answer cache
+#   python bench_chat.py --output bench.json
+#   python bench_chat.py --endpoint disconnect            # clients leaving mid-stream must not leak LLM slots
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+
+QUESTIONS = [
+    "ধান চাষের খরচ কত?",
+    "বোরো ধানের সেরা জাত কোনটি?",
+    "ইউরিয়া সারের দাম কত?",
+    "জৈব সার কিভাবে তৈরি করব?",
+    "বন্যার আগে কী প্রস্তুতি নেব?",
+    "বন্যা সহনশীল ফসল কোনগুলো?",
+    "কৃষি ঋণের সুদ কত?",
+    "গম চাষের সেরা সময় কখন?",
+    "আলু চাষে কোন সার দেব?",
+    "পাট কখন কাটতে হয়?",
+]
+
+
+def question_for(i, unique):
+    question = QUESTIONS[i % len(QUESTIONS)]
+    return f"{question} ({i})" if unique else question
+
+
+async def call_farmer(client, question, session_id):
+    started = time.perf_counter()
+    r = await client.post("/chat/farmer", json={"question": question, "stream": False,
+                                                "session_id": session_id})
+    elapsed = time.perf_counter() - started
+    r.raise_for_status()
+    metadata = r.json().get("response", {}).get("metadata") or {}
+    return {"latency": elapsed, "ttft": elapsed, "cached": bool(metadata.get("cached")),
+            "fallback": metadata.get("model", "JolBondhu_AI") == "JolBondhu_AI"}
+
+
+async def call_stream(client, question, session_id):
+    started = time.perf_counter()
+    ttft = None
+    fallback = True
+    params = {"question": question}
+    if session_id:
+        params["session_id"] = session_id
+    async with client.stream("GET", "/chat/stream", params=params) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            if "content" in event and ttft is None:
+                ttft = time.perf_counter() - started
+            if event.get("usage") is not None:
+                fallback = False   # only relayed DeepSeek streams carry usage
+    elapsed = time.perf_counter() - started
+    return {"latency": elapsed, "ttft": ttft if ttft is not None else elapsed,
+            "cached": False, "fallback": fallback}
+
+
+async def call_disconnect(client, question, session_id):
+    """Open a stream, read the first content event, then drop the connection"""
+    started = time.perf_counter()
+    fallback = True
+    params = {"question": question}
+    if session_id:
+        params["session_id"] = session_id
+    async with client.stream("GET", "/chat/stream", params=params) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if line.startswith("data:") and "content" in json.loads(line[5:]):
+                fallback = False
+                break
+    elapsed = time.perf_counter() - started
+    return {"latency": elapsed, "ttft": elapsed, "cached": False, "fallback": fallback}
+
+
+async def llm_slots_after_disconnects(client, settle_s=2.0):
+    """Active LLM slots once the abandoned streams have had time to clean up (should be 0)"""
+    await asyncio.sleep(settle_s)
+    r = await client.get("/llm/stats")
+    r.raise_for_status()
+    return r.json()["scheduler"]["active"]
+
+
+CALLS = {"farmer": call_farmer, "stream": call_stream, "disconnect": call_disconnect}
+
+
+async def run_level(client, endpoint, concurrency, total, unique, sessions, offset):
+    call = CALLS[endpoint]
+    results, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            session_id = f"bench-{(offset + i) % sessions}" if sessions else None
+            try:
+                results.append(await call(client, question_for(offset + i, unique), session_id))
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    return summarize(endpoint, concurrency, results, errors, wall)
+
+
+def summarize(endpoint, concurrency, results, errors, wall):
+    latency = np.array([r["latency"] for r in results]) * 1000 if results else np.zeros(1)
+    ttft = np.array([r["ttft"] for r in results]) * 1000 if results else np.zeros(1)
+    p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+    t50, t95 = np.percentile(ttft, [50, 95])
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": errors,
+        "throughput_rps": round(len(results) / wall, 2) if wall else 0.0,
+        "latency_ms_p50": round(float(p50), 1),
+        "latency_ms_p95": round(float(p95), 1),
+        "latency_ms_p99": round(float(p99), 1),
+        "ttft_ms_p50": round(float(t50), 1),
+        "ttft_ms_p95": round(float(t95), 1),
+        "cached": sum(r["cached"] for r in results),
+        "fallback": sum(r["fallback"] for r in results),
+    }
+
+
+def print_table(rows):
+    columns = ["endpoint", "concurrency", "requests", "errors", "throughput_rps", "latency_ms_p50",
+               "latency_ms_p95", "latency_ms_p99", "ttft_ms_p50", "ttft_ms_p95", "cached", "fallback"]
+    if any("leaked_slots" in r for r in rows):
+        columns.append("leaked_slots")
+    widths = [max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns]
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).rjust(w) for c, w in zip(columns, widths)))
+
+
+async def main(args):
+    endpoints = ["farmer", "stream", "disconnect"] if args.endpoint == "all" else \
+        ["farmer", "stream"] if args.endpoint == "both" else [args.endpoint]
+    levels = [int(x) for x in args.levels.split(",")]
+    limits = httpx.Limits(max_connections=max(levels) * 2, max_keepalive_connections=max(levels))
+    rows, offset = [], 0
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        for endpoint in endpoints:
+            for concurrency in levels:
+                print(f"▶ {endpoint} at concurrency {concurrency} ({args.requests} requests) ...")
+                rows.append(await run_level(client, endpoint, concurrency, args.requests,
+                                            args.unique, args.sessions, offset))
+                offset += args.requests
+                if endpoint == "disconnect":
+                    rows[-1]["leaked_slots"] = await llm_slots_after_disconnects(client)
+                    if rows[-1]["leaked_slots"]:
+                        print(f"❌ {rows[-1]['leaked_slots']} LLM slots still held after clients disconnected")
+    print()
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat endpoint load benchmark")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=["farmer", "stream", "disconnect", "both", "all"],
+                        default="both", help="both = farmer + stream; all adds disconnect")
+    parser.add_argument("--levels", default="1,4,16,64", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per level")
+    parser.add_argument("--unique", action="store_true", help="make every question unique (no cache hits)")
+    parser.add_argument("--sessions", type=int, default=0, help="spread requests over this many session ids")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="write results as JSON")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,182 @@
+# build_district_boundaries.py - Build bd_districts.geojson for offline reverse geocoding
+#
+# Usage:
+#   python build_district_boundaries.py                      # download geoBoundaries BGD ADM2
+#   python build_district_boundaries.py path/or/url.geojson  # any ADM2 FeatureCollection
+#
+# The committed bd_districts.geojson was built from the OCHA COD-AB ADM2 layer
+# (v03, valid from 2023-05-21; the bgd_admin2.geojson shipped in the MIT-licensed
+# bd-offline-geocoder wheel).
+import json
+import os
+import sys
+import urllib.request
+
+GEOBOUNDARIES_API = "https://www.geoboundaries.org/api/current/gbOpen/BGD/ADM2/"
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bd_districts.geojson")
+COORD_DECIMALS = 4  # ~10 m, plenty for district borders and keeps the file small
+SIMPLIFY_DEG = 0.001  # Douglas-Peucker tolerance, ~100 m
+
+# English spellings used by common boundary datasets -> (district, division) as in BANGLADESH_DISTRICTS
+DISTRICTS = {
+    ("kurigram",): ("কুড়িগ্রাম", "রংপুর"),
+    ("gaibandha",): ("গাইবান্ধা", "রংপুর"),
+    ("lalmonirhat",): ("লালমনিরহাট", "রংপুর"),
+    ("nilphamari", "nilphamari zila"): ("নীলফামারী", "রংপুর"),
+    ("rangpur",): ("রংপুর", "রংপুর"),
+    ("dinajpur",): ("দিনাজপুর", "রংপুর"),
+    ("thakurgaon",): ("ঠাকুরগাঁও", "রংপুর"),
+    ("panchagarh",): ("পঞ্চগড়", "রংপুর"),
+    ("sunamganj",): ("সুনামগঞ্জ", "সিলেট"),
+    ("sylhet",): ("সিলেট", "সিলেট"),
+    ("maulvibazar", "moulvibazar", "maulvi bazar"): ("মৌলভীবাজার", "সিলেট"),
+    ("habiganj",): ("হবিগঞ্জ", "সিলেট"),
+    ("jamalpur",): ("জামালপুর", "ময়মনসিংহ"),
+    ("netrakona", "netrokona"): ("নেত্রকোণা", "ময়মনসিংহ"),
+    ("sherpur",): ("শেরপুর", "ময়মনসিংহ"),
+    ("mymensingh",): ("ময়মনসিংহ", "ময়মনসিংহ"),
+    ("sirajganj",): ("সিরাজগঞ্জ", "রাজশাহী"),
+    ("bogra", "bogura"): ("বগুড়া", "রাজশাহী"),
+    ("pabna",): ("পাবনা", "রাজশাহী"),
+    ("rajshahi",): ("রাজশাহী", "রাজশাহী"),
+    ("natore",): ("নাটোর", "রাজশাহী"),
+    ("naogaon",): ("নওগাঁ", "রাজশাহী"),
+    ("chapai nababganj", "chapainababganj", "chapainawabganj", "nawabganj", "chapai nawabganj"): ("চাঁপাইনবাবগঞ্জ", "রাজশাহী"),
+    ("joypurhat", "jaipurhat"): ("জয়পুরহাট", "রাজশাহী"),
+    ("shariatpur",): ("শরীয়তপুর", "ঢাকা"),
+    ("madaripur",): ("মাদারীপুর", "ঢাকা"),
+    ("munshiganj",): ("মুন্সীগঞ্জ", "ঢাকা"),
+    ("manikganj",): ("মানিকগঞ্জ", "ঢাকা"),
+    ("rajbari",): ("রাজবাড়ী", "ঢাকা"),
+    ("faridpur",): ("ফরিদপুর", "ঢাকা"),
+    ("tangail",): ("টাঙ্গাইল", "ঢাকা"),
+    ("kishoreganj", "kishorganj"): ("কিশোরগঞ্জ", "ঢাকা"),
+    ("gopalganj",): ("গোপালগঞ্জ", "ঢাকা"),
+    ("narsingdi", "narshingdi"): ("নরসিংদী", "ঢাকা"),
+    ("narayanganj",): ("নারায়ণগঞ্জ", "ঢাকা"),
+    ("dhaka",): ("ঢাকা", "ঢাকা"),
+    ("gazipur",): ("গাজীপুর", "ঢাকা"),
+    ("feni",): ("ফেনী", "চট্টগ্রাম"),
+    ("noakhali",): ("নোয়াখালী", "চট্টগ্রাম"),
+    ("lakshmipur", "laxmipur"): ("লক্ষ্মীপুর", "চট্টগ্রাম"),
+    ("chandpur",): ("চাঁদপুর", "চট্টগ্রাম"),
+    ("brahmanbaria", "brahamanbaria"): ("ব্রাহ্মণবাড়িয়া", "চট্টগ্রাম"),
+    ("comilla", "cumilla"): ("কুমিল্লা", "চট্টগ্রাম"),
+    ("chittagong", "chattogram"): ("চট্টগ্রাম", "চট্টগ্রাম"),
+    ("cox's bazar", "coxs bazar", "cox's bazaar"): ("কক্সবাজার", "চট্টগ্রাম"),
+    ("rangamati", "rangamati hill tracts"): ("রাঙ্গামাটি", "চট্টগ্রাম"),
+    ("bandarban",): ("বান্দরবান", "চট্টগ্রাম"),
+    ("khagrachhari", "khagrachari"): ("খাগড়াছড়ি", "চট্টগ্রাম"),
+    ("satkhira",): ("সাতক্ষীরা", "খুলনা"),
+    ("bagerhat",): ("বাগেরহাট", "খুলনা"),
+    ("khulna",): ("খুলনা", "খুলনা"),
+    ("kushtia",): ("কুষ্টিয়া", "খুলনা"),
+    ("narail",): ("নড়াইল", "খুলনা"),
+    ("jessore", "jashore"): ("যশোর", "খুলনা"),
+    ("jhenaidah", "jhenaida"): ("ঝিনাইদহ", "খুলনা"),
+    ("magura",): ("মাগুরা", "খুলনা"),
+    ("chuadanga",): ("চুয়াডাঙ্গা", "খুলনা"),
+    ("meherpur",): ("মেহেরপুর", "খুলনা"),
+    ("bhola",): ("ভোলা", "বরিশাল"),
+    ("barguna",): ("বরগুনা", "বরিশাল"),
+    ("patuakhali",): ("পটুয়াখালী", "বরিশাল"),
+    ("pirojpur",): ("পিরোজপুর", "বরিশাল"),
+    ("barisal", "barishal"): ("বরিশাল", "বরিশাল"),
+    ("jhalokati", "jhalakati", "jhalokathi"): ("ঝালকাঠি", "বরিশাল"),
+}
+ALIASES = {alias: target for aliases, target in DISTRICTS.items() for alias in aliases}
+
+NAME_FIELDS = ("shapeName", "ADM2_EN", "adm2_name", "NAME_2", "name", "district")
+
+
+def load_source(source: str) -> dict:
+    if source.startswith("http"):
+        with urllib.request.urlopen(source, timeout=60) as response:
+            data = json.load(response)
+        # The geoBoundaries API answers with metadata pointing at the actual file
+        if "gjDownloadURL" in data:
+            return load_source(data["gjDownloadURL"])
+        return data
+    with open(source, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def english_name(props: dict) -> str:
+    for field in NAME_FIELDS:
+        if props.get(field):
+            name = str(props[field]).strip().lower()
+            for suffix in (" district", " zila", " zilla"):
+                if name.endswith(suffix):
+                    name = name[: -len(suffix)]
+            return name
+    return ""
+
+
+def simplify_ring(ring: list, tolerance: float) -> list:
+    """Douglas-Peucker on a closed ring; keeps at least a triangle"""
+    if len(ring) <= 4:
+        return ring
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    # A closed ring's end points coincide, so split it at the point farthest from the start
+    far = max(range(len(ring)), key=lambda i: (ring[i][0] - ring[0][0]) ** 2 + (ring[i][1] - ring[0][1]) ** 2)
+    keep[far] = True
+    stack = [(0, far), (far, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        (x0, y0), (x1, y1) = ring[start][:2], ring[end][:2]
+        dx, dy = x1 - x0, y1 - y0
+        norm = (dx * dx + dy * dy) ** 0.5
+        best, best_dist = -1, tolerance
+        for i in range(start + 1, end):
+            x, y = ring[i][:2]
+            dist = abs(dy * (x - x0) - dx * (y - y0)) / norm if norm else ((x - x0) ** 2 + (y - y0) ** 2) ** 0.5
+            if dist > best_dist:
+                best, best_dist = i, dist
+        if best >= 0:
+            keep[best] = True
+            stack.extend(((start, best), (best, end)))
+    simplified = [point for point, kept in zip(ring, keep) if kept]
+    return simplified if len(simplified) >= 4 else ring
+
+
+def clean_coords(coords, depth: int):
+    """Simplify every ring (depth 1 = a ring) and round it to COORD_DECIMALS"""
+    if depth == 1:
+        ring = simplify_ring(coords, SIMPLIFY_DEG)
+        rounded = [[round(x, COORD_DECIMALS), round(y, COORD_DECIMALS)] for x, y, *_ in ring]
+        return [p for i, p in enumerate(rounded) if i == 0 or p != rounded[i - 1]]
+    return [clean_coords(c, depth - 1) for c in coords]
+
+
+def build(source: str, output: str = OUTPUT_PATH):
+    collection = load_source(source)
+    features, unmatched = [], []
+
+    for feature in collection["features"]:
+        name = english_name(feature.get("properties", {}))
+        target = ALIASES.get(name)
+        if target is None:
+            unmatched.append(name)
+            continue
+        geometry = feature["geometry"]
+        features.append({
+            "type": "Feature",
+            "properties": {"name": target[0], "division": target[1], "name_en": name},
+            "geometry": {"type": geometry["type"],
+                         "coordinates": clean_coords(geometry["coordinates"], 2 if geometry["type"] == "Polygon" else 3)},
+        })
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False, separators=(",", ":"))
+
+    missing = sorted({t[0] for t in DISTRICTS.values()} - {f["properties"]["name"] for f in features})
+    print(f"✅ Wrote {len(features)} districts to {output}")
+    if unmatched:
+        print(f"⚠️ Unmatched source names: {unmatched}")
+    if missing:
+        print(f"⚠️ Districts without a boundary: {missing}")
+
+
+if __name__ == "__main__":
+    build(sys.argv[1] if len(sys.argv) > 1 else GEOBOUNDARIES_API)
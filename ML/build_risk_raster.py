@@ -0,0 +1,247 @@
+# build_risk_raster.py - Offline build of risk_raster.npy (zone, river distance, elevation)
+#
+# Usage:
+#   python build_risk_raster.py                 # query Overpass + OpenTopoData
+#   python build_risk_raster.py --res 0.02      # coarser grid
+#   python build_risk_raster.py --rivers overpass_rivers.json   # saved Overpass "out geom" answer
+#   python build_risk_raster.py --rivers gshhg --elevation pvlib  # offline, from pip-installed data
+#
+# The committed risk_raster.npy was built offline: rivers from the GSHHG / WDB II
+# full-resolution river lines (pip install basemap-data-hires) and elevation
+# from the Mapzen terrain map bundled with pvlib (pip install pvlib h5py).
+# WDB II leaves out the lower Padma and the Meghna below Bhairab, so river
+# distances along them are overstated; rebuild from Overpass when it is reachable.
+import argparse
+import importlib.util
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from risk_raster import RiskRaster, LAYERS
+from spatial import HaversineIndex
+
+# Same box and endpoints as ml.py (importing ml.py would run its training pipeline)
+BD_BBOX = (20.5, 87.9, 26.7, 92.7)
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+TOPO_URL = "https://api.opentopodata.org/v1/srtm30m"
+CACHE_DIR = Path("osm_cache")
+
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_raster.npy")
+ELEVATION_STEP = 0.1        # SRTM is sampled on a coarse grid, then interpolated
+LOW_ELEVATION_M = 10.0      # at or below: active floodplain / delta, high zone
+HIGH_ELEVATION_M = 40.0     # at or above: uplands and hills, low zone
+
+
+def fetch_river_geometry(bbox=BD_BBOX, cache_file=CACHE_DIR / "osm_river_geometry.json"):
+    """Full polylines of every waterway=river in the box, as a list of (n, 2) lat/lon arrays"""
+    if cache_file.exists():
+        print("  Loading river geometry from cache ...")
+        data = json.loads(cache_file.read_text())
+    else:
+        print("  Querying OSM Overpass API for river geometry ...")
+        south, west, north, east = bbox
+        query = f"""
+        [out:json][timeout:180];
+        way["waterway"="river"]({south},{west},{north},{east});
+        out geom;
+        """
+        r = requests.post(OVERPASS_URL, data={'data': query}, timeout=240)
+        r.raise_for_status()
+        data = r.json()
+        cache_file.parent.mkdir(exist_ok=True)
+        cache_file.write_text(json.dumps(data))
+    return parse_overpass_geometry(data)
+
+
+def parse_overpass_geometry(data):
+    lines = []
+    for el in data.get('elements', []):
+        geometry = el.get('geometry') or []
+        if len(geometry) >= 2:
+            lines.append(np.array([[p['lat'], p['lon']] for p in geometry]))
+    return lines
+
+
+def load_river_points_fallback(cache_file=CACHE_DIR / "osm_rivers.json"):
+    """River centre points cached by ml.fetch_osm_rivers, used when geometry is unavailable"""
+    stations = json.loads(cache_file.read_text())
+    return [np.array([[s['lat'], s['lon']]]) for s in stations]
+
+
+def load_gshhg_rivers(bbox=BD_BBOX, data_dir=None, resolution="f", margin=1.0):
+    """
+    WDB II river lines as shipped in GSHHG by basemap-data / basemap-data-hires,
+    clipped to the box plus a margin so border cells still see rivers outside it
+    """
+    if data_dir is None:
+        data_dir = next(iter(importlib.util.find_spec("mpl_toolkits.basemap_data").submodule_search_locations))
+    south, west, north, east = bbox
+    lines = []
+    with open(os.path.join(data_dir, f"riversmeta_{resolution}.dat")) as meta, \
+            open(os.path.join(data_dir, f"rivers_{resolution}.dat"), "rb") as data:
+        for row in meta:
+            fields = row.split()
+            npts, lat_min, lat_max = int(fields[2]), float(fields[3]), float(fields[4])
+            if lat_max < south - margin or lat_min > north + margin:
+                continue
+            data.seek(int(fields[5]))
+            # little-endian float32 lon/lat pairs
+            lonlat = np.frombuffer(data.read(int(fields[6])), dtype="<f4").astype(np.float64).reshape(npts, 2)
+            if lonlat[:, 0].max() < west - margin or lonlat[:, 0].min() > east + margin:
+                continue
+            lines.append(lonlat[:, ::-1].copy())
+    return lines
+
+
+def densify(lines, spacing):
+    """Points along every polyline no further apart than spacing (degrees)"""
+    points = []
+    for line in lines:
+        if len(line) == 1:
+            points.append(line)
+            continue
+        for a, b in zip(line[:-1], line[1:]):
+            steps = max(1, int(np.ceil(np.abs(b - a).max() / spacing)))
+            t = np.linspace(0.0, 1.0, steps, endpoint=False)[:, None]
+            points.append(a + t * (b - a))
+        points.append(line[-1:])
+    return np.vstack(points)
+
+
+def grid_centres(bbox, res):
+    south, west, north, east = bbox
+    lats = south + (np.arange(int(round((north - south) / res))) + 0.5) * res
+    lons = west + (np.arange(int(round((east - west) / res))) + 0.5) * res
+    return lats, lons
+
+
+def river_distance_layer(lines, lats, lons, res, chunk=200_000):
+    points = densify(lines, res / 2)
+    print(f"  Indexing {len(points)} river points ...")
+    tree = HaversineIndex(range(len(points)), points[:, 0], points[:, 1])
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    flat_lat, flat_lon = grid_lat.ravel(), grid_lon.ravel()
+    dist = np.empty(flat_lat.size)
+    for i in range(0, flat_lat.size, chunk):
+        dist[i:i + chunk] = tree.query(flat_lat[i:i + chunk], flat_lon[i:i + chunk])[0][:, 0]
+    return dist.reshape(grid_lat.shape)
+
+
+def fetch_coarse_elevation(bbox=BD_BBOX, step=ELEVATION_STEP,
+                           cache_file=CACHE_DIR / "raster_elevations.json"):
+    """SRTM elevation on a coarse grid; returns (lats, lons, elevation) with NaN where unknown"""
+    lats, lons = grid_centres(bbox, step)
+    elev_map = json.loads(cache_file.read_text()) if cache_file.exists() else {}
+    locations = [f"{la:.4f},{lo:.4f}" for la in lats for lo in lons]
+    todo = [loc for loc in locations if loc not in elev_map]
+
+    if todo:
+        print(f"  Fetching {len(todo)} SRTM elevations from OpenTopoData ...")
+    for i in range(0, len(todo), 80):
+        batch = todo[i:i + 80]
+        try:
+            r = requests.get(TOPO_URL, params={'locations': "|".join(batch)}, timeout=30)
+            r.raise_for_status()
+            for loc, res in zip(batch, r.json().get('results', [])):
+                elev_map[loc] = res.get('elevation')
+        except Exception as e:
+            print(f"  Elevation batch failed: {e}")
+        time.sleep(1.1)   # respect 1 req/s rate limit
+
+    cache_file.parent.mkdir(exist_ok=True)
+    cache_file.write_text(json.dumps(elev_map))
+    values = [elev_map.get(loc) for loc in locations]
+    elev = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return lats, lons, elev.reshape(len(lats), len(lons))
+
+
+def pvlib_elevation(bbox=BD_BBOX, margin=0.25):
+    """
+    Altitude map bundled with pvlib (Mapzen terrain tiles: SRTM / GMTED / ETOPO1),
+    1/12° cells in 28 m steps. Coarse, but its -2 / 26 / 54 m steps straddle the
+    10 m and 40 m zone thresholds. Returns (lats, lons, elevation), NaN over water.
+    """
+    import h5py
+    import pvlib
+
+    scale = 12  # cells per degree; row 0 is 90°N, column 0 is 180°W
+    south, west, north, east = bbox
+    rows = np.arange(int((90 - north - margin) * scale), int(np.ceil((90 - south + margin) * scale)))
+    cols = np.arange(int((west - margin + 180) * scale), int(np.ceil((east + margin + 180) * scale)))
+    path = Path(pvlib.__file__).parent / "data" / "Altitude.h5"
+    with h5py.File(path, "r") as f:
+        block = f["Altitude"][rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1].astype(np.float64)
+    elev = np.where(block == 255, np.nan, block * 28 - 450)
+    lats = 90 - (rows + 0.5) / scale
+    lons = (cols + 0.5) / scale - 180
+    # ascending latitude like the other grids
+    return lats[::-1], lons, elev[::-1]
+
+
+def interpolate_grid(src_lats, src_lons, values, lats, lons, default=10.0):
+    """Bilinear resampling of a coarse grid onto a finer one"""
+    values = np.where(np.isnan(values), default, values)
+    rows = np.interp(lats, src_lats, np.arange(len(src_lats)))
+    cols = np.interp(lons, src_lons, np.arange(len(src_lons)))
+    r0 = np.minimum(rows.astype(int), len(src_lats) - 2)
+    c0 = np.minimum(cols.astype(int), len(src_lons) - 2)
+    fr, fc = (rows - r0)[:, None], (cols - c0)[None, :]
+    v00 = values[r0][:, c0]
+    v01 = values[r0][:, c0 + 1]
+    v10 = values[r0 + 1][:, c0]
+    v11 = values[r0 + 1][:, c0 + 1]
+    return (v00 * (1 - fr) * (1 - fc) + v01 * (1 - fr) * fc
+            + v10 * fr * (1 - fc) + v11 * fr * fc)
+
+
+def zone_layer(elevation):
+    """Zone codes as in index.ZONE_LABELS (0 high, 1 medium, 2 low) from terrain height"""
+    return np.where(elevation <= LOW_ELEVATION_M, 0, np.where(elevation >= HIGH_ELEVATION_M, 2, 1))
+
+
+def build(res, rivers_path=None, elevation_source="opentopodata", output=OUTPUT_PATH):
+    lats, lons = grid_centres(BD_BBOX, res)
+    print(f"Grid: {len(lats)} × {len(lons)} at {res}°")
+
+    if rivers_path == "gshhg":
+        lines = load_gshhg_rivers()
+    elif rivers_path:
+        lines = parse_overpass_geometry(json.loads(Path(rivers_path).read_text()))
+    else:
+        try:
+            lines = fetch_river_geometry()
+        except Exception as e:
+            print(f"  Overpass failed: {e}. Using cached river centre points.")
+            lines = load_river_points_fallback()
+    river_km = river_distance_layer(lines, lats, lons, res)
+
+    if elevation_source == "pvlib":
+        elev_lats, elev_lons, coarse = pvlib_elevation()
+    else:
+        elev_lats, elev_lons, coarse = fetch_coarse_elevation()
+    elevation = interpolate_grid(elev_lats, elev_lons, coarse, lats, lons)
+
+    layers = {
+        "zone_code": zone_layer(elevation),
+        "river_km": river_km,
+        "elevation_m": elevation,
+    }
+    data = np.stack([layers[name] for name in LAYERS])
+    south, west = BD_BBOX[0], BD_BBOX[1]
+    bbox = (south, west, south + len(lats) * res, west + len(lons) * res)
+    RiskRaster.save(output, data, bbox, res)
+    print(f"✅ Wrote {output} ({data.astype(np.float32).nbytes / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the static flood risk raster")
+    parser.add_argument("--res", type=float, default=0.01, help="cell size in degrees")
+    parser.add_argument("--rivers", help="saved Overpass JSON with 'out geom' ways, or 'gshhg'")
+    parser.add_argument("--elevation", choices=["opentopodata", "pvlib"], default="opentopodata")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+    build(args.res, args.rivers, args.elevation, args.output)
@@ -0,0 +1,150 @@
+# cache.py - Bounded TTL/LRU cache with single-flight loading
+import asyncio
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL.
+    Concurrent misses for the same key share one loader call (single-flight).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        # key -> (expires_at, value, tags)
+        self._data: "OrderedDict[str, Tuple[float, Any, frozenset]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: str, default: Any = None, count: bool = True) -> Any:
+        """Return a live entry (refreshing its LRU position) or default"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value, frozenset(tags))
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._purge_expired_locked()
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: Union[None, float, Callable[[Any], float]] = None,
+                          tags: Iterable[str] = ()) -> Tuple[Any, bool]:
+        """
+        Return (value, from_cache). On a miss the loader runs once per key
+        no matter how many requests are waiting for it. ttl may be a
+        callable that picks the TTL from the loaded value.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value, True
+
+        task = self._inflight.get(key)
+        if task is None:
+            # Own context: the fill is shared by every waiter, not part of the first caller's request
+            task = asyncio.get_running_loop().create_task(self._load(key, loader, ttl, tags),
+                                                          context=contextvars.Context())
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+
+        # Shielded so a cancelled waiter never cancels the shared fetch
+        return await asyncio.shield(task), False
+
+    async def _load(self, key, loader, ttl, tags):
+        try:
+            value = await loader()
+            self.set(key, value, ttl=ttl(value) if callable(ttl) else ttl, tags=tags)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Drop every entry whose key starts with prefix"""
+        return self._invalidate_where(lambda key, tags: key.startswith(prefix))
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with the given tag (e.g. a district name)"""
+        return self._invalidate_where(lambda key, tags: tag in tags)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            return count
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge_expired_locked()
+
+    def _purge_expired_locked(self) -> int:
+        now = time.time()
+        expired = [key for key, (expires_at, _, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            del self._data[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _invalidate_where(self, predicate: Callable[[str, frozenset], bool]) -> int:
+        with self._lock:
+            keys = [key for key, (_, _, tags) in self._data.items() if predicate(key, tags)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
@@ -1,21 +1,43 @@
 import pandas as pd
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional, List
 from sklearn.ensemble import RandomForestClassifier
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
-from geopy.geocoders import Nominatim
 import numpy as np
 from datetime import datetime
 import pickle
 import os
-from typing import Dict, Any, List, Optional
-import requests
+from typing import Dict, Any, Awaitable, Callable, List, Optional
 from datetime import datetime, timedelta
 import json
+import hashlib
 import time
-from geopy.distance import geodesic
+import asyncio
+from fastapi.responses import StreamingResponse, Response
+from upstream import upstream
+from cache import TTLCache
+from weather_store import WeatherStore, complete_days
+from forest import CompiledForest
+from offline_geocoder import DistrictBoundaryIndex, GeocodeMemo, normalize_name
+from spatial import HaversineIndex
+from risk_raster import RiskRaster, ZONE, RIVER_KM
+from knowledge_index import KnowledgeIndex
+from retrieval import AnswerRetriever
+from answer_cache import normalize_question
+from shared_cache import SharedCache
+from session_memory import SessionMemory, estimate_tokens
+from llm_scheduler import LLMScheduler, QueueTimeout
+from metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, Histogram, MetricsMiddleware
+import logging
+from logsetup import setup_logging, logging_stats
+from tracing import TraceFileWriter, TracingMiddleware, background_task, span, traced
+from profiling import ProfilingMiddleware
+
+# Records go through a bounded queue to a writer thread, so logging never blocks the event loop
+setup_logging()
+logger = logging.getLogger("jolbondhu")
 # 1. Initialize FastAPI
 app = FastAPI(
     title="JolBondhu Flood Risk Prediction API",
@@ -24,14 +46,40 @@ app = FastAPI(
 )
 
 # CORS middleware
+CORS_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Request metrics, exposed at /metrics
+HTTP_LATENCY = Histogram("jolbondhu_http_request_seconds", "HTTP request latency by route template",
+                         ["method", "route", "status"])
+HTTP_IN_FLIGHT = Gauge("jolbondhu_http_requests_in_flight", "HTTP requests currently being served")
+MODEL_INFERENCE = Histogram("jolbondhu_model_inference_seconds", "predict_risk_with_model latency", ["model"],
+                            buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1))
+app.add_middleware(MetricsMiddleware, latency=HTTP_LATENCY, in_flight=HTTP_IN_FLIGHT)
+
+# Per-request spans: Server-Timing header for browser devtools, optional Chrome trace file
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+trace_writer = TraceFileWriter(TRACE_FILE) if TRACE_FILE else None
+app.add_middleware(TracingMiddleware, server_timing=SERVER_TIMING, writer=trace_writer,
+                   timing_allow_origins=CORS_ORIGINS)
+
+# On-demand profiling of single requests: ?profile=cprofile|sample with an X-Profile-Token header.
+# Off unless PROFILE_TOKEN is set; PROFILE_DIR also keeps .prof / .folded files.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+if PROFILE_TOKEN:
+    app.add_middleware(ProfilingMiddleware, token=PROFILE_TOKEN, output_dir=PROFILE_DIR,
+                       sample_interval=PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
 # Pydantic models
 class PredictionRequest(BaseModel):
     lat: float
@@ -51,25 +99,46 @@ model = None
 geolocator = None
 model_trained = False
 
+# Offline reverse geocoding: bundled district polygons, then a persistent memo of Nominatim answers
+DISTRICT_BOUNDARIES_PATH = os.getenv(
+    "DISTRICT_BOUNDARIES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "bd_districts.geojson"),
+)
+GEOCODE_MEMO_PATH = os.getenv("GEOCODE_MEMO_PATH", "geocode_memo.db")
+district_index = None
+geocode_memo = None
+
 # Load or train model
 def load_or_train_model():
     global model, model_trained
     try:
         # Try to load existing model
         if os.path.exists("jolbondhu_model.pkl"):
-            print("📦 Loading saved model...")
+            logger.info("📦 Loading saved model...")
             with open("jolbondhu_model.pkl", "rb") as f:
                 model = pickle.load(f)
             model_trained = True
-            print("✅ Model loaded from file")
+            logger.info("✅ Model loaded from file")
+            compile_model()
             return
     except Exception as e:
-        print(f"⚠️ Could not load model: {e}")
+        logger.warning("⚠️ Could not load model: %s", e)
     
     # Train new model
-    print("🤖 Training new model...")
+    logger.info("🤖 Training new model...")
     train_model()
     model_trained = True
+    compile_model()
+
+def compile_model():
+    """Replace the sklearn forest with its flattened array form for inference"""
+    global model
+    try:
+        compiled = CompiledForest.from_sklearn(model)
+        model = compiled
+        logger.info("⚡ Model compiled: %d nodes, %.0f KB", len(compiled.feature), compiled.nbytes / 1024)
+    except Exception as e:
+        logger.warning("⚠️ Could not compile model, using sklearn predict: %s", e)
 
 def train_model():
     global model
@@ -102,21 +171,36 @@ def train_model():
     try:
         with open("jolbondhu_model.pkl", "wb") as f:
             pickle.dump(model, f)
-        print("💾 Model saved to jolbondhu_model.pkl")
+        logger.info("💾 Model saved to jolbondhu_model.pkl")
     except Exception as e:
-        print(f"⚠️ Could not save model: {e}")
+        logger.warning("⚠️ Could not save model: %s", e)
     
-    print(f"✅ Model trained with {len(X)} samples")
-    print(f"📊 Feature importance: {model.feature_importances_}")
+    logger.info("✅ Model trained with %d samples", len(X))
+    logger.info("📊 Feature importance: %s", model.feature_importances_)
 
 # Initialize geolocator
+def initialize_district_boundaries():
+    global district_index
+    try:
+        district_index = DistrictBoundaryIndex.from_file(DISTRICT_BOUNDARIES_PATH)
+        logger.info("🗺️ District boundaries loaded: %d districts", len(district_index))
+    except Exception as e:
+        logger.warning("⚠️ Could not load district boundaries (%s): %s", DISTRICT_BOUNDARIES_PATH, e)
+        district_index = None
+
 def initialize_geolocator():
-    global geolocator
+    global geolocator, geocode_memo
+    try:
+        geocode_memo = GeocodeMemo(GEOCODE_MEMO_PATH)
+    except Exception as e:
+        logger.warning("⚠️ Could not open geocode memo: %s", e)
+        geocode_memo = None
     try:
-        geolocator = Nominatim(user_agent="jolbondhu_app", timeout=10)
-        print("📍 Geolocator initialized")
+        # Reverse geocoding goes through the pooled async Nominatim client
+        geolocator = upstream
+        logger.info("📍 Geolocator initialized")
     except Exception as e:
-        print(f"⚠️ Could not initialize geolocator: {e}")
+        logger.warning("⚠️ Could not initialize geolocator: %s", e)
         geolocator = None
 
 # Bangladesh district database with real data
@@ -201,36 +285,57 @@ BANGLADESH_DISTRICTS = {
     "বরিশাল": {"lat": 22.7010, "lon": 90.3535, "division": "বরিশাল", "flood_risk": 0.65},
     "ঝালকাঠি": {"lat": 22.6438, "lon": 90.1935, "division": "বরিশাল", "flood_risk": 0.60},
 }
-def get_district_from_coords(lat: float, lon: float) -> dict:
+
+# Geocoders spell some names with different Unicode forms or a trailing "জেলা"
+DISTRICT_NAME_LOOKUP = {normalize_name(name): name for name in BANGLADESH_DISTRICTS}
+DISTRICT_TREE = HaversineIndex.from_records(BANGLADESH_DISTRICTS)
+
+def canonical_district_name(name: Optional[str]) -> Optional[str]:
+    """Map a geocoder's district name onto a BANGLADESH_DISTRICTS key"""
+    if not name:
+        return None
+    return DISTRICT_NAME_LOOKUP.get(normalize_name(name))
+
+def district_record(name: str) -> dict:
+    return {"name": name, **BANGLADESH_DISTRICTS[name]}
+
+@traced("geocode")
+async def get_district_from_coords(lat: float, lon: float) -> dict:
     """
-    Find nearest district from coordinates
+    Find the district containing the coordinates
     Returns district information dictionary
     """
+    # 1. Bundled boundary polygons, no network
+    if district_index is not None:
+        match = district_index.lookup(lat, lon)
+        if match:
+            name = canonical_district_name(match[0])
+            if name:
+                return district_record(name)
+
+    # 2. Memoized Nominatim answer, else ask Nominatim once for this ~1 km cell
     try:
-        # First try Nominatim API
-        if geolocator:
-            location = geolocator.reverse(f"{lat}, {lon}", language="bn", timeout=5)
-            if location and location.raw.get('address'):
-                address = location.raw['address']
+        memoized = await asyncio.to_thread(geocode_memo.get, lat, lon) if geocode_memo else None
+        if memoized is not None:
+            name = canonical_district_name(memoized)
+            if name:
+                return district_record(name)
+        elif geolocator:
+            location = await geolocator.nominatim_reverse(lat, lon, language="bn")
+            district_name = None
+            if location and location.get('address'):
+                address = location['address']
                 district_name = address.get('county') or address.get('district') or address.get('state_district')
-                
-                if district_name and district_name in BANGLADESH_DISTRICTS:
-                    return {
-                        "name": district_name,
-                        **BANGLADESH_DISTRICTS[district_name]
-                    }
+            name = canonical_district_name(district_name)
+            if geocode_memo:
+                await asyncio.to_thread(geocode_memo.put, lat, lon, name)
+            if name:
+                return district_record(name)
     except Exception as e:
-        print(f"📍 Geocoding error (using fallback): {e}")
+        logger.warning("📍 Geocoding error (using fallback): %s", e)
     
     # Fallback: Find nearest district from our database
-    min_distance = float('inf')
-    nearest_district = None
-    
-    for name, data in BANGLADESH_DISTRICTS.items():
-        dist = np.sqrt((lat - data["lat"])**2 + (lon - data["lon"])**2)
-        if dist < min_distance:
-            min_distance = dist
-            nearest_district = name
+    nearest_district = DISTRICT_TREE.nearest(lat, lon)[0] if len(DISTRICT_TREE) else None
     
     if nearest_district:
         return {
@@ -247,6 +352,7 @@ def get_district_from_coords(lat: float, lon: float) -> dict:
         "flood_risk": 0.8
     }
 
+@traced("weather")
 def generate_weather_data(lat: float, lon: float, district_info: dict):
     """Generate realistic weather data based on location and season"""
     current_month = datetime.now().month
@@ -283,11 +389,16 @@ def generate_weather_data(lat: float, lon: float, district_info: dict):
         "temperature": temperature
     }
 
+@traced("model")
 def predict_risk_with_model(weather_data: dict) -> dict:
     """Predict risk level using ML model"""
     if model is None:
         return {"risk_level": "মধ্যম", "confidence": 0.5}
     
+    with MODEL_INFERENCE.time(model=type(model).__name__):
+        return _predict_risk_with_model(weather_data)
+
+def _predict_risk_with_model(weather_data: dict) -> dict:
     try:
         # Prepare features for prediction
         features = np.array([[
@@ -298,8 +409,13 @@ def predict_risk_with_model(weather_data: dict) -> dict:
         ]])
         
         # Get prediction and probabilities
-        prediction = model.predict(features)[0]
-        probabilities = model.predict_proba(features)[0]
+        if isinstance(model, CompiledForest):
+            # One traversal gives both class and probabilities
+            classes, probabilities = model.predict_with_proba(features)
+            prediction, probabilities = classes[0], probabilities[0]
+        else:
+            prediction = model.predict(features)[0]
+            probabilities = model.predict_proba(features)[0]
         
         # Map prediction to Bangla
         risk_mapping = {
@@ -324,7 +440,7 @@ def predict_risk_with_model(weather_data: dict) -> dict:
         }
         
     except Exception as e:
-        print(f"⚠️ Prediction error: {e}")
+        logger.exception("⚠️ Prediction error: %s", e)
         return {"risk_level": "মধ্যম", "confidence": 0.5}
 
 def generate_advice(risk_level: str, district_name: str, weather_data: dict) -> dict:
@@ -384,13 +500,44 @@ def generate_advice(risk_level: str, district_name: str, weather_data: dict) ->
     return template
 
 # Startup event
+static_data_loaded = False
+
+def load_static_data():
+    """
+    Load the read-only model and lookup data. The production runner calls this
+    before forking workers so they share these pages instead of each loading a copy.
+    """
+    global static_data_loaded
+    if static_data_loaded:
+        return
+    load_or_train_model()
+    initialize_district_boundaries()
+    initialize_risk_raster()
+    initialize_retriever()
+    static_data_loaded = True
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
-    print("🚀 Starting JolBondhu API...")
-    load_or_train_model()
+    logger.info("🚀 Starting JolBondhu API...")
+    await upstream.start()
+    load_static_data()
     initialize_geolocator()
-    print("✅ Startup complete!")
+    initialize_weather_store()
+    initialize_shared_cache()
+    initialize_answer_cache()
+    # Also starts the answer warm-up, in whichever worker holds the scheduler lease
+    start_snapshot_refresher()
+    logger.info("✅ Startup complete!")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and release upstream connection pools"""
+    await stop_answer_warmup()
+    await stop_snapshot_refresher()
+    await upstream.close()
+    if trace_writer is not None:
+        await asyncio.to_thread(trace_writer.close)
 
 
 
@@ -405,15 +552,15 @@ async def predict_risk(
     Predict flood risk based on coordinates
     """
     try:
-        print(f"🔍 Prediction request: lat={lat}, lon={lon}")
+        logger.debug("🔍 Prediction request", extra={"lat": lat, "lon": lon})
         
         # Validate coordinates
         if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
             raise HTTPException(status_code=400, detail="Invalid coordinates")
         
         # Get district information
-        district_info = get_district_from_coords(lat, lon)
-        print(f"📍 District identified: {district_info['name']}")
+        district_info = await get_district_from_coords(lat, lon)
+        logger.debug("📍 District identified: %s", district_info['name'])
         
         # Generate or use provided weather data
         if rainfall is not None and river_level is not None:
@@ -429,54 +576,55 @@ async def predict_risk(
         # Make prediction
         prediction = predict_risk_with_model(weather_data)
         
-        # Generate advice
-        advice = generate_advice(
-            prediction["risk_level"],
-            district_info["name"],
-            weather_data
-        )
+        with span("build"):
+            # Generate advice
+            advice = generate_advice(
+                prediction["risk_level"],
+                district_info["name"],
+                weather_data
+            )
         
-        # Prepare response
-        response = {
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-            "location": {
-                "latitude": lat,
-                "longitude": lon,
-                "district": district_info["name"],
-                "division": district_info["division"],
-                "flood_risk_factor": district_info["flood_risk"]
-            },
-            "weather_data": {
-                "rainfall_mm": round(weather_data["rainfall"], 2),
-                "river_level_m": round(weather_data["river_level"], 2),
-                "humidity_percent": round(weather_data["humidity"], 1),
-                "temperature_c": round(weather_data["temperature"], 1)
-            },
-            "prediction": {
-                "risk_level": prediction["risk_level"],
-                "risk_score": prediction.get("risk_score", 1),
-                "confidence": prediction.get("confidence", 0.5),
-                "probabilities": prediction.get("probabilities", {})
-            },
-            "advice": advice,
-            "recommendations": {
-                "immediate": advice["actions"][:3],
-                "preparation": [
-                    "জরুরি প্রস্তুতির ব্যাগ তৈরি করুন",
-                    "পরিবারের সদস্যদের সাথে যোগাযোগ পরিকল্পনা করুন",
-                    "স্থানীয় আশ্রয় কেন্দ্রের অবস্থান জানুন"
-                ]
+            # Prepare response
+            response = {
+                "status": "success",
+                "timestamp": datetime.now().isoformat(),
+                "location": {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "district": district_info["name"],
+                    "division": district_info["division"],
+                    "flood_risk_factor": district_info["flood_risk"]
+                },
+                "weather_data": {
+                    "rainfall_mm": round(weather_data["rainfall"], 2),
+                    "river_level_m": round(weather_data["river_level"], 2),
+                    "humidity_percent": round(weather_data["humidity"], 1),
+                    "temperature_c": round(weather_data["temperature"], 1)
+                },
+                "prediction": {
+                    "risk_level": prediction["risk_level"],
+                    "risk_score": prediction.get("risk_score", 1),
+                    "confidence": prediction.get("confidence", 0.5),
+                    "probabilities": prediction.get("probabilities", {})
+                },
+                "advice": advice,
+                "recommendations": {
+                    "immediate": advice["actions"][:3],
+                    "preparation": [
+                        "জরুরি প্রস্তুতির ব্যাগ তৈরি করুন",
+                        "পরিবারের সদস্যদের সাথে যোগাযোগ পরিকল্পনা করুন",
+                        "স্থানীয় আশ্রয় কেন্দ্রের অবস্থান জানুন"
+                    ]
+                }
             }
-        }
         
-        print(f"✅ Prediction complete: {prediction['risk_level']} risk")
+        logger.debug("✅ Prediction complete: %s risk", prediction['risk_level'])
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
+        logger.exception("❌ Prediction error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Prediction failed: {str(e)}"
@@ -546,10 +694,12 @@ class EmergencyAnalysisRequest(BaseModel):
     location: LocationRequest
     situation: str
     urgency_level: str
+    question: Optional[str] = None
+    session_id: Optional[str] = None
 
 # Load trained models (simulate with rules for now)
 def load_models():
-    print("🤖 Loading AI models...")
+    logger.info("🤖 Loading AI models...")
     # In production, load actual ML models
     return {
         "flood_risk": "loaded",
@@ -560,6 +710,7 @@ def load_models():
 models = load_models()
 
 # Simulated weather data API
+@traced("weather")
 def get_weather_data(lat: float, lon: float):
     """Get simulated weather data for location"""
     # In production, integrate with OpenWeatherMap API
@@ -583,19 +734,20 @@ def get_weather_data(lat: float, lon: float):
         "cloud_cover": round(min(100, rain_multiplier * 25), 1)
     }
 
+# Major rivers in Bangladesh
+MAJOR_RIVERS = {
+    "ব্রহ্মপুত্র": {"lat": 25.8, "lon": 89.6, "danger_level": 20.5},
+    "যমুনা": {"lat": 24.9, "lon": 89.9, "danger_level": 18.2},
+    "পদ্মা": {"lat": 23.8, "lon": 89.8, "danger_level": 15.8},
+    "মেঘনা": {"lat": 23.2, "lon": 90.7, "danger_level": 16.5},
+}
+RIVER_TREE = HaversineIndex.from_records(MAJOR_RIVERS)
+
 # Simulated river level data
+@traced("river")
 def get_river_data(lat: float, lon: float):
     """Get simulated river water levels"""
-    # Major rivers in Bangladesh
-    rivers = {
-        "ব্রহ্মপুত্র": {"lat": 25.8, "lon": 89.6, "danger_level": 20.5},
-        "যমুনা": {"lat": 24.9, "lon": 89.9, "danger_level": 18.2},
-        "পদ্মা": {"lat": 23.8, "lon": 89.8, "danger_level": 15.8},
-        "মেঘনা": {"lat": 23.2, "lon": 90.7, "danger_level": 16.5},
-    }
-    
-    nearest_river = min(rivers.items(), key=lambda x: geodesic((lat, lon), (x[1]["lat"], x[1]["lon"])).km)
-    river_name, river_data = nearest_river
+    river_name, river_data, river_distance_km = RIVER_TREE.nearest(lat, lon)
     
     # Simulate level based on season
     month = datetime.now().month
@@ -609,10 +761,22 @@ def get_river_data(lat: float, lon: float):
         "current_level": round(level, 2),
         "danger_level": river_data["danger_level"],
         "trend": "বাড়ছে" if np.random.random() > 0.5 else "কমছে",
-        "distance_km": round(geodesic((lat, lon), (river_data["lat"], river_data["lon"])).km, 1)
+        "distance_km": round(river_distance_km, 1)
     }
 
+# Flood-prone districts used for the location factor
+FLOOD_PRONE_DISTRICTS = ["সুনামগঞ্জ", "কুড়িগ্রাম", "সিরাজগঞ্জ", "গাইবান্ধা", "জামালপুর"]
+FLOOD_PRONE_COORDS = {
+    "সুনামগঞ্জ": {"lat": 25.0659, "lon": 91.395},
+    "কুড়িগ্রাম": {"lat": 25.8054, "lon": 89.6362},
+    "সিরাজগঞ্জ": {"lat": 24.4539, "lon": 89.7083},
+    "গাইবান্ধা": {"lat": 25.3287, "lon": 89.5281},
+    "জামালপুর": {"lat": 24.9375, "lon": 89.9373},
+}
+FLOOD_PRONE_TREE = HaversineIndex.from_records(FLOOD_PRONE_COORDS)
+
 # AI Flood Risk Prediction
+@traced("model")
 def predict_flood_risk(lat: float, lon: float, weather_data: dict, river_data: dict):
     """Predict flood risk using multiple factors"""
     
@@ -625,20 +789,9 @@ def predict_flood_risk(lat: float, lon: float, weather_data: dict, river_data: d
     }
     
     # Geographic risk (flood-prone areas)
-    flood_prone_districts = ["সুনামগঞ্জ", "কুড়িগ্রাম", "সিরাজগঞ্জ", "গাইবান্ধা", "জামালপুর"]
-    district_coords = {
-        "সুনামগঞ্জ": (25.0659, 91.395),
-        "কুড়িগ্রাম": (25.8054, 89.6362),
-        "সিরাজগঞ্জ": (24.4539, 89.7083),
-        "গাইবান্ধা": (25.3287, 89.5281),
-        "জামালপুর": (24.9375, 89.9373),
-    }
-    
-    # Find nearest district
-    nearest_district = min(district_coords.items(), 
-                          key=lambda x: geodesic((lat, lon), x[1]).km)
+    nearest_district = FLOOD_PRONE_TREE.nearest(lat, lon)
     
-    if nearest_district[0] in flood_prone_districts:
+    if nearest_district[0] in FLOOD_PRONE_DISTRICTS:
         factors["location_risk"] = 80
     else:
         factors["location_risk"] = 30
@@ -812,21 +965,36 @@ def emergency_assistant(location: dict, situation: str, urgency: str):
     
     return response
 
+# Simulated facility locations
+EMERGENCY_FACILITIES = {
+    "hospital": [
+        {"name": "ঢাকা মেডিকেল কলেজ", "lat": 23.7289, "lon": 90.3944},
+        {"name": "বঙ্গবন্ধু শেখ মুজিব মেডিকেল", "lat": 23.7370, "lon": 90.3998}
+    ],
+    "shelter": [
+        {"name": "মোহাম্মদপুর সাইক্লোন শেল্টার", "lat": 23.7603, "lon": 90.3625},
+        {"name": "স্থানীয় স্কুল ভবন", "lat": 23.8103, "lon": 90.3625}
+    ]
+}
+FACILITY_TREES = {kind: HaversineIndex.from_list(items) for kind, items in EMERGENCY_FACILITIES.items()}
+
+BANGLA_DIGITS = str.maketrans("0123456789", "০১২৩৪৫৬৭৮৯")
+
+def find_nearest_facilities(lat: float, lon: float, facility_type: str, k: int = 1):
+    """k nearest emergency facilities of a type, closest first"""
+    tree = FACILITY_TREES.get(facility_type)
+    if tree is None:
+        return []
+    return [
+        {**facility, "distance": f"{distance_km:.1f}".translate(BANGLA_DIGITS) + " km",
+         "distance_km": round(distance_km, 1)}
+        for _, facility, distance_km in tree.k_nearest(lat, lon, k)
+    ]
+
 def find_nearest_facility(lat: float, lon: float, facility_type: str):
     """Find nearest emergency facility"""
-    # Simulated facility locations
-    facilities = {
-        "hospital": [
-            {"name": "ঢাকা মেডিকেল কলেজ", "lat": 23.7289, "lon": 90.3944, "distance": "৩.২ km"},
-            {"name": "বঙ্গবন্ধু শেখ মুজিব মেডিকেল", "lat": 23.7370, "lon": 90.3998, "distance": "৩.৫ km"}
-        ],
-        "shelter": [
-            {"name": "মোহাম্মদপুর সাইক্লোন শেল্টার", "lat": 23.7603, "lon": 90.3625, "distance": "২.৫ km"},
-            {"name": "স্থানীয় স্কুল ভবন", "lat": 23.8103, "lon": 90.3625, "distance": "৩.০ km"}
-        ]
-    }
-    
-    return facilities.get(facility_type, [{}])[0]
+    nearest = find_nearest_facilities(lat, lon, facility_type)
+    return nearest[0] if nearest else {}
 
 def generate_ai_advice(situation: str, urgency: str, location: dict):
     """Generate AI-powered advice"""
@@ -848,6 +1016,25 @@ def generate_ai_advice(situation: str, urgency: str, location: dict):
     
     return advice_templates.get(situation, {}).get(urgency, default_advice)
 
+# Farmer chatbot knowledge base, compiled once from chatbot_knowledge.json
+KNOWLEDGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot_knowledge.json")
+knowledge_index = KnowledgeIndex.from_file(KNOWLEDGE_PATH)
+
+# Fuzzy matching for misspelled / colloquial questions the patterns miss
+RETRIEVER_CACHE_PATH = os.getenv("RETRIEVER_CACHE_PATH", "chatbot_retriever.pkl")
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.2"))
+answer_retriever = None
+
+def initialize_retriever():
+    global answer_retriever
+    try:
+        answer_retriever = AnswerRetriever.load_or_build(KNOWLEDGE_PATH, RETRIEVER_CACHE_PATH)
+        logger.info("🔎 Answer retriever ready: %d documents, %d n-grams",
+                    len(answer_retriever.docs), len(answer_retriever.vocabulary))
+    except Exception as e:
+        logger.warning("⚠️ Could not build answer retriever: %s", e)
+        answer_retriever = None
+
 # Improved AI Farmer Chatbot with better matching
 def farmer_chatbot(question: str, location: Optional[dict] = None, crop_type: Optional[str] = None):
     """AI chatbot for farmer queries with improved matching"""
@@ -855,179 +1042,43 @@ def farmer_chatbot(question: str, location: Optional[dict] = None, crop_type: Op
     # Normalize the question
     question_lower = question.lower().strip()
     
-    # Enhanced knowledge base with more question patterns
-    knowledge_base = {
-        "ধান চাষ": {
-            "patterns": ["ধান", "ধান চাষ", "ধান ফলান", "ধান রোপণ", "ধান বপন", "ধান লাগান", "ধান আবাদ", "ধান চাষের"],
-            "answers": {
-                "বপন সময়": "ধান তিন মৌসুমে চাষ করা হয়:\n• বোরো ধান: নভেম্বর-ডিসেম্বর\n• আমন ধান: জুন-জুলাই\n• আউশ ধান: মার্চ-এপ্রিল\n\nটিপ: জমি ভেজা অবস্থায় রোপণ করতে হবে।",
-                "সার প্রয়োগ": "প্রতি হেক্টরে সার:\n• ইউরিয়া: ২৫০-৩০০ কেজি (৩ কিস্তিতে)\n• TSP: ১৫০-২০০ কেজি (চাষের সময়)\n• MOP: ১০০-১৫০ কেজি\n• জিপসাম: ৬০-৭০ কেজি\n\nপ্রয়োগ পদ্ধতি: ইউরিয়া তিন কিস্তিতে (রোপণের ১৫, ৩০ ও ৪৫ দিন পর)",
-                "পানি ব্যবস্থাপনা": "পানি ব্যবস্থাপনা:\n• বোরো ধান: নিয়মিত সেচ প্রয়োজন\n• আমন ধান: বৃষ্টিনির্ভর\n• আউশ ধান: কম পানি প্রয়োজন\n\nসতর্কতা: জমিতে ৫-৭ সেমি পানির স্তর রাখুন",
-                "রোগ ব্যবস্থাপনা": "ধান রোগ প্রতিরোধ:\n• ব্লাস্ট রোগ: ট্রাইসাইক্লাজল ৭৫% WP (১ গ্রাম/লিটার)\n• বাকানি রোগ: কার্বেন্ডাজিম ৫০% WP (২ গ্রাম/লিটার)\n• খোলপচা: প্রোপিকোনাজল ২৫% EC (১ মিলি/লিটার)\n• পোকা: কারটপ হাইড্রোক্লোরাইড ৪% GR (১০ কেজি/হেক্টর)",
-                "জাত নির্বাচন": "সরকার অনুমোদিত উচ্চ ফলনশীল জাত:\n• বোরো: ব্রি ধান২৮, ব্রি ধান২৯, ব্রি ধান৮৯\n• আমন: ব্রি ধান৪৯, ব্রি ধান৫২, ব্রি ধান৭১\n• আউশ: ব্রি ধান৪৮, ব্রি ধান৮১\n• স্বল্প জীবনকাল: ব্রি ধান৮৪ (১০০-১১০ দিন)",
-                "চাষ খরচ": "প্রতি হেক্টর ধান চাষের আনুমানিক খরচ:\n• বীজ: ৮,০০০-১০,০০০ টাকা\n• সার: ১৫,০০০-২০,০০০ টাকা\n• কীটনাশক: ৫,০০০-৮,০০০ টাকা\n• শ্রমিক: ২০,০০০-২৫,০০০ টাকা\n• মোট: ৫০,০০০-৬৫,০০০ টাকা\n• প্রত্যাশিত আয়: ১,৫০,০০০-২,০০,০০০ টাকা",
-                "উৎপাদন": "সঠিকভাবে চাষ করলে প্রতি হেক্টরে উৎপাদন:\n• বোরো ধান: ৬-৮ টন\n• আমন ধান: ৪-৬ টন\n• আউশ ধান: ৩-৪ টন\n\nটিপ: সঠিক সময়ে রোপণ ও পরিচর্যা উৎপাদন বাড়ায়"
-            }
-        },
-        "গম চাষ": {
-            "patterns": ["গম", "গম চাষ", "গম ফলান", "গম বপন", "গম লাগান"],
-            "answers": {
-                "বপন সময়": "গম বপনের সেরা সময়: নভেম্বরের মাঝামাঝি থেকে ডিসেম্বরের প্রথম সপ্তাহ\n• উত্তরাঞ্চল: ১০-২৫ নভেম্বর\n• দক্ষিণাঞ্চল: ২০ নভেম্বর - ৫ ডিসেম্বর\n\nবিলম্বে বপন করলে ফলন কমে যায়",
-                "সার প্রয়োগ": "গমের সার প্রয়োগ (প্রতি হেক্টর):\n• শেষ চাষে: TSP ১৫০ কেজি, MOP ১০০ কেজি\n• বপনের ২০ দিন পর: ইউরিয়া ১০০ কেজি\n• বপনের ৪০ দিন পর: ইউরিয়া ১০০ কেজি\n• জিপসাম: ৭০-৮০ কেজি\n\nসতর্কতা: ইউরিয়া প্রয়োগের পর সেচ দিন",
-                "সেচ": "গমে সেচ সময়:\n• ১ম সেচ: বপনের ২০-২৫ দিন পর (ক্রাউন রুট)\n• ২য় সেচ: বপনের ৪০-৪৫ দিন পর (টিলারিং)\n• ৩য় সেচ: বপনের ৬০-৬৫ দিন পর (ফুল আসা)\n• ৪র্থ সেচ: বপনের ৮০-৮৫ দিন পর (দানা গঠন)\n\nটিপ: মাটির ধরন অনুযায়ী সেচ দিন",
-                "রোগ": "গমের রোগ ব্যবস্থাপনা:\n• কাণ্ড পচা: কার্বেন্ডাজিম ৫০% WP (২ গ্রাম/লিটার)\n• পাতার দাগ: ম্যানকোজেব ৮০% WP (২ গ্রাম/লিটার)\n• গমের মরিচা: টেবুকোনাজল ২৫% EC (১ মিলি/লিটার)\n• পোকা: ইমিডাক্লোপ্রিড ২০০ SL (০.৫ মিলি/লিটার)",
-                "জাত": "সেরা গম জাত:\n• ব্রি গম৩ (প্রোটিন বেশি)\n• ব্রি গম৪ (জলাবদ্ধতা সহ্য করে)\n• ব্রি গম৮ (উচ্চ ফলনশীল)\n• ব্রি গম১০ (লবণ সহনশীল)\n• ব্রি গম২৫ (স্বল্প জীবনকাল)",
-                "খরচ": "গম চাষের খরচ (প্রতি হেক্টর):\n• বীজ: ৬,০০০-৮,০০০ টাকা\n• সার: ১২,০০০-১৫,০০০ টাকা\n• সেচ: ৮,০০০-১০,০০০ টাকা\n• শ্রমিক: ১৫,০০০-১৮,০০০ টাকা\n• মোট: ৪০,০০০-৫০,০০০ টাকা\n• আয়: ১,০০,০০০-১,২০,০০০ টাকা"
-            }
-        },
-        "পাট চাষ": {
-            "patterns": ["পাট", "পাট চাষ", "পাট ফলান", "পাট বপন"],
-            "answers": {
-                "বপন সময়": "পাট বপনের সময়:\n• তোষা পাট: মার্চের শেষ থেকে এপ্রিলের মাঝামাঝি\n• দেশী পাট: এপ্রিলের শেষ থেকে মে মাস\n• রিবন রেটিং: জুলাই-আগস্ট\n\nটিপ: বৃষ্টি শুরু হলে বপন করুন",
-                "সার প্রয়োগ": "পাটের সার (প্রতি হেক্টর):\n• ইউরিয়া: ১০০-১৫০ কেজি (২ কিস্তিতে)\n• TSP: ৭৫-১০০ কেজি (চাষের সময়)\n• MOP: ৫০-৭৫ কেজি (চাষের সময়)\n• জিঙ্ক সালফেট: ১০ কেজি\n\nপ্রয়োগ: ইউরিয়া বপনের ৩০ ও ৬০ দিন পর",
-                "কাটার সময়": "পাট কাটার সঠিক সময়:\n• তোষা পাট: বপন থেকে ১২০ দিন পর\n• দেশী পাট: বপন থেকে ১০০-১১০ দিন পর\n• পাট গাছের ৫০% ফুল ফুটলে কাটুন\n• ভোরবেলা কাটলে আঁশ ভালো হয়",
-                "আঁশ প্রক্রিয়া": "পাট আঁশ প্রক্রিয়াকরণ:\n• রিটিং: ১২-১৮ দিন পানিতে\n• কাঠি থেকে আঁশ ছাড়ান\n• ধুয়ে শুকানো\n• গ্রেডিং করা\n• বাজারজাত করা",
-                "জাত": "সরকার অনুমোদিত পাট জাত:\n• তোষা: O-৪, O-৭২৯, O-৯৮৯৭\n• দেশী: CVL-১, D-১৫৪, পাট-৯৯\n• কেনাফ: হংসা, জেআরও-৫২৪\n\nটিপ: অঞ্চল অনুযায়ী জাত নির্বাচন করুন",
-                "বাজার মূল্য": "পাটের বর্তমান মূল্য (প্রতি মণ):\n• তোষা আঁশ: ৩,৫০০-৪,৫০০ টাকা\n• দেশী আঁশ: ৩,০০০-৩,৮০০ টাকা\n• কেনাফ: ২,৫০০-৩,২০০ টাকা\n\nসরকারি ক্রয়মূল্য: ৪,২০০-৪,৫০০ টাকা"
-            }
-        },
-        "কৃষি ঋণ": {
-            "patterns": ["ঋণ", "কৃষি ঋণ", "টাকা ধার", "লোন", "অর্থ সাহায্য", "অর্থায়ন"],
-            "answers": {
-                "সরকারি ঋণ": "সরকারি কৃষি ঋণ স্কিম:\n• বাংলাদেশ কৃষি ব্যাংক\n• রাজশাহী কৃষি উন্নয়ন ব্যাংক\n• সোনালী ব্যাংক (কৃষি শাখা)\n• জনতা ব্যাংক (কৃষি শাখা)\n\nসুদের হার: ৮-১০% (সরকারি স্কিমে ৪%)",
-                "প্রয়োজনীয় কাগজ": "ঋণ আবেদনের কাগজপত্র:\n• জাতীয় পরিচয়পত্র\n• জমির দলিল/বন্দোবস্তপত্র\n• কৃষি কর্মকর্তার সুপারিশ\n• ব্যাংক হিসাব\n• পাসপোর্ট সাইজ ছবি",
-                "ঋণের পরিমাণ": "অনুমোদিত ঋণ পরিমাণ:\n• ক্ষুদ্র কৃষক: ৫০,০০০-১,০০,০০০ টাকা\n• মাঝারি কৃষক: ১,০০,০০০-৫,০০,০০০ টাকা\n• বড় কৃষক: ৫,০০,০০০-১০,০০,০০০ টাকা\n• যন্ত্রপাতি ঋণ: ১০-১৫ লক্ষ টাকা",
-                "শর্তাবলী": "ঋণ শর্তাবলী:\n• কৃষি কাজে ব্যবহার বাধ্যতামূলক\n• সময়মতো কিস্তি পরিশোধ\n• জমি বন্ধক রাখতে হতে পারে\n• ১-৩ বছরের মেয়াদ",
-                "বিশেষ সুবিধা": "বিশেষ সুবিধা:\n• মহিলা কৃষকদের জন্য কম সুদ\n• প্রতিবন্ধী কৃষকদের সহায়তা\n• তরুণ কৃষক প্রশিক্ষণ সহ ঋণ\n• বন্যা ক্ষতিগ্রস্তদের শর্ত শিথিল"
-            }
-        },
-        "বীমা": {
-            "patterns": ["বীমা", "ইনসিওরেন্স", "ক্ষতিপূরণ", "ক্লেম", "দাবি"],
-            "answers": {
-                "কৃষি বীমা": "সরকারি কৃষি বীমা:\n• সাদার্ন ইন্সুরেন্স কোম্পানি\n• গ্রিন ডেলটা ইন্সুরেন্স\n• প্রগতি ইন্সুরেন্স\n• জনতা ইন্সুরেন্স\n\nপ্রিমিয়াম: ফসল মূল্যের ২-৫%",
-                "বীমা প্রকার": "কৃষি বীমার প্রকার:\n• ফসল বীমা (ধান, গম, পাট)\n• গবাদি পশু বীমা\n• মাছ চাষ বীমা\n• কৃষি যন্ত্রপাতি বীমা\n• গ্রিনহাউস বীমা",
-                "ক্লেম প্রক্রিয়া": "বীমা ক্লেম প্রক্রিয়া:\n• ক্ষতি হওয়ার ৭ দিনের মধ্যে রিপোর্ট\n• কৃষি কর্মকর্তার সার্টিফিকেট\n• বীমা অফিসে আবেদন\n• সমীক্ষা টিমের মূল্যায়ন\n• ৩০-৪৫ দিনে দাবি পরিশোধ",
-                "ক্ষতিপূরণ": "ক্ষতিপূরণ পরিমাণ:\n• সম্পূর্ণ ক্ষতি: বীমাকৃত মূল্যের ১০০%\n• আংশিক ক্ষতি: প্রকৃত ক্ষতির ৮০%\n• বিশেষ ক্ষেত্রে অতিরিক্ত সহায়তা\n• বন্যা/ঘূর্ণিঝড়: দ্রুত ক্লেম প্রক্রিয়া"
-            }
-        },
-        "বাজার তথ্য": {
-            "patterns": ["বাজার", "দর", "মূল্য", "দাম", "বিক্রয়", "বাজারজাত", "সরবরাহ"],
-            "answers": {
-                "বাজার মূল্য": "আপডেটেড বাজার মূল্য:\n• ধান: প্রতি মণ ১,২০০-১,৮০০ টাকা\n• গম: প্রতি মণ ১,৫০০-২,০০০ টাকা\n• পাট: প্রতি মণ ৩,৫০০-৪,৫০০ টাকা\n• আলু: প্রতি কেজি ২০-৩৫ টাকা\n• পিঁয়াজ: প্রতি কেজি ৪০-৬০ টাকা\n\nদ্রষ্টব্য: দাম অঞ্চলভেদে পরিবর্তনশীল",
-                "বাজার সন্ধান": "বাজার সন্ধান:\n• অনলাইন: www.dam.badc.gov.bd\n• মোবাইল: এসএমসি এগ্রো অ্যাপ\n• হটলাইন: ১৬১২৩\n• স্থানীয়: কৃষি বিপণন বিভাগ",
-                "বিক্রয় টিপস": "বিক্রয়ের জন্য টিপস:\n• উৎপাদন খরচের ২০-৩০% বেশি দামে বিক্রি করুন\n• সরাসরি বাজারে বিক্রি করলে দাম ভালো\n• কো-অপারেটিভের মাধ্যমে বিক্রি করুন\n• চুক্তি চাষ করলে নিরাপদ বাজার",
-                "সরকারি ক্রয়": "সরকারি ক্রয় কর্মসূচি:\n• কৃষি বিপণন বিভাগ\n• টিএসপি, ওএমএস, ভিজিডি\n• ন্যায্যমূল্যে কৃষকদের থেকে ক্রয়\n• নির্ধারিত কেন্দ্রে সংগ্রহ"
-            }
-        },
-        "সাধারণ প্রশ্ন": {
-            "patterns": ["হ্যালো", "হাই", "নমস্কার", "আসসালামু", "কেমন", "কি", "কী"],
-            "answers": {
-                "স্বাগতম": "স্বাগতম! আমি JolBondhu AI Assistant। আমি আপনাকে সাহায্য করতে পারি:\n\n🌾 কৃষি পরামর্শ\n🌊 বন্যা পূর্বাভাস\n🚨 জরুরি সাহায্য\n💰 কৃষি ঋণ ও বীমা\n📊 বাজার তথ্য\n\nআপনার প্রশ্ন করুন, আমি সাহায্য করব!",
-                "সাহায্য": "আমি যেসব বিষয়ে সাহায্য করতে পারি:\n\n1. ধান, গম, পাট চাষ\n2. সার ও সেচ ব্যবস্থাপনা\n3. রোগ ও পোকামাকড় নিয়ন্ত্রণ\n4. কৃষি ঋণ ও বীমা\n5. বাজার মূল্য ও বিপণন\n6. জরুরি পরিস্থিতি\n\nআপনার প্রশ্ন লিখুন বা দ্রুত প্রশ্ন নির্বাচন করুন।",
-                "পরিচয়": "আমি JolBondhu AI Assistant।\n\n🏆 আমার বিশেষত্ব:\n• ৯৫% সঠিক কৃষি পরামর্শ\n• বাস্তবসম্মত সমাধান\n• বাংলা ভাষায় সম্পূর্ণ\n• ২৪/৭ সেবা\n• বাংলাদেশ কৃষির জন্য তৈরি\n\nআপনার যেকোনো কৃষি সমস্যার সমাধান পাবেন!"
-            }
-        }
-    }
-    
-    # Find the best matching topic
-    best_topic = None
-    best_match_score = 0
-    
-    for topic, data in knowledge_base.items():
-        for pattern in data["patterns"]:
-            if pattern in question_lower:
-                similarity = len(set(question_lower.split()) & set(pattern.split())) / len(question_lower.split())
-                if similarity > best_match_score:
-                    best_match_score = similarity
-                    best_topic = topic
-                    break
-    
-    # If no topic found with patterns, use keyword matching
-    if not best_topic:
-        # Check for keywords in question
-        question_words = set(question_lower.split())
-        for topic, data in knowledge_base.items():
-            for pattern in data["patterns"]:
-                if any(word in question_lower for word in pattern.split()):
-                    best_topic = topic
-                    best_match_score = 0.2
-                    break
-            if best_topic:
-                break
-    
-    # If still no topic, use general questions
-    if not best_topic:
-        best_topic = "সাধারণ প্রশ্ন"
-        best_match_score = 0.1
-    
-    # Find the best matching question within the topic
-    best_question_key = None
-    best_question_score = 0
-    
-    for question_key in knowledge_base[best_topic]["answers"]:
-        # Check if any word from question key is in user question
-        for word in question_key.split():
-            if word in question_lower:
-                score = 0.5
-                # Increase score if multiple words match
-                matching_words = len(set(word.split()) & set(question_lower.split()))
-                score += matching_words * 0.1
-                
-                if score > best_question_score:
-                    best_question_score = score
-                    best_question_key = question_key
-    
-    # If no specific question matches, use a default answer
-    if not best_question_key or best_question_score < 0.3:
-        if best_topic == "সাধারণ প্রশ্ন":
-            best_question_key = "স্বাগতম"
-        else:
-            # Find the first answer that might be relevant
-            for q_key in knowledge_base[best_topic]["answers"]:
-                # Check for common keywords
-                common_keywords = ["কি", "কী", "কিভাবে", "কেন", "কখন", "কত"]
-                if any(keyword in question_lower for keyword in common_keywords):
-                    best_question_key = q_key
-                    break
-            
-            if not best_question_key:
-                # Use the first answer in the topic
-                best_question_key = list(knowledge_base[best_topic]["answers"].keys())[0]
+    best_topic, best_match_score, best_question_key = knowledge_index.match(question_lower)
+    
+    if answer_retriever is not None:
+        # No whole pattern matched: try fuzzy retrieval before settling for a weak guess
+        if best_match_score <= 0.2:
+            doc, score = answer_retriever.best(question_lower, kind="topic")
+            if doc and score >= RETRIEVAL_MIN_SCORE:
+                best_topic, best_question_key, best_match_score = doc["topic"], doc["key"], score
+        # Topic is known but no answer key was named: closest answer within the topic
+        if best_question_key is None and best_topic != knowledge_index.default_topic:
+            doc, score = answer_retriever.best(question_lower, kind="topic", topic=best_topic)
+            if doc and score >= RETRIEVAL_MIN_SCORE:
+                best_question_key = doc["key"]
+    if best_question_key is None:
+        best_question_key = knowledge_index.default_key(best_topic)
     
     # Get the answer
-    answer = knowledge_base[best_topic]["answers"][best_question_key]
+    answer = knowledge_index.answers[best_topic][best_question_key]
     
     # Add location-specific advice if available
-    if location and best_topic not in ["সাধারণ প্রশ্ন", "বাজার তথ্য", "কৃষি ঋণ", "বীমা"]:
+    if location and best_topic not in knowledge_index.local_advice_skip_topics:
         weather = get_weather_data(location["lat"], location["lon"])
-        month = datetime.now().month
         
         # Add seasonal advice
-        if month in [6, 7, 8, 9]:  # Monsoon
-            answer += "\n\n🌧️ **মৌসুমি টিপস:** এখন বর্ষাকাল, অতিরিক্ত সেচের প্রয়োজন নেই। বৃষ্টির পানি সংরক্ষণ করুন।"
-        elif month in [4, 5, 10]:  # Summer/Hot
-            answer += "\n\n☀️ **মৌসুমি টিপস:** গরমকাল, নিয়মিত সেচ দিন। সকাল বা বিকালে সেচ দিলে ভালো।"
+        answer += knowledge_index.seasonal_tip(datetime.now().month)
         
         # Add weather warning if needed
-        if weather["rainfall_24h"] > 100:
-            answer += "\n\n⚠️ **আবহাওয়া সতর্কতা:** আজ ভারী বৃষ্টির সম্ভাবনা আছে। ফসলের যথাযথ যত্ন নিন।"
+        if weather["rainfall_24h"] > knowledge_index.heavy_rain_mm:
+            answer += knowledge_index.heavy_rain_warning
     
     # Add contact information for complex questions
     if best_match_score < 0.4:
-        answer += "\n\n📞 **সরাসরি সাহায্য:** আরও বিস্তারিত জানতে কৃষি হেল্পলাইন ১৬১২৩ এ কল করুন।"
-    
-    # Generate follow-up questions
-    follow_up_questions = []
-    if best_topic in knowledge_base:
-        answers = list(knowledge_base[best_topic]["answers"].keys())
-        # Take up to 3 questions that aren't the current one
-        for q in answers:
-            if q != best_question_key and len(follow_up_questions) < 3:
-                follow_up_questions.append(q)
-    
-    # Add some general follow-ups
-    general_questions = ["ধান চাষের খরচ কত?", "গমের সেরা জাত কোনটি?", "পাট বিক্রির সেরা সময় কখন?"]
-    for gq in general_questions:
+        answer += knowledge_index.helpline_note
+    
+    # Generate follow-up questions: up to 3 other questions of the topic, then general ones
+    follow_up_questions = [q for q in knowledge_index.follow_ups[best_topic] if q != best_question_key][:3]
+    for gq in knowledge_index.general_follow_ups:
         if len(follow_up_questions) < 5 and gq not in follow_up_questions:
             follow_up_questions.append(gq)
     
@@ -1036,7 +1087,7 @@ def farmer_chatbot(question: str, location: Optional[dict] = None, crop_type: Op
         "topic": best_topic,
         "answer": answer,
         "confidence": round(best_match_score * 100, 1),
-        "sources": ["বাংলাদেশ কৃষি গবেষণা ইনস্টিটিউট", "কৃষি সম্প্রসারণ অধিদপ্তর", "বাংলাদেশ ধান গবেষণা ইনস্টিটিউট"],
+        "sources": list(knowledge_index.sources),
         "follow_up_questions": follow_up_questions
     }
 def get_follow_up_questions(topic: str):
@@ -1177,7 +1228,7 @@ async def predict_flood(data: FloodPredictionRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in predict_flood: {str(e)}")
+        logger.exception("Error in predict_flood: %s", e)
         # Return mock data in case of error
         return {
             "status": "success",
@@ -1235,6 +1286,13 @@ async def emergency_assist(request: EmergencyAnalysisRequest):
             request.urgency_level
         )
         
+        # Optional free-text question, answered ahead of all regular chat traffic
+        if request.question:
+            result = await get_deepseek_response(request.question, lane="emergency",
+                                                 session_id=request.session_id)
+            assistance["ai_answer"] = result["answer"]
+            assistance["ai_model"] = result.get("model", "deepseek-chat")
+        
         return {
             "status": "success",
             "assistance": assistance,
@@ -1244,9 +1302,9 @@ async def emergency_assist(request: EmergencyAnalysisRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/chat/farmer")
+@app.post("/chat/farmer/local")
 async def farmer_chat(query: FarmerQuery):
-    """AI chatbot for farmers"""
+    """Knowledge-base chatbot for farmers (no LLM call)"""
     try:
         location_data = {"lat": query.location.lat, "lon": query.location.lon} if query.location else None
         
@@ -1276,412 +1334,197 @@ class ChatRequest(BaseModel):
     question: str
     location: Optional[Dict] = None
     stream: bool = False
+    session_id: Optional[str] = None
 
 class ChatStreamRequest(BaseModel):
     question: str
     session_id: Optional[str] = None
 
 
-DEEPSEEK_API_KEY = ""  # Get from https://platform.deepseek.com/api_keys
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")  # Get from https://platform.deepseek.com/api_keys
+# Point at mock_deepseek.py for offline load tests
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+
+# Context for conversation memory: recent turns per session, trimmed to a
+# token budget so prompt size (latency and cost) stays bounded
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "5000"))
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", "3600"))
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "1500"))
+SESSION_MAX_TOTAL_TOKENS = int(os.getenv("SESSION_MAX_TOTAL_TOKENS", "2000000"))
+conversation_memory = SessionMemory(
+    max_sessions=SESSION_MAX_SESSIONS,
+    ttl=SESSION_TTL_S,
+    token_budget=SESSION_TOKEN_BUDGET,
+    max_total_tokens=SESSION_MAX_TOTAL_TOKENS
+)
+
+def remember_turn(session_id: Optional[str], question: str, answer: str):
+    if session_id:
+        conversation_memory.append(session_id, question, answer)
+
+# Static system prompt: identical bytes on every call, so DeepSeek's prompt
+# prefix cache can reuse it. Date, season and knowledge snippets follow it
+# in a separate message.
+SYSTEM_PROMPT = """You are JolBondhu, a friendly agricultural expert for Bangladeshi farmers.
+Always answer in simple, conversational Bangla. Give practical, Bangladesh-specific
+advice with concrete numbers, quantities and steps. Use short points and a few emojis.
+Keep it to 2-4 short paragraphs. Prefer the reference notes when they are relevant.
+End with one helpful follow-up question."""
+
+DEEPSEEK_MAX_TOKENS = int(os.getenv("DEEPSEEK_MAX_TOKENS", "700"))
+KNOWLEDGE_CONTEXT_K = int(os.getenv("KNOWLEDGE_CONTEXT_K", "3"))
+KNOWLEDGE_CONTEXT_TOKENS = int(os.getenv("KNOWLEDGE_CONTEXT_TOKENS", "400"))
+KNOWLEDGE_CONTEXT_MIN_SCORE = float(os.getenv("KNOWLEDGE_CONTEXT_MIN_SCORE", "0.15"))
+
+def build_knowledge_context(question: str) -> List[str]:
+    """The most relevant knowledge-base answers, compacted, within KNOWLEDGE_CONTEXT_TOKENS"""
+    if answer_retriever is None:
+        return []
+    snippets, budget = [], KNOWLEDGE_CONTEXT_TOKENS
+    for doc, score in answer_retriever.search(question.lower(), k=KNOWLEDGE_CONTEXT_K, kind="topic"):
+        if score < KNOWLEDGE_CONTEXT_MIN_SCORE or budget <= 0:
+            break
+        snippet = f"[{doc['topic']} – {doc['key']}] " + " ".join(doc["answer"].split())
+        if estimate_tokens(snippet) > budget:
+            # Cut to the remaining budget (estimate_tokens counts 4 UTF-8 bytes per token)
+            snippet = snippet.encode("utf-8")[:budget * 4].decode("utf-8", "ignore") + "…"
+        snippets.append(snippet)
+        budget -= estimate_tokens(snippet)
+    return snippets
+
+def build_chat_messages(question: str, history: Optional[List[Dict[str, str]]] = None):
+    """(messages, snippets): static prefix, then history, then this turn's context and question"""
+    snippets = build_knowledge_context(question)
+    context = f"Date: {datetime.now().strftime('%d %B, %Y')}. Season: {get_current_season()}."
+    if snippets:
+        context += "\nReference notes:\n" + "\n".join(snippets)
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        *(history or []),
+        {"role": "system", "content": context},
+        {"role": "user", "content": question}
+    ]
+    return messages, snippets
+
+DEEPSEEK_USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens",
+                         "prompt_cache_hit_tokens", "prompt_cache_miss_tokens")
+
+def usage_metadata(usage: Dict[str, Any], messages: List[Dict[str, str]], snippets: List[str]) -> Dict[str, Any]:
+    """Per-request token accounting: DeepSeek's usage plus our prompt breakdown"""
+    return {
+        **{name: usage.get(name, 0) for name in DEEPSEEK_USAGE_FIELDS},
+        "estimated_prompt_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+        "context_snippets": len(snippets),
+        "context_tokens": sum(estimate_tokens(s) for s in snippets),
+        "max_tokens": DEEPSEEK_MAX_TOKENS
+    }
+
+# Every DeepSeek call takes a slot from one scheduler: a global concurrency
+# limit, an emergency lane served before everything else, round-robin
+# between sessions, and a fallback answer when the queue wait runs too long
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_QUEUE_DEADLINE_S = float(os.getenv("LLM_QUEUE_DEADLINE_S", "5"))
+LLM_EMERGENCY_DEADLINE_S = float(os.getenv("LLM_EMERGENCY_DEADLINE_S", "15"))
+EMERGENCY_KEYWORDS = ['বন্যা', 'জরুরি', 'জরুরী', 'নদী ভাঙন', 'আশ্রয়', 'উদ্ধার', 'ঘূর্ণিঝড়', 'জলোচ্ছ্বাস',
+                      'পানি বাড়', 'ডুবে', 'flood', 'emergency', 'rescue', 'cyclone', 'shelter']
+llm_scheduler = LLMScheduler(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    lanes=("emergency", "normal"),
+    deadlines={"emergency": LLM_EMERGENCY_DEADLINE_S, "normal": LLM_QUEUE_DEADLINE_S}
+)
 
-# Context for conversation memory
-conversation_memory = {}
+def llm_lane(question: str) -> str:
+    question_lower = question.lower()
+    if any(word in question_lower for word in EMERGENCY_KEYWORDS):
+        return "emergency"
+    return "normal"
 
-def get_deepseek_response(question: str, stream: bool = False) -> Dict[str, Any]:
+async def get_deepseek_response(question: str, stream: bool = False,
+                                history: Optional[List[Dict[str, str]]] = None,
+                                lane: Optional[str] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
     """Get response from DeepSeek API (FREE)"""
+    lane = lane or llm_lane(question)
     try:
-        headers = {
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # System prompt for agricultural expert
-        system_prompt = """You are **JolBondhu**, an intelligent agricultural expert assistant for Bangladeshi farmers. 
-        Your personality: Friendly, knowledgeable, practical, and empathetic.
-        
-        Guidelines:
-        1. **Always respond in Bangla** (Bengali) using simple, conversational language
-        2. Provide **real-time, practical advice** based on current agricultural practices in Bangladesh
-        3. Include **specific numbers, measurements, and actionable steps**
-        4. Structure answers with clear points and emojis for better readability
-        5. If asking for location, provide location-specific advice
-        6. Be empathetic to farmers' struggles
-        7. Keep responses **concise but comprehensive** (3-5 paragraphs maximum)
-        8. End with a helpful follow-up question
-        
-        Agricultural Knowledge Base:
-        - Seasons: খরিফ-১ (আউশ), খরিফ-২ (আমন), রবি (বোরো)
-        - Major crops: ধান, গম, পাট, আলু, সবজি, ডাল
-        - Soil types: দোআঁশ, এঁটেল, বালু, পলি
-        - Fertilizers: ইউরিয়া, টিএসপি, এমওপি, জৈব সার
-        - Common issues: রোগ-পোকা, পানি ব্যবস্থাপনা, বন্যা, খরা
-        
-        Current Date: {current_date}
-        Current Season: {current_season}""".format(
-            current_date=datetime.now().strftime("%d %B, %Y"),
-            current_season=get_current_season()
-        )
-        
+        await llm_scheduler.acquire(lane, session_id)
+    except QueueTimeout as e:
+        logger.warning("⏳ DeepSeek queue full (%s), answering from fallback", e, extra={"lane": lane})
+        return get_fallback_response(question)
+    
+    # A stream keeps its slot until the relay finishes and calls its release
+    handed_off = False
+    try:
+        messages, snippets = build_chat_messages(question, history)
         payload = {
             "model": "deepseek-chat",  # Free model
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": question}
-            ],
+            "messages": messages,
             "stream": stream,
             "temperature": 0.7,
-            "max_tokens": 1000
+            "max_tokens": DEEPSEEK_MAX_TOKENS
         }
         
-        response = requests.post(
-            DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            stream=stream
-        )
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+            response = await upstream.deepseek_stream(DEEPSEEK_API_URL, DEEPSEEK_API_KEY, payload)
+        else:
+            response = await upstream.deepseek_chat(DEEPSEEK_API_URL, DEEPSEEK_API_KEY, payload)
         
         if response.status_code == 200:
             if stream:
-                # Handle streaming response
-                return {"stream": True, "response": response}
+                # Handle streaming response (caller closes it and releases the slot)
+                handed_off = True
+                return {"stream": True, "response": response, "release": llm_scheduler.releaser(),
+                        "usage": usage_metadata({}, messages, snippets)}
             else:
                 data = response.json()
                 answer = data['choices'][0]['message']['content']
+                usage = data.get('usage', {})
                 
                 return {
                     "answer": answer,
-                    "tokens_used": data.get('usage', {}).get('total_tokens', 0),
-                    "model": data.get('model', 'deepseek-chat')
+                    "tokens_used": usage.get('total_tokens', 0),
+                    "model": data.get('model', 'deepseek-chat'),
+                    "usage": usage_metadata(usage, messages, snippets)
                 }
         else:
-            print(f"API Error: {response.status_code}, {response.text}")
+            if stream:
+                await response.aread()
+                await response.aclose()
+            logger.error("DeepSeek API error: %s, %s", response.status_code, response.text)
             return get_fallback_response(question)
             
     except Exception as e:
-        print(f"DeepSeek API Error: {e}")
+        logger.error("DeepSeek API Error: %s", e)
         return get_fallback_response(question)
+    finally:
+        if not handed_off:
+            llm_scheduler.release()
 
 def get_fallback_response(question: str) -> Dict[str, Any]:
     """Intelligent fallback response system"""
     question_lower = question.lower()
+    keyword = knowledge_index.fallback_keyword(question_lower)
+    similarity = 1.0 if keyword else 0.0
     
-    # Enhanced knowledge base with real-time data
-    current_month = datetime.now().month
-    current_season = get_current_season()
-    
-    responses = {
-        "ধান": f"""🌾 **ধান চাষ সম্পর্কে পরামর্শ:**
-
-বর্তমান মৌসুম: **{current_season}**
-
-**বীজ বপন:** 
-- বোরো ধান: নভেম্বর-ডিসেম্বর (আগাম জাত), ডিসেম্বর-জানুয়ারি (মধ্য মৌসুম)
-- আমন ধান: জুন-জুলাই (আগাম), জুলাই-আগস্ট (মধ্য মৌসুম)
-
-**সার প্রয়োগ (প্রতি হেক্টর):**
-- ইউরিয়া: ২৫০-৩০০ কেজি (৩ ভাগে: ১০, ৩৫ ও ৫৫ দিন পর)
-- টিএসপি: ১৫০-২০০ কেজি (সম্পূর্ণ মাটিতে মিশিয়ে)
-- এমওপি: ১০০-১৫০ কেজি (২ ভাগে: বপন ও ৪৫ দিন পর)
-- জিঙ্ক সালফেট: ১০ কেজি (বপন সময়)
-
-**সেচ ব্যবস্থাপনা:**
-- প্রথম ১৫ দিন: ২-৩ সেমি পানির স্তর রাখুন
-- শীষ বের হওয়ার সময়: ৫-৭ সেমি পানির স্তর
-- পরিপক্কতা: মাটি সামান্য ভেজা রাখুন
-
-**রোগ-পোকা দমন:**
-- ব্লাস্ট রোগ: ট্রাইসাইক্লাজল ৭৫% WP (০.৬ গ্রাম/লিটার)
-- গাছ ফড়িং: কার্বোফুরান ৩% জি (৩৩ কেজি/হেক্টর)
-- মাজরা পোকা: কার্টাপ হাইড্রোক্লোরাইড ৫০% SP (১ গ্রাম/লিটার)
-
-**উৎপাদন খরচ ও আয়:**
-- আনুমানিক খরচ: ৮০,০০০-১,০০,০০০ টাকা/হেক্টর
-- সম্ভাব্য উৎপাদন: ৪-৫ টন/হেক্টর
-- বর্তমান বাজার মূল্য: ২৮-৩২ টাকা/কেজি
-- আনুমানিক আয়: ১,২০,০০০-১,৫০,০০০ টাকা/হেক্টর
-
-**বিশেষ টিপস:**
-১. স্বল্প জীবনকালীন জাত (১১০-১২০ দিন) নির্বাচন করুন
-২. একই জমিতে একই জাত বারবার চাষ করবেন না
-৩. জৈব ও রাসায়নিক সারের সমন্বয় করুন
-৪. সঠিক সময়ে সেচ দিন
-
-আপনার এলাকার মাটির ধরন জানালে আরও নির্দিষ্ট পরামর্শ দিতে পারব! 🚜""",
-
-        "গম": f"""🌾 **গম চাষ সম্পূর্ণ গাইড:**
-
-**সেরা সময়:** নভেম্বরের ১৫-৩০ তারিখ (উত্তরাঞ্চল), ডিসেম্বর ১-১৫ (মধ্য ও দক্ষিণাঞ্চল)
-
-**জাত নির্বাচন:**
-- বারি গম-৩৩: উচ্চ ফলন, রোগ প্রতিরোধী
-- বারি গম-৩২: খরা সহনশীল
-- বারি গম-৩১: লবণাক্ততা সহনশীল
-
-**সার ব্যবস্থাপনা (প্রতি হেক্টর):**
-- গোবর সার: ১০ টন (মাটি তৈরির সময়)
-- ইউরিয়া: ২২০-২৫০ কেজি (৩ ভাগে)
-- টিএসপি: ১৮০-২০০ কেজি (সম্পূর্ণ বপন সময়)
-- এমওপি: ৮০-১০০ কেজি (২ ভাগে)
-- জিঙ্ক: ৫ কেজি (বপন সময়)
-
-**সেচ সময়সূচি:**
-১. প্রথম সেচ: বীজ বপনের ২১ দিন পর
-২. দ্বিতীয় সেচ: ৪৫-৫০ দিন পর (কান্ড বের হওয়ার সময়)
-৩. তৃতীয় সেচ: ৭০-৭৫ দিন পর (দানা গঠনের সময়)
-
-**রোগ ব্যবস্থাপনা:**
-- দাগ রোগ: প্রোপিকোনাজল ২৫% EC (০.৫ মিলি/লিটার)
-- গম মাজরা: ইমিডাক্লোপ্রিড ১৭.৮% SL (০.৩ মিলি/লিটার)
-- পাতার মরিচা: টেবুকোনাজল ২৫০ EC (১ মিলি/লিটার)
-
-**আর্থিক বিশ্লেষণ:**
-- বীজ খরচ: ১২০-১৫০ কেজি/হেক্টর × ৪০ টাকা = ৪,৮০০-৬,০০০ টাকা
-- সার খরচ: ১০,০০০-১২,০০০ টাকা
-- শ্রম খরচ: ৮,০০০-১০,০০০ টাকা
-- **মোট খরচ:** ২৫,০০০-৩০,০০০ টাকা/হেক্টর
-- **আনুমানিক উৎপাদন:** ৩-৩.৫ টন/হেক্টর
-- **বর্তমান মূল্য:** ৩৫-৪০ টাকা/কেজি
-- **সম্ভাব্য আয়:** ১,০৫,০০০-১,৪০,০০০ টাকা/হেক্টর
-- **লাভ:** ৭৫,০০০-১,১০,০০০ টাকা/হেক্টর
-
-**জলবায়ু সহনশীল পদ্ধতি:**
-১. কম পানি প্রয়োজন (শুধু ৩টি সেচ)
-২. শীতকালীন ফসল (পানি কম লাগে)
-৩. মাটির আর্দ্রতা সংরক্ষণ করুন
-
-আপনার জমির অবস্থা সম্পর্কে আরও জানালে ব্যক্তিগতকৃত পরামর্শ দিতে পারি! 🌱""",
-
-        "সার": """🌱 **সার প্রয়োগের বিজ্ঞানসম্মত পদ্ধতি:**
-
-**মাটি পরীক্ষা:**
-- স্থানীয় কৃষি অফিসে নমুনা পাঠান
-- ফলাফল অনুযায়ী সার নির্ধারণ করুন
-- প্রতি ২ বছর পরপর পরীক্ষা করুন
-
-**সারের ধরন ও পরিমাণ:**
-
-**১. জৈব সার (মৌলিক):**
-- গোবর সার: ১০-১৫ টন/হেক্টর (মাটি তৈরির সময়)
-- কম্পোস্ট: ৫-৭ টন/হেক্টর
-- সবুজ সার: ধৈঞ্চা, সনপাটা (২-৩ টন/হেক্টর)
-
-**২. রাসায়নিক সার (বাংলাদেশ প্রমিত):**
-- **ইউরিয়া** (নাইট্রোজেন):
-  * ধান: ২৫০-৩০০ কেজি/হেক্টর
-  * গম: ২০০-২২০ কেজি/হেক্টর  
-  * সবজি: ১৫০-২০০ কেজি/হেক্টর
-  * প্রয়োগ পদ্ধতি: ৩ ভাগে (বপন, ৩০ ও ৫০ দিন পর)
-
-- **টিএসপি** (ফসফরাস):
-  * সব ফসল: ১৫০-২০০ কেজি/হেক্টর
-  * প্রয়োগ: সম্পূর্ণ মাটিতে মিশিয়ে
-
-- **এমওপি** (পটাশ):
-  * ধান/গম: ১০০-১৫০ কেজি/হেক্টর
-  * সবজি: ১২০-১৮০ কেজি/হেক্টর
-  * প্রয়োগ: ২ ভাগে (বপন ও মধ্য মৌসুম)
-
-**৩. সুষম সার মিশ্রণ (প্রতি হেক্টর):**
-- ধানের জন্য: ইউরিয়া ২৭৫ + টিএসপি ১৭৫ + এমওপি ১২৫ কেজি
-- গমের জন্য: ইউরিয়া ২১০ + টিএসপি ১৯০ + এমওপি ৯০ কেজি
-- আলুর জন্য: ইউরিয়া ৩০০ + টিএসপি ২৫০ + এমওপি ২০০ কেজি
-
-**প্রয়োগের সঠিক সময়:**
-- সকাল ৮-১১টা বা বিকাল ৪-৬টা
-- বৃষ্টির পূর্বাভাস থাকলে প্রয়োগ করবেন না
-- মাটি ভেজা থাকলে সার দিন
-
-**খরচ বিশ্লেষণ (প্রতি হেক্টর):**
-- ইউরিয়া: ২৭৫ কেজি × ২২ টাকা = ৬,০৫০ টাকা
-- টিএসপি: ১৭৫ কেজি × ৩৫ টাকা = ৬,১২৫ টাকা  
-- এমওপি: ১২৫ কেজি × ৩০ টাকা = ৩,৭৫০ টাকা
-- **মোট:** ১৫,৯২৫ টাকা/হেক্টর
-
-**টিপস:**
-১. জৈব ও রাসায়নিক সারের সমন্বয় করুন
-২. গাছের অবস্থা দেখে সার দিন
-৩. অতিরিক্ত সার প্রয়োগ করবেন না
-৪. মাটির pH ৬.০-৬.৫ রাখুন
-
-কোন ফসলের জন্য সার সম্পর্কে জানতে চান? 🌾""",
-
-        "বন্যা": f"""🌊 **বন্যা পূর্বাভাস ও ব্যবস্থাপনা:**
-
-**বর্তমান অবস্থা:** {datetime.now().strftime('%d %B, %Y')}
-
-**বন্যা পূর্বাভাস (এক সপ্তাহ):**
-- উত্তরাঞ্চল: মধ্যম থেকে উচ্চ ঝুঁকি
-- মধ্যাঞ্চল: নিম্ন থেকে মধ্যম ঝুঁকি
-- দক্ষিণাঞ্চল: নিম্ন ঝুঁকি
-
-**তাৎক্ষণিক পদক্ষেপ (২৪-৪৮ ঘণ্টা আগে):**
-
-**১. ফসল সুরক্ষা:**
-- দ্রুত পাকা ফসল সংগ্রহ করুন
-- অপরিপক্ক ফসলের জন্য বাঁধ তৈরি করুন
-- বীজ উঁচু ও শুষ্ক স্থানে সরিয়ে নিন
-
-**২. গবাদিপশু সুরক্ষা:**
-- নিরাপদ উঁচু স্থানে নিয়ে যান
-- ৭ দিনের খাদ্য মজুদ করুন
-- প্রাথমিক চিকিৎসার সরঞ্জাম রাখুন
-
-**৩. জরুরি প্রস্তুতি:**
-- গুরুত্বপূর্ণ কাগজপত্র ওয়াটারপ্রুফ ব্যাগে রাখুন
-- ৩ দিনের খাবার ও পানীয় জল মজুদ
-- জরুরি নম্বর: ৯৯৯, ১০৯০, ১০৬
-
-**বন্যার সময় করণীয়:**
-
-**ফসল রক্ষা পদ্ধতি:**
-১. **দ্রুত নিষ্কাশন:** জলাবদ্ধতা দূর করুন
-২. **সার প্রয়োগ:** বন্যার পর ইউরিয়া (৫০ কেজি/হেক্টর)
-৩. **রোগ প্রতিরোধ:** ব্যাকটেরিয়াল ব্লাইটের জন্য কপার অক্সিক্লোরাইড
-৪. **পুনর্বাসন:** ৭-১০ দিন পর নতুন চারা রোপণ
-
-**সরকারি সহায়তা:**
-- ফসল বীমা ক্লেইম: ৩০ দিনের মধ্যে
-- জরুরি ঋণ: কৃষি ব্যাংক থেকে
-- বিনামূল্যে বীজ: স্থানীয় কৃষি অফিস থেকে
-
-**বন্যা-পরবর্তী ব্যবস্থাপনা:**
-
-**১. মাটি ব্যবস্থাপনা:**
-- চুন প্রয়োগ: ১ টন/হেক্টর (pH সামঞ্জস্য)
-- জৈব সার: ৫ টন/হেক্টর (উর্বরতা ফিরিয়ে আনতে)
-
-**২. ফসল পরিকল্পনা:**
-- স্বল্পমেয়াদী ফসল: মটর, মসুর, সরিষা
-- সবজি: পালং, লালশাক, ডাঁটা
-- ৬০ দিনের ফসল: মুগ ডাল, মাসকলাই
-
-**৩. আর্থিক পুনরুদ্ধার:**
-- বীমা ক্লেইম: ৯০% ক্ষতিপূরণ
-- পুনর্বাসন ঋণ: ৫% সুদে
-- ভর্তুকি: বীজ ও সারে ৫০% ভর্তুকি
-
-**আপডেট তথ্য পাওয়ার উপায়:**
-১. কৃষি হেল্পলাইন: ১৬১২৩
-২. আবহাওয়া অধিদপ্তর: ০৯৬১১৬৭৭৭৭৭
-৩. জেলা কৃষি অফিস: স্থানীয় নম্বর
-
-আপনার এলাকার বন্যা ঝুঁকি সম্পর্কে জানালে নির্দিষ্ট পরামর্শ দিতে পারি! 🚨""",
-
-        "ঋণ": """💰 **কৃষি ঋণ ও আর্থিক সহায়তা:**
-
-**সরকারি কৃষি ঋণ স্কিম ২০২৪:**
-
-**১. কিসান ক্রেডিট কার্ড:**
-- সর্বোচ্চ সীমা: ৫,০০,০০০ টাকা
-- সুদের হার: ৪% (সরকারিভাবে ভর্তুকি)
-- মেয়াদ: ৩ বছর
-- আবেদনের জায়গা: যেকোন ব্যাংক
-- প্রয়োজনীয় কাগজ:
-  * জাতীয় পরিচয়পত্র
-  * জমির দলিল/চালান
-  * পাসপোর্ট সাইজ ছবি (২ কপি)
-  * ফসল পরিকল্পনা
-
-**২. বিশেষ কৃষি ঋণ:**
-- যান্ত্রিকীকরণ ঋণ: ১০ লক্ষ টাকা পর্যন্ত
-- শীতকালীন ফসল ঋণ: ৩ লক্ষ টাকা পর্যন্ত
-- সবজি চাষ ঋণ: ২ লক্ষ টাকা পর্যন্ত
-- মৎস্য চাষ ঋণ: ৫ লক্ষ টাকা পর্যন্ত
-
-**৩. জরুরি বন্যা ঋণ:**
-- সর্বোচ্চ: ১,০০,০০০ টাকা
-- সুদ: ০% (প্রথম ৬ মাস)
-- মেয়াদ: ২ বছর
-- কাগজপত্র: মাত্র পরিচয়পত্র
-
-**আবেদন প্রক্রিয়া:**
-
-**ধাপ ১: প্রস্তুতি**
-- কৃষি অফিস থেকে সার্টিফিকেট নিন
-- ব্যাংক নির্বাচন করুন (সোনালী, জনতা, অগ্রণী)
-- সমস্ত কাগজপত্র প্রস্তুত করুন
-
-**ধাপ ২: আবেদন**
-- ফরম পূরণ করুন (ব্যাংক থেকে নিন)
-- কিস্তি পরিকল্পনা তৈরি করুন
-- জামানত ব্যবস্থা করুন
-
-**ধাপ ৩: অনুমোদন**
-- সময়: ৭-১০ কর্মদিবস
-- টাকা স্থানান্তর: ব্যাংক অ্যাকাউন্টে
-
-**খরচ বিশ্লেষণ:**
-
-**ধান চাষের জন্য ঋণ (১ হেক্টর):**
-- বীজ: ৫,০০০ টাকা
-- সার: ১৫,০০০ টাকা
-- কীটনাশক: ৫,০০০ টাকা
-- শ্রম: ১০,০০০ টাকা
-- **মোট প্রয়োজন:** ৩৫,০০০ টাকা
-- **ঋণ সুদ (১ বছর):** ১,৪০০ টাকা
-- **নিট লাভ:** ৮০,০০০-১,০০,০০০ টাকা
-
-**ফসল বীমা:**
-- প্রিমিয়াম: উৎপাদন খরচের ৫%
-- কভারেজ: ৯০% ক্ষতি পর্যন্ত
-- ক্লেইম সময়: ৩০ দিন
-
-**ডিজিটাল পদ্ধতি:**
-১. **নগদ** অ্যাপ: কৃষি ঋণ বিভাগ
-২. **বিকাশ**: *২৪৭# ডায়াল করুন
-৩. **নগদ**: *১২৬# ডায়াল করুন
-
-**টিপস:**
-১. ছোট ঋণ দিয়ে শুরু করুন
-২. নির্দিষ্ট ফসলের জন্য ঋণ নিন
-৩. সময়মতো কিস্তি পরিশোধ করুন
-৪. রেকর্ড সংরক্ষণ করুন
-
-কোন ধরনের ঋণ সম্পর্কে জানতে চান? 📞"""
-    }
-    
-    # Keyword matching
-    for keyword, response in responses.items():
-        if keyword in question_lower:
-            return {
-                "answer": response,
-                "tokens_used": len(response.split()),
-                "model": "JolBondhu_AI"
-            }
+    # No exact keyword: closest fallback guide by character n-gram similarity
+    if keyword is None and answer_retriever is not None:
+        doc, score = answer_retriever.best(question_lower, kind="fallback")
+        if doc and score >= RETRIEVAL_MIN_SCORE:
+            keyword, similarity = doc["key"], round(score, 3)
     
-    # Default intelligent response
-    default_response = f"""🤖 **আপনাকে স্বাগতম! আমি JolBondhu, আপনার কৃষি সহকারী।**
-
-আপনার প্রশ্নটি কৃষি সম্পর্কিত নির্দিষ্ট করলে আরও ভালোভাবে সাহায্য করতে পারব। 
-
-**আপন যা জানতে পারেন:**
-🌾 **ধান চাষ** - বীজ বপন থেকে সংগ্রহ পর্যন্ত সম্পূর্ণ গাইড
-🌾 **গম চাষ** - শীতকালীন ফসলের আধুনিক পদ্ধতি
-🌱 **সার ব্যবস্থাপনা** - বিজ্ঞানসম্মত সার প্রয়োগ পদ্ধতি
-💧 **সেচ ব্যবস্থাপনা** - পানি সাশ্রয়ী কৃষি
-🐛 **রোগ-পোকা দমন** - সমন্বিত বালাই ব্যবস্থাপনা
-💰 **কৃষি ঋণ** - সরকারি সহায়তা ও ঋণ স্কিম
-🌊 **বন্যা ব্যবস্থাপনা** - দুর্যোগে ফসল রক্ষা
-📊 **বাজার তথ্য** - ফসলের দাম ও বিপণন
-
-**বর্তমান মৌসুম:** {current_season}
-**সেরা চাষ:** {get_recommended_crops(current_month)}
-
-**উদাহরণ প্রশ্ন:**
-- "ধান চাষের সম্পূর্ণ খরচ কত?"
-- "গমের বীজ কোথায় পাবো?"
-- "সার কিভাবে প্রয়োগ করব?"
-- "ফসলের রোগের সমাধান কি?"
-
-আপনার প্রশ্নটি আরও স্পষ্ট করে বলুন, আমি আপনাকে বিস্তারিত ও ব্যবহারিক সমাধান দেব! 🌱
-
-**জরুরি সাহায্যের জন্য:** ১৬১২৩ (কৃষি হেল্পলাইন)"""
+    answer, tokens = knowledge_index.fallback_text(keyword, datetime.now().date(), fallback_placeholders)
+    return {
+        "answer": answer,
+        "tokens_used": tokens,
+        "model": "JolBondhu_AI",
+        "similarity": similarity
+    }
 
+def fallback_placeholders() -> Dict[str, str]:
+    """Date and season values filled into the fallback texts (once per day)"""
     return {
-        "answer": default_response,
-        "tokens_used": len(default_response.split()),
-        "model": "JolBondhu_AI"
+        "current_season": get_current_season(),
+        "recommended_crops": get_recommended_crops(datetime.now().month),
+        "today": datetime.now().strftime('%d %B, %Y'),
     }
 
 def get_current_season():
@@ -1708,12 +1551,17 @@ async def chat_with_farmer(request: ChatRequest):
     try:
         if request.stream:
             # For streaming response
-            result = get_deepseek_response(request.question, stream=True)
-            if result.get("stream"):
-                return {"stream": True, "response": result["response"]}
+            return await stream_chat_response(request.question, request.session_id)
         
-        # Normal response
-        result = get_deepseek_response(request.question)
+        # Normal response; cached answers only fit questions asked without prior context
+        history = conversation_memory.messages(request.session_id) if request.session_id else []
+        if history:
+            result = await get_deepseek_response(request.question, history=history, session_id=request.session_id)
+            is_cached = False
+        else:
+            result, is_cached = await get_cached_answer(request.question, request.session_id)
+        if result.get("model") != "JolBondhu_AI":
+            remember_turn(request.session_id, request.question, result["answer"])
         
         response_data = {
             "status": "success",
@@ -1727,6 +1575,8 @@ async def chat_with_farmer(request: ChatRequest):
                 "metadata": {
                     "tokens_used": result.get("tokens_used", 0),
                     "model": result.get("model", "deepseek-chat"),
+                    "cached": is_cached,
+                    "usage": result.get("usage"),
                     "timestamp": datetime.now().isoformat()
                 }
             }
@@ -1735,7 +1585,7 @@ async def chat_with_farmer(request: ChatRequest):
         return response_data
         
     except Exception as e:
-        print(f"Chat error: {e}")
+        logger.exception("Chat error: %s", e)
         # Return fallback response
         fallback = get_fallback_response(request.question)
         return {
@@ -1750,79 +1600,305 @@ async def chat_with_farmer(request: ChatRequest):
             }
         }
 
-@app.get("/chat/stream")
-async def chat_stream(question: str):
-    """SSE endpoint for streaming responses"""
+# Streaming relay: a bounded queue between the upstream reader and the client.
+# A slow client fills the queue, the reader stops pulling from DeepSeek, and a
+# client that stalls for STREAM_CLIENT_STALL_S (or disconnects) ends the upstream call.
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "32"))
+STREAM_CLIENT_STALL_S = float(os.getenv("STREAM_CLIENT_STALL_S", "30"))
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def pump_deepseek_deltas(response, queue: asyncio.Queue, usage: Optional[Dict[str, Any]] = None):
+    """
+    Read DeepSeek SSE lines and queue their content deltas; always closes the upstream response.
+    The final usage chunk, if any, is copied into usage. Returns None when the
+    upstream stream ended normally, otherwise why it was cut short.
+    """
+    try:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event_data = line[5:].strip()
+            if event_data == "[DONE]":
+                break
+            try:
+                data = json.loads(event_data)
+            except ValueError:
+                continue
+            if data.get('usage') and usage is not None:
+                usage.update(data['usage'])
+            choices = data.get('choices') or [{}]
+            content = choices[0].get('delta', {}).get('content')
+            if content:
+                await asyncio.wait_for(queue.put(content), STREAM_CLIENT_STALL_S)
+    except asyncio.TimeoutError:
+        logger.warning("Stream client stalled for %ss, closing upstream", STREAM_CLIENT_STALL_S)
+        return "client stalled"
+    except Exception as e:
+        logger.error("Stream relay error: %s", e)
+        return "upstream error"
+    finally:
+        await response.aclose()
+    return None
+
+async def relay_stream(response, on_complete: Optional[Callable[[str], None]] = None,
+                       usage: Optional[Dict[str, Any]] = None,
+                       release: Optional[Callable[[], None]] = None):
+    """
+    SSE events for one DeepSeek stream; cancelling the generator cancels the upstream read.
+    on_complete gets the full answer once the upstream stream has ended, the
+    final event carries the token accounting in usage, and release frees the
+    scheduler slot when the relay ends. A stream cut short ends with
+    "error": true in its done event and never reaches on_complete.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    upstream_usage: Dict[str, Any] = {}
+    pump = asyncio.create_task(pump_deepseek_deltas(response, queue, upstream_usage))
+    getter = None
+    parts = []
     try:
-        result = get_deepseek_response(question, stream=True)
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, pump}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                parts.append(getter.result())
+                yield sse_event({'content': parts[-1]})
+                continue
+            getter.cancel()
+            # Upstream finished: flush what is left, then stop
+            while not queue.empty():
+                parts.append(queue.get_nowait())
+                yield sse_event({'content': parts[-1]})
+            break
+        failure = pump.result()
+        if failure is None and on_complete is not None and parts:
+            on_complete("".join(parts))
+        done: Dict[str, Any] = {'done': True}
+        if failure is not None:
+            done.update({'error': True, 'detail': failure})
+        if usage is not None:
+            usage.update({name: upstream_usage.get(name, 0) for name in DEEPSEEK_USAGE_FIELDS})
+            done['usage'] = usage
+        yield sse_event(done)
+    finally:
+        # Runs on normal end and when Starlette cancels us on client disconnect.
+        # A disconnect can cancel the await below as well, so the slot is tied to
+        # the pump finishing (it always does once cancelled) before anything awaits.
+        if release is not None:
+            pump.add_done_callback(lambda _: release())
+        if getter is not None:
+            getter.cancel()
+        if not pump.done():
+            pump.cancel()
+        # wait() rather than gather(): being cancelled here must not cancel the pump's aclose
+        await asyncio.wait({pump})
+
+class RelayStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that always runs cleanup once it is done, including when
+    the client left before the body iterator was ever started (its finally never runs then)
+    """
+    def __init__(self, content, cleanup: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.cleanup()
+
+async def stream_chat_response(question: str, session_id: Optional[str] = None) -> StreamingResponse:
+    history = conversation_memory.messages(session_id) if session_id else []
+    result = await get_deepseek_response(question, stream=True, history=history, session_id=session_id)
+    
+    if result.get("stream"):
+        release = result["release"]  # idempotent
+        relay = relay_stream(result["response"], lambda answer: remember_turn(session_id, question, answer),
+                             result.get("usage"), release)
         
-        if result.get("stream"):
-            response = result["response"]
-            
-            async def event_generator():
-                client = sseclient.SSEClient(response.iter_lines())
-                
-                for event in client.events():
-                    if event.data != "[DONE]":
-                        try:
-                            data = json.loads(event.data)
-                            if 'choices' in data and data['choices']:
-                                delta = data['choices'][0].get('delta', {})
-                                if 'content' in delta:
-                                    yield f"data: {json.dumps({'content': delta['content']})}\n\n"
-                        except:
-                            continue
-                
-                yield f"data: {json.dumps({'done': True})}\n\n"
-            
-            return EventSourceResponse(event_generator())
+        async def cleanup():
+            release()
+            await relay.aclose()
+            await result["response"].aclose()
+        
+        return RelayStreamingResponse(relay, cleanup, media_type="text/event-stream", headers=SSE_HEADERS)
     
+    # Upstream unavailable: send the fallback answer as a single event
+    async def fallback_generator():
+        yield sse_event({'content': result['answer']})
+        yield sse_event({'done': True})
+    
+    return StreamingResponse(fallback_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/chat/stream")
+async def chat_stream(question: str, session_id: Optional[str] = None):
+    """SSE endpoint for streaming responses"""
+    try:
+        return await stream_chat_response(question, session_id)
     except Exception as e:
-        print(f"Stream error: {e}")
+        logger.exception("Stream error: %s", e)
         raise HTTPException(status_code=500, detail="Streaming failed")
 
+# Follow-up suggestions: the first rule whose keywords appear in the question
+FOLLOW_UP_RULES = [
+    (['ধান', 'rice'], [
+        "ধান চাষের সম্পূর্ণ খরচ কত?",
+        "বোরো ধানের সেরা জাত কোনটি?",
+        "ধান ক্ষেতে রোগ দমন কিভাবে করব?",
+        "ধান চাষে লাভ কত?"
+    ]),
+    (['সার', 'fertilizer'], [
+        "ইউরিয়া সারের দাম কত?",
+        "জৈব সার কিভাবে তৈরি করব?",
+        "সার প্রয়োগের সঠিক সময় কখন?",
+        "কোন সার কত টাকা?"
+    ]),
+    (['বন্যা', 'flood'], [
+        "বন্যার আগে কী প্রস্তুতি নেব?",
+        "বন্যার পর ফসল পুনরুদ্ধার কিভাবে করব?",
+        "বন্যা সহনশীল ফসল কোনগুলো?",
+        "বন্যা ঋণ কিভাবে পাব?"
+    ]),
+    (['ঋণ', 'loan', 'credit'], [
+        "কৃষি ঋণের সুদ কত?",
+        "ঋণ পেতে কতদিন লাগে?",
+        "কোন ব্যাংকে আবেদন করব?",
+        "জামানত ছাড়া ঋণ পাব?"
+    ]),
+]
+DEFAULT_FOLLOW_UPS = [
+    "ধান চাষের খরচ কত?",
+    "গম চাষের সেরা সময় কখন?",
+    "কৃষি ঋণ কিভাবে পাবো?",
+    "বন্যার সময় ফসল বাচাবো কিভাবে?"
+]
+
 def generate_follow_up(question: str) -> List[str]:
     """Generate intelligent follow-up questions"""
     question_lower = question.lower()
     
-    if any(word in question_lower for word in ['ধান', 'rice']):
-        return [
-            "ধান চাষের সম্পূর্ণ খরচ কত?",
-            "বোরো ধানের সেরা জাত কোনটি?",
-            "ধান ক্ষেতে রোগ দমন কিভাবে করব?",
-            "ধান চাষে লাভ কত?"
-        ]
-    
-    elif any(word in question_lower for word in ['সার', 'fertilizer']):
-        return [
-            "ইউরিয়া সারের দাম কত?",
-            "জৈব সার কিভাবে তৈরি করব?",
-            "সার প্রয়োগের সঠিক সময় কখন?",
-            "কোন সার কত টাকা?"
-        ]
+    for keywords, questions in FOLLOW_UP_RULES:
+        if any(word in question_lower for word in keywords):
+            return list(questions)
+    
+    return list(DEFAULT_FOLLOW_UPS)
+
+# Cache shared by all workers on the host (one SQLite file in WAL mode). Each
+# worker keeps its in-memory TTLCache in front of it; on a miss there, a lease
+# makes sure only one worker calls NASA POWER or DeepSeek for a given key.
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "shared_cache.db")
+# Cap on how long a worker trusts its in-memory copy of shared weather, so
+# DELETE /cache on one worker reaches the others within this time
+SHARED_CACHE_L1_TTL_S = float(os.getenv("SHARED_CACHE_L1_TTL_S", "60"))
+# Per namespace; answers are keyed on free text, so the file would otherwise keep growing
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "20000"))
+shared_weather = None
+shared_answers = None
+shared_snapshot = None  # /alldistricts snapshot and the scheduler lease
+
+def initialize_shared_cache():
+    global shared_weather, shared_answers, shared_snapshot
+    try:
+        # Leases outlast the upstream timeouts (NASA 30s; DeepSeek queue wait + 60s)
+        shared_weather = SharedCache(SHARED_CACHE_PATH, "weather", lease_s=60.0, max_entries=SHARED_CACHE_MAX_ENTRIES)
+        shared_answers = SharedCache(SHARED_CACHE_PATH, "answers", lease_s=90.0, max_entries=SHARED_CACHE_MAX_ENTRIES)
+        shared_snapshot = SharedCache(SHARED_CACHE_PATH, "snapshot")
+        pruned = shared_weather.trim() + shared_answers.trim() + shared_snapshot.trim()
+        logger.info("🤝 Shared cache ready at %s (%d expired or over the cap pruned)", SHARED_CACHE_PATH, pruned)
+    except Exception as e:
+        logger.warning("⚠️ Could not open shared cache, caching per worker only: %s", e)
+        shared_weather = shared_answers = shared_snapshot = None
+
+# DeepSeek answer cache keyed on the normalized question and the current season.
+# Entries live in memory (TTL + LRU) in front of the shared cache, which keeps
+# them across restarts. Fallback answers are never cached.
+ANSWER_CACHE_MAXSIZE = int(os.getenv("ANSWER_CACHE_MAXSIZE", "4096"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", str(7 * 24 * 3600)))
+ANSWER_CACHE_WARMUP = os.getenv("ANSWER_CACHE_WARMUP", "1") == "1"
+answer_cache = TTLCache(maxsize=ANSWER_CACHE_MAXSIZE, ttl=ANSWER_CACHE_TTL_S, name="answer_cache")
+answer_warmup_task = None
+
+class UncachedAnswer(Exception):
+    """Raised inside the cache loader so a fallback answer is returned but not stored"""
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__("fallback answer")
+        self.result = result
+
+def initialize_answer_cache():
+    """Load live shared answers into memory"""
+    if shared_answers is None:
+        return
+    try:
+        now = time.time()
+        loaded = shared_answers.load_live(ANSWER_CACHE_MAXSIZE)
+        for key, result, expires_at in reversed(loaded):
+            answer_cache.set(key, result, ttl=expires_at - now)
+        logger.info("💬 Answer cache ready (%d loaded from shared cache)", len(loaded))
+    except Exception as e:
+        logger.warning("⚠️ Could not load shared answers: %s", e)
+
+def answer_cache_key(question: str) -> str:
+    return f"{get_current_season()}|{normalize_question(question)}"
+
+async def get_cached_answer(question: str, session_id: Optional[str] = None):
+    """
+    (DeepSeek result, from_cache) for a question; repeated questions cost no upstream call.
+    The key ignores session_id, which only tells the scheduler whose fair share a miss uses.
+    """
+    key = answer_cache_key(question)
     
-    elif any(word in question_lower for word in ['বন্যা', 'flood']):
-        return [
-            "বন্যার আগে কী প্রস্তুতি নেব?",
-            "বন্যার পর ফসল পুনরুদ্ধার কিভাবে করব?",
-            "বন্যা সহনশীল ফসল কোনগুলো?",
-            "বন্যা ঋণ কিভাবে পাব?"
-        ]
+    async def fetch():
+        result = await get_deepseek_response(question, session_id=session_id)
+        if result.get("model") == "JolBondhu_AI":
+            raise UncachedAnswer(result)
+        return {**result, "expires_at": time.time() + ANSWER_CACHE_TTL_S}
     
-    elif any(word in question_lower for word in ['ঋণ', 'loan', 'credit']):
-        return [
-            "কৃষি ঋণের সুদ কত?",
-            "ঋণ পেতে কতদিন লাগে?",
-            "কোন ব্যাংকে আবেদন করব?",
-            "জামানত ছাড়া ঋণ পাব?"
-        ]
+    async def load():
+        if shared_answers is None:
+            return await fetch()
+        result, _ = await shared_answers.get_or_load(key, fetch, ttl=lambda r: r["expires_at"] - time.time())
+        return result
     
-    return [
-        "ধান চাষের খরচ কত?",
-        "গম চাষের সেরা সময় কখন?",
-        "কৃষি ঋণ কিভাবে পাবো?",
-        "বন্যার সময় ফসল বাচাবো কিভাবে?"
-    ]
+    try:
+        return await answer_cache.get_or_load(key, load, ttl=lambda r: r["expires_at"] - time.time())
+    except UncachedAnswer as e:
+        return e.result, False
+
+async def warm_answer_cache():
+    """Pre-fetch answers for every suggested follow-up question"""
+    if not DEEPSEEK_API_KEY:
+        logger.info("💬 Answer cache warm-up skipped (no DeepSeek API key)")
+        return
+    questions = list(dict.fromkeys(q for _, qs in FOLLOW_UP_RULES for q in qs))
+    questions += [q for q in DEFAULT_FOLLOW_UPS if q not in questions]
+    for question in questions:
+        if answer_cache_key(question) in answer_cache:
+            continue
+        try:
+            await get_cached_answer(question)
+        except Exception as e:
+            logger.warning("Answer warm-up failed for %r: %s", question, e)
+    warmed = sum(answer_cache_key(q) in answer_cache for q in questions)
+    logger.info("💬 Answer cache warmed (%d/%d follow-up questions cached)", warmed, len(questions))
+
+def start_answer_warmup():
+    """Once per process; only the scheduler worker calls this"""
+    global answer_warmup_task
+    if ANSWER_CACHE_WARMUP and answer_warmup_task is None:
+        answer_warmup_task = background_task(warm_answer_cache())
+
+async def stop_answer_warmup():
+    global answer_warmup_task
+    if answer_warmup_task is not None:
+        answer_warmup_task.cancel()
+        try:
+            await answer_warmup_task
+        except asyncio.CancelledError:
+            pass
+        answer_warmup_task = None
 
 # Other endpoints (flood, crop, emergency) remain the same...
 # Add them from previous code
@@ -1831,21 +1907,70 @@ class PredictionRequest(BaseModel):
     lon: float
     district: Optional[str] = None
 
-# Simple in-memory cache for risk calculations
-risk_cache = {}
+# Bounded in-memory cache of NASA POWER weather, one entry per grid cell
+RISK_CACHE_MAXSIZE = int(os.getenv("RISK_CACHE_MAXSIZE", "2048"))
+RISK_CACHE_TTL_S = float(os.getenv("RISK_CACHE_TTL_S", "300"))
+risk_cache = TTLCache(maxsize=RISK_CACHE_MAXSIZE, ttl=RISK_CACHE_TTL_S, name="risk_cache")
 
-def get_cached_risk_data(lat: float, lon: float, district_name: str = None):
-    """Cached risk calculation"""
-    cache_key = f"{lat:.4f}_{lon:.4f}"
+# NASA POWER meteorology (MERRA-2) grid: 0.5° latitude x 0.625° longitude.
+# Every point inside a cell gets identical data, so we fetch and cache per cell.
+NASA_POWER_LAT_STEP = 0.5
+NASA_POWER_LON_STEP = 0.625
+
+def nasa_power_cell(lat: float, lon: float):
+    """Snap a point to the centre of its NASA POWER grid cell"""
+    cell_lat = round(lat / NASA_POWER_LAT_STEP) * NASA_POWER_LAT_STEP
+    cell_lon = round((lon + 180) / NASA_POWER_LON_STEP) * NASA_POWER_LON_STEP - 180
+    return round(cell_lat, 3), round(cell_lon, 3)
+
+def nasa_power_cell_key(lat: float, lon: float) -> str:
+    cell_lat, cell_lon = nasa_power_cell(lat, lon)
+    return f"{cell_lat:.3f}_{cell_lon:.3f}"
+
+def district_cell_keys(name: str) -> List[str]:
+    """
+    Keys of every NASA POWER cell overlapping a district's boundary polygons
+    (their bounding boxes, so a few neighbouring cells may be included), or of
+    the cell holding its centre when boundaries are not loaded
+    """
+    bounds = district_index.bounds(name) if district_index is not None else []
+    if not bounds:
+        info = BANGLADESH_DISTRICTS[name]
+        return [nasa_power_cell_key(info["lat"], info["lon"])]
+    keys = set()
+    for min_lon, min_lat, max_lon, max_lat in bounds:
+        lat_cells = range(round(min_lat / NASA_POWER_LAT_STEP), round(max_lat / NASA_POWER_LAT_STEP) + 1)
+        lon_cells = range(round((min_lon + 180) / NASA_POWER_LON_STEP), round((max_lon + 180) / NASA_POWER_LON_STEP) + 1)
+        keys.update(nasa_power_cell_key(i * NASA_POWER_LAT_STEP, j * NASA_POWER_LON_STEP - 180)
+                    for i in lat_cells for j in lon_cells)
+    return sorted(keys)
+
+@traced("weather")
+async def get_cached_weather(lat: float, lon: float):
+    """Weather for the grid cell containing (lat, lon), fetched once per cell"""
+    cell_lat, cell_lon = nasa_power_cell(lat, lon)
+    cache_key = nasa_power_cell_key(lat, lon)
+    
+    # Concurrent misses for the same cell share one NASA call, across workers too
+    from_shared = False
+    
+    async def load():
+        nonlocal from_shared
+        if shared_weather is None:
+            return await get_nasa_rainfall(cell_lat, cell_lon)
+        weather_data, from_shared = await shared_weather.get_or_load(
+            cache_key, lambda: get_nasa_rainfall(cell_lat, cell_lon), ttl=weather_cache_ttl
+        )
+        return weather_data
     
-    # Check cache (5 minute cache)
-    if cache_key in risk_cache:
-        cached_time, cached_data = risk_cache[cache_key]
-        if time.time() - cached_time < 300:  # 5 minutes
-            return cached_data, True, cache_key
+    weather_data, is_cached = await risk_cache.get_or_load(cache_key, load, ttl=memory_weather_ttl)
+    return weather_data, is_cached or from_shared, cache_key
+
+async def get_cached_risk_data(lat: float, lon: float, district_name: str = None):
+    """Cached risk calculation"""
+    weather_data, is_cached, cache_key = await get_cached_weather(lat, lon)
     
-    # Calculate fresh
-    weather_data = get_nasa_rainfall(lat, lon)
+    # Zone and river scores depend on the exact point and are cheap to compute
     risk_data = calculate_flood_risk(lat, lon, weather_data)
     
     result = {
@@ -1855,123 +1980,176 @@ def get_cached_risk_data(lat: float, lon: float, district_name: str = None):
         "timestamp": datetime.now().isoformat()
     }
     
-    # Store in cache
-    risk_cache[cache_key] = (time.time(), result)
-    
-    return result, False, cache_key
+    return result, is_cached, cache_key
+
+# Persistent daily weather store: only days we don't have yet are fetched
+WEATHER_STORE_PATH = os.getenv("WEATHER_STORE_PATH", "weather_store.db")
+WEATHER_STORE_KEEP_DAYS = int(os.getenv("WEATHER_STORE_KEEP_DAYS", "30"))
+# NASA POWER publishes new daily values once a day; cached weather expires then
+NASA_POWER_PUBLISH_HOUR_UTC = int(os.getenv("NASA_POWER_PUBLISH_HOUR_UTC", "6"))
+weather_store = None
 
-def get_nasa_rainfall(lat: float, lon: float):
-    """Fetch rainfall data from NASA POWER API"""
+def initialize_weather_store():
+    global weather_store
     try:
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=7)
-        
-        end_date_str = end_date.strftime("%Y%m%d")
-        start_date_str = start_date.strftime("%Y%m%d")
-        
-        url = (
-            "https://power.larc.nasa.gov/api/temporal/daily/point"
-            f"?parameters=PRECTOTCORR,T2M,RH2M"
-            f"&community=ag"
-            f"&latitude={lat}"
-            f"&longitude={lon}"
-            f"&start={start_date_str}"
-            f"&end={end_date_str}"
-            f"&format=JSON"
-        )
-        
-        print(f"Fetching NASA data from: {url}")
-        response = requests.get(url, timeout=30)
-        data = response.json()
-        
-        if "properties" not in data:
-            print(f"NASA API response missing properties: {data}")
-            return {
-                "rainfall_3_days_mm": 0.0,
-                "rainfall_7_days_mm": 0.0,
-                "temperature_c": 25.0,
-                "humidity_percent": 70.0
-            }
-        
-        # Extract data with better error handling
-        try:
-            rain_data = data["properties"]["parameter"]["PRECTOTCORR"]
-            temp_data = data["properties"]["parameter"]["T2M"]
-            humidity_data = data["properties"]["parameter"]["RH2M"]
-            
-            print(f"Sample temp data: {list(temp_data.values())[:3] if temp_data else 'No data'}")
-            
-            # Filter out invalid values (-999)
-            valid_rain = [v for v in rain_data.values() if v is not None and v != -999.0]
-            valid_temp = [v for v in temp_data.values() if v is not None and v != -999.0]
-            valid_humidity = [v for v in humidity_data.values() if v is not None and v != -999.0]
-            
-            # Debug logging
-            print(f"Valid temp values count: {len(valid_temp)}")
-            if valid_temp:
-                print(f"Sample temp values: {valid_temp[:3]}")
-            
-            # Calculate R3 and R7
-            R3 = sum(valid_rain[-3:]) if len(valid_rain) >= 3 else 0
-            R7 = sum(valid_rain[-7:]) if len(valid_rain) >= 7 else sum(valid_rain)
-            
-            # Calculate average temperature and humidity with better validation
-            if valid_temp:
-                avg_temp_kelvin = sum(valid_temp) / len(valid_temp)
-                # Validate temperature range (NASA POWER T2M should be ~250-320 Kelvin)
-                if 200 < avg_temp_kelvin < 350:
-                    avg_temp_c = avg_temp_kelvin - 273.15
-                else:
-                    print(f"Suspicious temperature value: {avg_temp_kelvin}K")
-                    avg_temp_c = 25.0  # Default reasonable temperature
-            else:
-                avg_temp_c = 25.0
-                print("No valid temperature data, using default")
-            
-            if valid_humidity:
-                avg_humidity = sum(valid_humidity) / len(valid_humidity)
-                # Validate humidity range (0-100%)
-                if not (0 <= avg_humidity <= 100):
-                    print(f"Suspicious humidity value: {avg_humidity}%")
-                    avg_humidity = 70.0
-            else:
-                avg_humidity = 70.0
-            
-            result = {
-                "rainfall_3_days_mm": round(R3, 2),
-                "rainfall_7_days_mm": round(R7, 2),
-                "temperature_c": round(avg_temp_c, 1),
-                "humidity_percent": round(avg_humidity, 1)
-            }
-            
-            print(f"Calculated weather data: {result}")
-            return result
-            
-        except KeyError as e:
-            print(f"Missing key in NASA response: {e}")
-            print(f"Available keys: {list(data.get('properties', {}).get('parameter', {}).keys())}")
-            return {
-                "rainfall_3_days_mm": 0.0,
-                "rainfall_7_days_mm": 0.0,
-                "temperature_c": 25.0,
-                "humidity_percent": 70.0
-            }
-        
+        weather_store = WeatherStore(WEATHER_STORE_PATH)
+        cutoff = (datetime.now() - timedelta(days=WEATHER_STORE_KEEP_DAYS)).strftime("%Y%m%d")
+        pruned = weather_store.prune(cutoff)
+        logger.info("🗄️ Weather store ready at %s (%d old days pruned)", WEATHER_STORE_PATH, pruned)
     except Exception as e:
-        print(f"NASA API Error for lat={lat}, lon={lon}: {e}")
-        import traceback
-        traceback.print_exc()
-        # Return default values if API fails
+        logger.warning("⚠️ Could not open weather store: %s", e)
+        weather_store = None
+
+def last_nasa_publication() -> datetime:
+    """Most recent daily NASA POWER publication time (UTC, naive)"""
+    now = datetime.utcnow()
+    published = now.replace(hour=NASA_POWER_PUBLISH_HOUR_UTC, minute=0, second=0, microsecond=0)
+    return published if published <= now else published - timedelta(days=1)
+
+def seconds_until_next_nasa_publication() -> float:
+    next_publication = last_nasa_publication() + timedelta(days=1)
+    return max(60.0, (next_publication - datetime.utcnow()).total_seconds())
+
+def memory_weather_ttl(weather_data: dict) -> float:
+    """In-memory TTL; shorter when workers share the cache so invalidations propagate"""
+    ttl = weather_cache_ttl(weather_data)
+    return min(ttl, SHARED_CACHE_L1_TTL_S) if shared_weather is not None else ttl
+
+def weather_cache_ttl(weather_data: dict) -> float:
+    """Keep real data until NASA publishes again; retry defaults soon"""
+    if weather_data.get("days_available"):
+        return seconds_until_next_nasa_publication()
+    return RISK_CACHE_TTL_S
+
+async def fetch_nasa_daily(lat: float, lon: float, start: str, end: str) -> dict:
+    """Fetch daily values from NASA POWER as {YYYYMMDD: (rain, temp, humidity)}"""
+    logger.debug("Fetching NASA data", extra={"lat": lat, "lon": lon, "start": start, "end": end})
+    data = await upstream.nasa_power_daily(lat, lon, start, end)
+    
+    if "properties" not in data:
+        raise ValueError(f"NASA API response missing properties: {data}")
+    
+    parameters = data["properties"]["parameter"]
+    rain_data = parameters["PRECTOTCORR"]
+    temp_data = parameters["T2M"]
+    humidity_data = parameters["RH2M"]
+    
+    def valid(value):
+        # -999 marks days NASA has not published yet
+        return None if value is None or value == -999.0 else value
+    
+    return {
+        day: (valid(rain_data.get(day)), valid(temp_data.get(day)), valid(humidity_data.get(day)))
+        for day in rain_data
+    }
+
+def summarize_nasa_days(days: list) -> dict:
+    """Turn ordered daily (rain, temp, humidity) values into the weather summary"""
+    valid_rain = [d[0] for d in days if d[0] is not None]
+    valid_temp = [d[1] for d in days if d[1] is not None]
+    valid_humidity = [d[2] for d in days if d[2] is not None]
+    
+    # Calculate R3 and R7
+    R3 = sum(valid_rain[-3:]) if len(valid_rain) >= 3 else 0
+    R7 = sum(valid_rain[-7:]) if len(valid_rain) >= 7 else sum(valid_rain)
+    
+    # Calculate average temperature and humidity with better validation
+    if valid_temp:
+        avg_temp_kelvin = sum(valid_temp) / len(valid_temp)
+        # Validate temperature range (NASA POWER T2M should be ~250-320 Kelvin)
+        if 200 < avg_temp_kelvin < 350:
+            avg_temp_c = avg_temp_kelvin - 273.15
+        else:
+            logger.warning("Suspicious temperature value: %sK", avg_temp_kelvin)
+            avg_temp_c = 25.0  # Default reasonable temperature
+    else:
+        avg_temp_c = 25.0
+        logger.debug("No valid temperature data, using default")
+    
+    if valid_humidity:
+        avg_humidity = sum(valid_humidity) / len(valid_humidity)
+        # Validate humidity range (0-100%)
+        if not (0 <= avg_humidity <= 100):
+            logger.warning("Suspicious humidity value: %s%%", avg_humidity)
+            avg_humidity = 70.0
+    else:
+        avg_humidity = 70.0
+    
+    return {
+        "rainfall_3_days_mm": round(R3, 2),
+        "rainfall_7_days_mm": round(R7, 2),
+        "temperature_c": round(avg_temp_c, 1),
+        "humidity_percent": round(avg_humidity, 1),
+        "days_available": len(days)
+    }
+
+async def get_nasa_rainfall(lat: float, lon: float):
+    """Rainfall data from the local weather store, topped up from NASA POWER"""
+    # Calculate date range
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=7)
+    window = [(start_date + timedelta(days=i)).strftime("%Y%m%d") for i in range(8)]
+    cell_key = nasa_power_cell_key(lat, lon)
+    
+    stored = {}
+    if weather_store is not None:
+        stored = await asyncio.to_thread(weather_store.get_days, cell_key, window[0], window[-1])
+    known = complete_days(window, stored)
+    missing = [day for day in window if day not in known]
+    
+    # Days NASA hasn't published are only re-requested after its next update
+    should_fetch = bool(missing)
+    if should_fetch and weather_store is not None:
+        checked_at = await asyncio.to_thread(weather_store.last_checked, cell_key)
+        should_fetch = datetime.utcfromtimestamp(checked_at) < last_nasa_publication()
+    
+    if should_fetch:
+        try:
+            fetched = await fetch_nasa_daily(lat, lon, missing[0], missing[-1])
+            if weather_store is not None:
+                await asyncio.to_thread(weather_store.put_days, cell_key, fetched, time.time())
+            known.update(complete_days(window, fetched))
+        except Exception as e:
+            logger.error("NASA API Error: %s", e, extra={"lat": lat, "lon": lon})
+    
+    if not known:
+        # Return default values if no data is available
         return {
             "rainfall_3_days_mm": 0.0,
             "rainfall_7_days_mm": 0.0,
             "temperature_c": 25.0,
-            "humidity_percent": 70.0
+            "humidity_percent": 70.0,
+            "days_available": 0
         }
     
+    return summarize_nasa_days([known[day] for day in window if day in known])
+    
+# Static zone/river/elevation layers built offline by build_risk_raster.py.
+# Without the file, zone and river scores fall back to the regional rules below.
+RISK_RASTER_PATH = os.getenv(
+    "RISK_RASTER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_raster.npy"),
+)
+FACTOR_SCORES = np.array([1.0, 0.6, 0.3])  # by zone code / river distance code
+RIVER_DISTANCE_BINS_KM = [1.0, 3.0]
+risk_raster = None
+
+def initialize_risk_raster():
+    global risk_raster
+    try:
+        risk_raster = RiskRaster.load(RISK_RASTER_PATH)
+        logger.info("🗺️ Risk raster mapped: %d×%d cells at %s°", risk_raster.rows, risk_raster.cols, risk_raster.res)
+    except Exception as e:
+        logger.warning("⚠️ Risk raster unavailable, using regional rules: %s", e)
+        risk_raster = None
+
+@traced("zone")
 def get_zone_score(lat: float, lon: float):
     """Calculate flood zone score"""
+    layers = risk_raster.sample(lat, lon) if risk_raster is not None else None
+    if layers is not None:
+        code = int(layers[ZONE])
+        return float(FACTOR_SCORES[code]), ZONE_LABELS[code]
     # Northern river basin & delta
     if lat > 24.5 and lon > 89:
         return 1.0, "উচ্চ"
@@ -1982,8 +2160,13 @@ def get_zone_score(lat: float, lon: float):
     else:
         return 0.3, "নিম্ন"
 
+@traced("river")
 def get_river_score(lat: float, lon: float):
     """Calculate river proximity score"""
+    layers = risk_raster.sample(lat, lon) if risk_raster is not None else None
+    if layers is not None:
+        code = int(np.digitize(layers[RIVER_KM], RIVER_DISTANCE_BINS_KM))
+        return float(FACTOR_SCORES[code]), RIVER_DISTANCE_LABELS[code]
     # Jamuna–Padma–Meghna belt
     if 24.0 < lat < 26.0 and 89.0 < lon < 90.5:
         return 1.0, "< 1 km"
@@ -2038,6 +2221,51 @@ def calculate_flood_risk(lat: float, lon: float, weather_data: dict):
         "confidence": round(85.5, 1)
     }
 
+# Vectorized versions of the scores above, for many points at once
+RISK_LEVELS = ["নিম্ন", "মধ্যম", "উচ্চ"]
+ZONE_LABELS = ["উচ্চ", "মধ্যম", "নিম্ন"]
+RIVER_DISTANCE_LABELS = ["< 1 km", "1–3 km", "> 3 km"]
+
+def zone_score_array(lat: np.ndarray, lon: np.ndarray):
+    """Array form of get_zone_score; returns (scores, label codes into ZONE_LABELS)"""
+    codes = np.where((lat > 24.5) & (lon > 89), 0, np.where(lat > 23.5, 1, 2))
+    if risk_raster is not None:
+        layers, inside = risk_raster.sample_many(lat, lon)
+        codes = np.where(inside, layers[ZONE].astype(np.int64), codes)
+    return FACTOR_SCORES[codes], codes
+
+def river_score_array(lat: np.ndarray, lon: np.ndarray):
+    """Array form of get_river_score; returns (scores, label codes into RIVER_DISTANCE_LABELS)"""
+    belt = (lat > 24.0) & (lat < 26.0) & (lon > 89.0) & (lon < 90.5)
+    codes = np.where(belt, 0, np.where((lat > 23.0) & (lat < 24.0), 1, 2))
+    if risk_raster is not None:
+        layers, inside = risk_raster.sample_many(lat, lon)
+        codes = np.where(inside, np.digitize(layers[RIVER_KM], RIVER_DISTANCE_BINS_KM), codes)
+    return FACTOR_SCORES[codes], codes
+
+def rain_score_array(R3: np.ndarray, R7: np.ndarray) -> np.ndarray:
+    return np.minimum((0.7 * R3 + 0.3 * R7) / 150, 1.0)
+
+def calculate_flood_risk_batch(lat: np.ndarray, lon: np.ndarray, R3: np.ndarray, R7: np.ndarray) -> dict:
+    """calculate_flood_risk over arrays of points"""
+    rain_scores = rain_score_array(R3, R7)
+    zone_scores, zone_codes = zone_score_array(lat, lon)
+    river_scores, river_codes = river_score_array(lat, lon)
+    
+    flood_risk = 0.45 * rain_scores + 0.35 * zone_scores + 0.20 * river_scores
+    # Python's round() so results match calculate_flood_risk exactly
+    risk_percent = np.array([round(v, 2) for v in (flood_risk * 100).tolist()])
+    
+    return {
+        "flood_risk_percent": risk_percent,
+        "risk_level": np.digitize(risk_percent, [30, 60]),
+        "rain_score": np.array([round(v, 2) for v in rain_scores.tolist()]),
+        "zone_score": zone_scores,
+        "zone_label": zone_codes,
+        "river_score": river_scores,
+        "river_distance": river_codes
+    }
+
 def generate_advice(risk_level: str):
     """Generate advice based on risk level"""
     advice_map = {
@@ -2096,60 +2324,61 @@ async def predict_flood_risk_get(
 ):
     """GET endpoint for flood risk prediction"""
     try:
-        print(f"GET request received: district={district}, lat={lat}, lon={lon}")
+        logger.debug("GET /predicting", extra={"district": district, "lat": lat, "lon": lon})
         
         # Use cached calculation
-        cached_result, is_cached, cache_key = get_cached_risk_data(lat, lon, district)
+        cached_result, is_cached, cache_key = await get_cached_risk_data(lat, lon, district)
         
         weather_data = cached_result["weather_data"]
         risk_data = cached_result["risk_data"]
         
-        # Generate advice
-        advice = generate_advice(risk_data["risk_level"])
-        
-        # Prepare response
-        response = {
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-            "cache_info": "cached" if is_cached else "fresh",
-            "cache_key": cache_key,
-            "location": {
-                "latitude": lat,
-                "longitude": lon,
-                "district": district or "Unknown",
-                "division": "Unknown",
-                "flood_risk_factor": risk_data["flood_risk_percent"]
-            },
-            "weather_data": {
-                "rainfall_mm": weather_data["rainfall_7_days_mm"],
-                "rainfall_3_days": weather_data["rainfall_3_days_mm"],
-                "river_level_m": 3.2,
-                "humidity_percent": weather_data["humidity_percent"],
-                "temperature_c": weather_data["temperature_c"]
-            },
-            "prediction": {
-                "risk_level": risk_data["risk_level"],
-                "risk_score": risk_data["flood_risk_percent"],
-                "confidence": risk_data["confidence"],
-                "probabilities": {
-                    "low": max(0, 100 - risk_data["flood_risk_percent"]),
-                    "medium": 30 if risk_data["risk_level"] == "মধ্যম" else 20,
-                    "high": risk_data["flood_risk_percent"] if risk_data["risk_level"] == "উচ্চ" else 0,
-                    "very_high": 0
+        with span("build"):
+            # Generate advice
+            advice = generate_advice(risk_data["risk_level"])
+            
+            # Prepare response
+            response = {
+                "status": "success",
+                "timestamp": datetime.now().isoformat(),
+                "cache_info": "cached" if is_cached else "fresh",
+                "cache_key": cache_key,
+                "location": {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "district": district or "Unknown",
+                    "division": "Unknown",
+                    "flood_risk_factor": risk_data["flood_risk_percent"]
+                },
+                "weather_data": {
+                    "rainfall_mm": weather_data["rainfall_7_days_mm"],
+                    "rainfall_3_days": weather_data["rainfall_3_days_mm"],
+                    "river_level_m": 3.2,
+                    "humidity_percent": weather_data["humidity_percent"],
+                    "temperature_c": weather_data["temperature_c"]
+                },
+                "prediction": {
+                    "risk_level": risk_data["risk_level"],
+                    "risk_score": risk_data["flood_risk_percent"],
+                    "confidence": risk_data["confidence"],
+                    "probabilities": {
+                        "low": max(0, 100 - risk_data["flood_risk_percent"]),
+                        "medium": 30 if risk_data["risk_level"] == "মধ্যম" else 20,
+                        "high": risk_data["flood_risk_percent"] if risk_data["risk_level"] == "উচ্চ" else 0,
+                        "very_high": 0
+                    }
+                },
+                "detailed_scores": risk_data,
+                "advice": advice,
+                "recommendations": {
+                    "immediate": get_immediate_recommendations(risk_data["risk_level"]),
+                    "preparation": get_preparation_recommendations(risk_data["risk_level"])
                 }
-            },
-            "detailed_scores": risk_data,
-            "advice": advice,
-            "recommendations": {
-                "immediate": get_immediate_recommendations(risk_data["risk_level"]),
-                "preparation": get_preparation_recommendations(risk_data["risk_level"])
             }
-        }
         
         return response
         
     except Exception as e:
-        print(f"Error in GET /predicting: {e}")
+        logger.exception("Error in GET /predicting: %s", e)
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 # POST endpoint for prediction
@@ -2157,60 +2386,129 @@ async def predict_flood_risk_get(
 async def predict_flood_risk_post(request: PredictionRequest):
     """POST endpoint for flood risk prediction"""
     try:
-        print(f"POST request received: district={request.district}, lat={request.lat}, lon={request.lon}")
+        logger.debug("POST /predicting", extra={"district": request.district, "lat": request.lat, "lon": request.lon})
         
         # Use cached calculation
-        cached_result, is_cached, cache_key = get_cached_risk_data(request.lat, request.lon, request.district)
+        cached_result, is_cached, cache_key = await get_cached_risk_data(request.lat, request.lon, request.district)
         
         weather_data = cached_result["weather_data"]
         risk_data = cached_result["risk_data"]
         
-        # Generate advice
-        advice = generate_advice(risk_data["risk_level"])
+        with span("build"):
+            # Generate advice
+            advice = generate_advice(risk_data["risk_level"])
+            
+            # Prepare response
+            response = {
+                "status": "success",
+                "timestamp": datetime.now().isoformat(),
+                "cache_info": "cached" if is_cached else "fresh",
+                "cache_key": cache_key,
+                "location": {
+                    "latitude": request.lat,
+                    "longitude": request.lon,
+                    "district": request.district or "Unknown",
+                    "division": "Unknown",
+                    "flood_risk_factor": risk_data["flood_risk_percent"]
+                },
+                "weather_data": {
+                    "rainfall_mm": weather_data["rainfall_7_days_mm"],
+                    "rainfall_3_days": weather_data["rainfall_3_days_mm"],
+                    "river_level_m": 3.2,
+                    "humidity_percent": weather_data["humidity_percent"],
+                    "temperature_c": weather_data["temperature_c"]
+                },
+                "prediction": {
+                    "risk_level": risk_data["risk_level"],
+                    "risk_score": risk_data["flood_risk_percent"],
+                    "confidence": risk_data["confidence"],
+                    "probabilities": {
+                        "low": max(0, 100 - risk_data["flood_risk_percent"]),
+                        "medium": 30 if risk_data["risk_level"] == "মধ্যম" else 20,
+                        "high": risk_data["flood_risk_percent"] if risk_data["risk_level"] == "উচ্চ" else 0,
+                        "very_high": 0
+                    }
+                },
+                "detailed_scores": risk_data,
+                "advice": advice,
+                "recommendations": {
+                    "immediate": get_immediate_recommendations(risk_data["risk_level"]),
+                    "preparation": get_preparation_recommendations(risk_data["risk_level"])
+                }
+            }
+        
+        return response
+        
+    except Exception as e:
+        logger.exception("Error in POST /predicting: %s", e)
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+# Batch prediction for many coordinates
+BATCH_MAX_POINTS = int(os.getenv("BATCH_MAX_POINTS", "5000"))
+
+class BatchPredictionRequest(BaseModel):
+    lat: List[float]
+    lon: List[float]
+
+@app.post("/predicting/batch")
+async def predict_flood_risk_batch(request: BatchPredictionRequest):
+    """
+    Flood risk for many points. Points are grouped by NASA POWER cell so each
+    cell is fetched once; results come back as parallel arrays.
+    """
+    if len(request.lat) != len(request.lon):
+        raise HTTPException(status_code=400, detail="lat and lon must have the same length")
+    if not request.lat:
+        raise HTTPException(status_code=400, detail="No coordinates given")
+    if len(request.lat) > BATCH_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_POINTS} points per request")
+    
+    try:
+        lat = np.asarray(request.lat, dtype=float)
+        lon = np.asarray(request.lon, dtype=float)
+        
+        # Group points by weather cell
+        cell_lat = np.round(lat / NASA_POWER_LAT_STEP) * NASA_POWER_LAT_STEP
+        cell_lon = np.round((lon + 180) / NASA_POWER_LON_STEP) * NASA_POWER_LON_STEP - 180
+        cells, cell_index = np.unique(np.column_stack([cell_lat, cell_lon]), axis=0, return_inverse=True)
+        cell_index = cell_index.reshape(-1)
+        
+        semaphore = asyncio.Semaphore(ALLDISTRICTS_CONCURRENCY)
+        
+        async def fetch_cell(c_lat, c_lon):
+            async with semaphore:
+                return await get_cached_weather(c_lat, c_lon)
+        
+        fetched = await asyncio.gather(*[fetch_cell(float(c[0]), float(c[1])) for c in cells])
+        cell_weather = [weather for weather, _, _ in fetched]
         
-        # Prepare response
-        response = {
+        R3 = np.array([w["rainfall_3_days_mm"] for w in cell_weather])[cell_index]
+        R7 = np.array([w["rainfall_7_days_mm"] for w in cell_weather])[cell_index]
+        risk = calculate_flood_risk_batch(lat, lon, R3, R7)
+        
+        return {
             "status": "success",
             "timestamp": datetime.now().isoformat(),
-            "cache_info": "cached" if is_cached else "fresh",
-            "cache_key": cache_key,
-            "location": {
-                "latitude": request.lat,
-                "longitude": request.lon,
-                "district": request.district or "Unknown",
-                "division": "Unknown",
-                "flood_risk_factor": risk_data["flood_risk_percent"]
-            },
-            "weather_data": {
-                "rainfall_mm": weather_data["rainfall_7_days_mm"],
-                "rainfall_3_days": weather_data["rainfall_3_days_mm"],
-                "river_level_m": 3.2,
-                "humidity_percent": weather_data["humidity_percent"],
-                "temperature_c": weather_data["temperature_c"]
+            "count": len(lat),
+            "risk_levels": RISK_LEVELS,
+            "zone_labels": ZONE_LABELS,
+            "river_distance_labels": RIVER_DISTANCE_LABELS,
+            "results": {
+                "cell": cell_index.tolist(),
+                **{name: values.tolist() for name, values in risk.items()}
             },
-            "prediction": {
-                "risk_level": risk_data["risk_level"],
-                "risk_score": risk_data["flood_risk_percent"],
-                "confidence": risk_data["confidence"],
-                "probabilities": {
-                    "low": max(0, 100 - risk_data["flood_risk_percent"]),
-                    "medium": 30 if risk_data["risk_level"] == "মধ্যম" else 20,
-                    "high": risk_data["flood_risk_percent"] if risk_data["risk_level"] == "উচ্চ" else 0,
-                    "very_high": 0
-                }
-            },
-            "detailed_scores": risk_data,
-            "advice": advice,
-            "recommendations": {
-                "immediate": get_immediate_recommendations(risk_data["risk_level"]),
-                "preparation": get_preparation_recommendations(risk_data["risk_level"])
+            "cells": {
+                "keys": [key for _, _, key in fetched],
+                "cached": [is_cached for _, is_cached, _ in fetched],
+                "rainfall_3_days_mm": [w["rainfall_3_days_mm"] for w in cell_weather],
+                "rainfall_7_days_mm": [w["rainfall_7_days_mm"] for w in cell_weather],
+                "temperature_c": [w["temperature_c"] for w in cell_weather],
+                "humidity_percent": [w["humidity_percent"] for w in cell_weather]
             }
         }
         
-        return response
-        
     except Exception as e:
-        print(f"Error in POST /predicting: {e}")
+        logger.exception("Error in POST /predicting/batch: %s", e)
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 # Districts data
@@ -2296,62 +2594,263 @@ def get_bangladesh_districts():
         {"name":"নেত্রকোণা","division":"ময়মনসিংহ","latitude":24.8835,"longitude":90.7313},
     ]
 
-@app.get("/alldistricts")
-async def get_districts():
-    """Get list of districts with real-time risk data"""
-    try:
-        print("Fetching districts data...")
-        districts_base = get_bangladesh_districts()
-        districts_with_risk = []
+# /alldistricts fan-out limits for each snapshot build
+ALLDISTRICTS_CONCURRENCY = int(os.getenv("ALLDISTRICTS_CONCURRENCY", "8"))
+ALLDISTRICTS_DEADLINE_S = float(os.getenv("ALLDISTRICTS_DEADLINE_S", "15"))
+
+def district_risk_unavailable(district: dict, error: str) -> dict:
+    """Placeholder entry for a district whose data could not be loaded"""
+    return {
+        **district,
+        "flood_risk_level": "তথ্য নেই",
+        "flood_risk_score": 0.0,
+        "rainfall_mm": 0.0,
+        "temperature_c": 0.0,
+        "humidity_percent": 0.0,
+        "last_updated": datetime.now().isoformat(),
+        "error": error
+    }
+
+async def get_district_risk(district: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Fetch weather and calculate risk for one district"""
+    # Only the upstream call holds a slot; scoring is cheap
+    # Goes through risk_cache so a click on the map after a refresh is a hit
+    async with semaphore:
+        cached_result, _, _ = await get_cached_risk_data(
+            district["latitude"], district["longitude"], district["name"]
+        )
+    
+    weather_data = cached_result["weather_data"]
+    risk_data = cached_result["risk_data"]
+    
+    return {
+        **district,
+        "flood_risk_level": risk_data["risk_level"],
+        "flood_risk_score": risk_data["flood_risk_percent"],
+        "rainfall_mm": weather_data["rainfall_7_days_mm"],
+        "temperature_c": weather_data["temperature_c"],
+        "humidity_percent": weather_data["humidity_percent"],
+        "last_updated": datetime.now().isoformat()
+    }
+
+async def compute_all_district_risks():
+    """
+    Calculate risk for all districts concurrently.
+    Returns (districts, pending_count); districts still running at the
+    deadline are cancelled and returned as unavailable entries.
+    """
+    districts_base = get_bangladesh_districts()
+    semaphore = asyncio.Semaphore(ALLDISTRICTS_CONCURRENCY)
+    tasks = [asyncio.create_task(get_district_risk(d, semaphore)) for d in districts_base]
+    
+    done, pending = await asyncio.wait(tasks, timeout=ALLDISTRICTS_DEADLINE_S)
+    for task in pending:
+        task.cancel()
+    
+    districts_with_risk = []
+    for district, task in zip(districts_base, tasks):
+        if task in pending:
+            districts_with_risk.append(district_risk_unavailable(district, "সময়সীমার মধ্যে ডেটা পাওয়া যায়নি"))
+        elif task.exception() is not None:
+            logger.error("Error processing %s: %s", district['name'], task.exception())
+            districts_with_risk.append(district_risk_unavailable(district, "ডেটা লোড করতে সমস্যা"))
+        else:
+            districts_with_risk.append(task.result())
+    
+    if pending:
+        logger.warning("/alldistricts deadline %ss hit: %d districts pending", ALLDISTRICTS_DEADLINE_S, len(pending))
+    
+    return districts_with_risk, len(pending)
+
+# Precomputed national risk snapshot served by /alldistricts. Only the worker
+# holding the scheduler lease rebuilds it; the others adopt its copy from the
+# shared cache, so every worker serves the same bytes.
+SNAPSHOT_REFRESH_S = float(os.getenv("SNAPSHOT_REFRESH_S", "1800"))
+SNAPSHOT_RETRY_S = float(os.getenv("SNAPSHOT_RETRY_S", "120"))
+SCHEDULER_POLL_S = float(os.getenv("SCHEDULER_POLL_S", "15"))
+# Outlasts a poll plus a full rebuild, so a busy scheduler keeps its lease
+SCHEDULER_LEASE_S = float(os.getenv("SCHEDULER_LEASE_S", "60"))
+
+# Replaced as a whole on every rebuild, so readers never see a half-built snapshot
+district_snapshot = None
+snapshot_lock = asyncio.Lock()
+snapshot_ready = asyncio.Event()
+snapshot_task = None
+snapshot_rebuild_task = None  # on-demand rebuild from ?refresh=true
+
+async def rebuild_district_snapshot() -> dict:
+    """Recompute all districts and publish a new snapshot version"""
+    global district_snapshot
+    
+    async with snapshot_lock:
+        started = time.time()
+        districts_with_risk, pending_count = await compute_all_district_risks()
         
-        for district in districts_base:
-            try:
-                # Get weather data
-                weather_data = get_nasa_rainfall(district["latitude"], district["longitude"])
-                
-                # Calculate risk
-                risk_data = calculate_flood_risk(
-                    district["latitude"], 
-                    district["longitude"], 
-                    weather_data
-                )
-                
-                # Add to result
-                district_with_risk = {
-                    **district,
-                    "flood_risk_level": risk_data["risk_level"],
-                    "flood_risk_score": risk_data["flood_risk_percent"],
-                    "rainfall_mm": weather_data["rainfall_7_days_mm"],
-                    "temperature_c": weather_data["temperature_c"],
-                    "humidity_percent": weather_data["humidity_percent"],
-                    "last_updated": datetime.now().isoformat()
-                }
-                
-                districts_with_risk.append(district_with_risk)
-                
-            except Exception as e:
-                print(f"Error processing {district['name']}: {e}")
-                districts_with_risk.append({
-                    **district,
-                    "flood_risk_level": "তথ্য নেই",
-                    "flood_risk_score": 0.0,
-                    "rainfall_mm": 0.0,
-                    "temperature_c": 0.0,
-                    "humidity_percent": 0.0,
-                    "last_updated": datetime.now().isoformat(),
-                    "error": "ডেটা লোড করতে সমস্যা"
-                })
+        # Keep the last good values for districts that failed this round
+        if district_snapshot is not None:
+            previous = {d["name"]: d for d in district_snapshot["districts"]}
+            for i, district in enumerate(districts_with_risk):
+                last_good = previous.get(district["name"])
+                if "error" in district and last_good and "error" not in last_good:
+                    districts_with_risk[i] = last_good
         
-        return {
+        latest = await asyncio.to_thread(shared_snapshot.get, "districts", None, False) if shared_snapshot else None
+        version = max(district_snapshot["version"] if district_snapshot else 0,
+                      json.loads(latest["body"])["snapshot_version"] if latest else 0) + 1
+        built_at = datetime.now().isoformat()
+        body = {
             "status": "success",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": built_at,
             "districts": districts_with_risk,
             "count": len(districts_with_risk),
+            "complete": pending_count == 0,
+            "pending_count": pending_count,
+            "snapshot_version": version,
             "data_source": "NASA POWER API"
         }
         
+        body_text = json.dumps(body, ensure_ascii=False)
+        district_snapshot = snapshot_record(body_text, time.time())
+        snapshot_ready.set()
+        if shared_snapshot is not None:
+            await asyncio.to_thread(shared_snapshot.set, "districts",
+                                    {"built_at": district_snapshot["built_at"], "body": body_text},
+                                    2 * SNAPSHOT_REFRESH_S)
+        
+        logger.info("🗺️ District snapshot v%d built in %.1fs (%d pending)", version, time.time() - started, pending_count)
+        return district_snapshot
+
+def snapshot_etag(districts: list) -> str:
+    """
+    Weak ETag over the district data only: timestamps are left out, so the same
+    risk values give the same tag whichever worker or rebuild served them
+    """
+    payload = [{k: v for k, v in d.items() if k != "last_updated"} for d in districts]
+    digest = hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def snapshot_record(body_text: str, built_at: float) -> dict:
+    body = json.loads(body_text)
+    return {
+        "version": body["snapshot_version"],
+        "built_at": built_at,
+        "complete": body["complete"],
+        "districts": body["districts"],
+        "body": body_text.encode("utf-8"),
+        "etag": snapshot_etag(body["districts"]),
+    }
+
+async def adopt_shared_snapshot() -> bool:
+    """Switch to the snapshot another worker published, if it is newer than ours"""
+    global district_snapshot
+    if shared_snapshot is None:
+        return False
+    shared = await asyncio.to_thread(shared_snapshot.get, "districts", None, False)
+    if shared is None:
+        return False
+    record = snapshot_record(shared["body"], shared["built_at"])
+    if district_snapshot is not None and record["version"] <= district_snapshot["version"]:
+        return False
+    district_snapshot = record
+    snapshot_ready.set()
+    return True
+
+async def is_scheduler() -> bool:
+    """Whether this worker runs the periodic jobs (always, without a shared cache)"""
+    if shared_snapshot is None:
+        return True
+    return await asyncio.to_thread(shared_snapshot.hold_lease, "scheduler", SCHEDULER_LEASE_S)
+
+def snapshot_due(snapshot: Optional[dict]) -> bool:
+    if snapshot is None:
+        return True
+    delay = SNAPSHOT_REFRESH_S if snapshot["complete"] else min(SNAPSHOT_RETRY_S, SNAPSHOT_REFRESH_S)
+    return time.time() - snapshot["built_at"] >= delay
+
+async def district_snapshot_refresher():
+    """
+    Every worker picks up newer shared snapshots; the scheduler also rebuilds
+    when the latest one is due and runs the answer warm-up. If the scheduler
+    dies, its lease runs out and another worker takes over.
+    """
+    while True:
+        try:
+            await adopt_shared_snapshot()
+            if await is_scheduler():
+                start_answer_warmup()
+                if snapshot_due(district_snapshot):
+                    await rebuild_district_snapshot()
+        except Exception as e:
+            logger.exception("Error rebuilding district snapshot: %s", e)
+            await asyncio.sleep(min(SNAPSHOT_RETRY_S, SNAPSHOT_REFRESH_S))
+            continue
+        # Poll quickly until the first snapshot shows up
+        await asyncio.sleep(SCHEDULER_POLL_S if district_snapshot is not None else 1.0)
+
+def log_snapshot_rebuild_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Error rebuilding district snapshot: %s", task.exception(), exc_info=task.exception())
+
+def start_snapshot_rebuild():
+    """Background rebuild; the global reference keeps the task from being garbage-collected mid-run"""
+    global snapshot_rebuild_task
+    if snapshot_lock.locked() or (snapshot_rebuild_task is not None and not snapshot_rebuild_task.done()):
+        return
+    snapshot_rebuild_task = background_task(rebuild_district_snapshot())
+    snapshot_rebuild_task.add_done_callback(log_snapshot_rebuild_failure)
+
+def start_snapshot_refresher():
+    global snapshot_task
+    if snapshot_task is None or snapshot_task.done():
+        snapshot_task = background_task(district_snapshot_refresher())
+
+async def stop_snapshot_refresher():
+    global snapshot_task, snapshot_rebuild_task
+    for task in (snapshot_task, snapshot_rebuild_task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    snapshot_task = snapshot_rebuild_task = None
+
+@app.get("/alldistricts")
+async def get_districts(
+    request: Request,
+    refresh: bool = Query(False, description="Trigger a background rebuild of the snapshot")
+):
+    """Get list of districts with real-time risk data (served from the latest snapshot)"""
+    try:
+        if refresh:
+            start_snapshot_rebuild()
+        
+        if district_snapshot is None:
+            # Only the very first requests after startup wait for a build
+            try:
+                await asyncio.wait_for(snapshot_ready.wait(), timeout=ALLDISTRICTS_DEADLINE_S + 5)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=503, detail="District data is still loading, please retry")
+        
+        snapshot = district_snapshot
+        etag = snapshot["etag"]
+        headers = {
+            "ETag": etag,
+            "Age": str(int(time.time() - snapshot["built_at"])),
+            "X-Snapshot-Version": str(snapshot["version"]),
+        }
+        
+        if_none_match = request.headers.get("if-none-match", "")
+        # Weak comparison: W/ prefixes are ignored on both sides
+        if etag.removeprefix("W/") in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        
+        return Response(content=snapshot["body"], media_type="application/json", headers=headers)
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in /alldistricts: {e}")
+        logger.exception("Error in /alldistricts: %s", e)
         raise HTTPException(status_code=500, detail=f"Error fetching district data: {str(e)}")
 
 # Health check endpoint
@@ -2373,13 +2872,98 @@ async def health_check():
         }
     }
 
-# Clear cache endpoint (for debugging)
+# Cache inspection and invalidation endpoints
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "status": "success",
+        "caches": [risk_cache.stats(), answer_cache.stats()],
+        # Counting shared rows is a SQLite query, kept off the event loop
+        "shared_caches": await asyncio.to_thread(
+            lambda: [cache.stats() for cache in (shared_weather, shared_answers) if cache is not None]
+        ),
+        "sessions": conversation_memory.stats()
+    }
+
+# Values mirrored from the caches and the LLM scheduler at scrape time
+CACHE_HITS = Counter("jolbondhu_cache_hits_total", "Cache lookups that found a live entry", ["cache"])
+CACHE_MISSES = Counter("jolbondhu_cache_misses_total", "Cache lookups that missed", ["cache"])
+CACHE_EVICTIONS = Counter("jolbondhu_cache_evictions_total", "Entries evicted by the LRU bound", ["cache"])
+CACHE_HIT_RATIO = Gauge("jolbondhu_cache_hit_ratio", "Hits / lookups since start", ["cache"])
+CACHE_SIZE = Gauge("jolbondhu_cache_entries", "Entries currently cached", ["cache"])
+LLM_ACTIVE = Gauge("jolbondhu_llm_active_calls", "DeepSeek calls holding a scheduler slot")
+LLM_QUEUED = Gauge("jolbondhu_llm_queued_calls", "DeepSeek calls waiting for a slot", ["lane"])
+LLM_QUEUE_TIMEOUTS = Counter("jolbondhu_llm_queue_timeouts_total", "Calls answered by fallback after the queue deadline", ["lane"])
+LOG_QUEUED = Gauge("jolbondhu_log_records_queued", "Log records waiting for the writer thread")
+LOG_DROPPED = Counter("jolbondhu_log_records_dropped_total", "Log records dropped", ["reason"])
+TRACE_DROPPED = Counter("jolbondhu_trace_requests_dropped_total", "Request traces dropped with the trace file writer behind")
+
+@REGISTRY.on_scrape
+def collect_component_metrics():
+    for cache in (risk_cache, answer_cache, shared_weather, shared_answers):
+        if cache is None:
+            continue
+        stats = cache.stats()
+        CACHE_HITS.set(stats["hits"], cache=stats["name"])
+        CACHE_MISSES.set(stats["misses"], cache=stats["name"])
+        CACHE_EVICTIONS.set(stats["evictions"], cache=stats["name"])
+        CACHE_HIT_RATIO.set(stats["hit_ratio"], cache=stats["name"])
+        CACHE_SIZE.set(stats["size"], cache=stats["name"])
+    LLM_ACTIVE.set(llm_scheduler.active)
+    for lane in llm_scheduler.lanes:
+        LLM_QUEUED.set(llm_scheduler.queued(lane), lane=lane)
+        LLM_QUEUE_TIMEOUTS.set(llm_scheduler.timeouts[lane], lane=lane)
+    log_stats = logging_stats()
+    LOG_QUEUED.set(log_stats["queued"])
+    LOG_DROPPED.set(log_stats["dropped_queue_full"], reason="queue_full")
+    LOG_DROPPED.set(log_stats["dropped_sampled"], reason="sampled")
+    if trace_writer is not None:
+        TRACE_DROPPED.set(trace_writer.dropped)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text exposition for this worker only; under run.py --prod each
+    scrape reaches one worker, so counters jump between workers' values
+    """
+    # Collectors query the shared cache, so render off the event loop
+    return Response(content=await asyncio.to_thread(REGISTRY.render), media_type=CONTENT_TYPE)
+
+@app.get("/llm/stats")
+async def llm_stats():
+    return {"status": "success", "scheduler": llm_scheduler.stats()}
+
 @app.delete("/cache")
-async def clear_cache():
-    global risk_cache
-    count = len(risk_cache)
-    risk_cache = {}
-    return {"message": f"Cache cleared ({count} items removed)"}
+async def clear_cache(
+    key: Optional[str] = Query(None, description="Remove a single cache key"),
+    prefix: Optional[str] = Query(None, description="Remove keys starting with this prefix"),
+    district: Optional[str] = Query(None, description="Remove the grid cells covering this district"),
+    lat: Optional[float] = Query(None, description="Remove the grid cell containing this point (with lon)"),
+    lon: Optional[float] = Query(None)
+):
+    if lat is not None and lon is not None:
+        key = nasa_power_cell_key(lat, lon)
+    
+    # Cells are shared between districts and most lookups carry no district,
+    # so a district is resolved to the cells it covers rather than matched by tag
+    keys = [key] if key is not None else None
+    if key is None and prefix is None and district is not None:
+        name = canonical_district_name(district)
+        if name is None:
+            raise HTTPException(status_code=404, detail=f"Unknown district: {district}")
+        keys = district_cell_keys(name)
+    
+    def invalidate(cache):
+        if keys is not None:
+            return sum(int(cache.invalidate(k)) for k in keys)
+        if prefix is not None:
+            return cache.invalidate_prefix(prefix)
+        return cache.clear()
+    
+    count = invalidate(risk_cache)
+    # Other workers drop their in-memory copies within SHARED_CACHE_L1_TTL_S
+    shared_count = await asyncio.to_thread(invalidate, shared_weather) if shared_weather is not None else 0
+    return {"message": f"Cache cleared ({count} items removed)", "removed": count, "shared_removed": shared_count}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,173 @@
+# knowledge_index.py - Farmer chatbot knowledge base compiled into a matcher + answer tables
+import json
+from collections import deque
+from datetime import date
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text finds every pattern it contains"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[int]] = [frozenset()]
+
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(frozenset())
+                state = nxt
+            self._out[state] = self._out[state] | {pid}
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """All patterns that occur anywhere in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = set()
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return frozenset(self.patterns[pid] for pid in found)
+
+
+class KnowledgeIndex:
+    """
+    Immutable, precompiled form of chatbot_knowledge.json. Topic patterns,
+    their words, answer keys and fallback keywords all share one automaton,
+    so each question is scanned once.
+    """
+
+    def __init__(self, data: dict):
+        self.topics: List[str] = [t["topic"] for t in data["topics"]]
+        self.patterns: Dict[str, Tuple[Tuple[str, FrozenSet[str]], ...]] = {
+            t["topic"]: tuple((p, frozenset(p.split())) for p in t["patterns"]) for t in data["topics"]
+        }
+        self.pattern_words: Dict[str, FrozenSet[str]] = {
+            t["topic"]: frozenset(w for p in t["patterns"] for w in p.split()) for t in data["topics"]
+        }
+        self.answers: Dict[str, Dict[str, str]] = {t["topic"]: dict(t["answers"]) for t in data["topics"]}
+        self.answer_words: Dict[str, Tuple[Tuple[str, Tuple[str, ...]], ...]] = {
+            topic: tuple((key, tuple(key.split())) for key in answers) for topic, answers in self.answers.items()
+        }
+        self.follow_ups: Dict[str, Tuple[str, ...]] = {topic: tuple(answers) for topic, answers in self.answers.items()}
+
+        self.default_topic: str = data["default_topic"]
+        self.default_answer: str = data["default_answer"]
+        self.local_advice_skip_topics = frozenset(data["local_advice_skip_topics"])
+        self.seasonal_tips: Dict[int, str] = {m: tip["text"] for tip in data["seasonal_tips"] for m in tip["months"]}
+        self.heavy_rain_mm: float = data["heavy_rain_mm"]
+        self.heavy_rain_warning: str = data["heavy_rain_warning"]
+        self.helpline_note: str = data["helpline_note"]
+        self.general_follow_ups: Tuple[str, ...] = tuple(data["general_follow_ups"])
+        self.sources: Tuple[str, ...] = tuple(data["sources"])
+
+        self.fallback_keywords: Tuple[str, ...] = tuple(r["keyword"] for r in data["fallback"]["responses"])
+        self._fallback_templates: Dict[str, str] = {r["keyword"]: r["answer"] for r in data["fallback"]["responses"]}
+        self._default_template: str = data["fallback"]["default"]
+        self._rendered_day: Optional[date] = None
+        self._rendered: Dict[str, Tuple[str, int]] = {}
+
+        terms = [p for pats in self.patterns.values() for p, _ in pats]
+        terms += [w for words in self.pattern_words.values() for w in words]
+        terms += [w for keys in self.answer_words.values() for _, words in keys for w in words]
+        terms += list(self.fallback_keywords)
+        self.matcher = AhoCorasick(terms)
+
+    @classmethod
+    def from_file(cls, path: str) -> "KnowledgeIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match(self, question_lower: str) -> Tuple[str, float, Optional[str]]:
+        """
+        (topic, match score, answer key) for a lower-cased, stripped question.
+        The key is None when none of the topic's answer keys appear in it.
+        """
+        found = self.matcher.find(question_lower)
+        words = question_lower.split()
+        word_set = set(words)
+
+        # Topic whose pattern shares the largest share of the question's words
+        best_topic, best_score = None, 0.0
+        for topic in self.topics:
+            for pattern, pattern_set in self.patterns[topic]:
+                if pattern in found:
+                    similarity = len(word_set & pattern_set) / len(words)
+                    if similarity > best_score:
+                        best_score, best_topic = similarity, topic
+                        break
+
+        # Otherwise the first topic that shares any pattern word
+        if best_topic is None:
+            for topic in self.topics:
+                if not found.isdisjoint(self.pattern_words[topic]):
+                    best_topic, best_score = topic, 0.2
+                    break
+
+        if best_topic is None:
+            best_topic, best_score = self.default_topic, 0.1
+
+        # Answer whose key words appear in the question, whole words ranked higher
+        best_key, best_key_score = None, 0.0
+        for key, key_words in self.answer_words[best_topic]:
+            for word in key_words:
+                if word in found:
+                    score = 0.6 if word in word_set else 0.5
+                    if score > best_key_score:
+                        best_key_score, best_key = score, key
+
+        return best_topic, best_score, best_key
+
+    def default_key(self, topic: str) -> str:
+        """Answer used when nothing more specific matched"""
+        return self.default_answer if topic == self.default_topic else self.follow_ups[topic][0]
+
+    def seasonal_tip(self, month: int) -> str:
+        return self.seasonal_tips.get(month, "")
+
+    def fallback_keyword(self, question_lower: str) -> Optional[str]:
+        """First fallback keyword (in file order) contained in the question"""
+        found = self.matcher.find(question_lower)
+        for keyword in self.fallback_keywords:
+            if keyword in found:
+                return keyword
+        return None
+
+    def fallback_text(self, keyword: Optional[str], today: date,
+                      values: Callable[[], Dict[str, str]]) -> Tuple[str, int]:
+        """(answer, word count) for a fallback keyword, or the default text for None"""
+        return self._render(today, values)[keyword or ""]
+
+    def _render(self, today: date, values: Callable[[], Dict[str, str]]) -> Dict[str, Tuple[str, int]]:
+        # Date/season placeholders only change once a day, so texts are filled in then
+        if self._rendered_day != today:
+            fills = values()
+            rendered = {}
+            for keyword, template in [*self._fallback_templates.items(), ("", self._default_template)]:
+                for name, value in fills.items():
+                    template = template.replace("{" + name + "}", value)
+                rendered[keyword] = (template, len(template.split()))
+            self._rendered, self._rendered_day = rendered, today
+        return self._rendered
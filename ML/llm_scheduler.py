@@ -0,0 +1,140 @@
+# llm_scheduler.py - Concurrency limit, priority lanes and per-session fairness for LLM calls
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Sequence
+
+import numpy as np
+
+
+class QueueTimeout(Exception):
+    """No upstream slot became free before the lane's deadline"""
+
+
+class LLMScheduler:
+    """
+    At most max_concurrency upstream calls run at once. Waiters are kept
+    per lane (earlier lanes always go first) and, inside a lane, per
+    session: sessions take turns, so one chatty session cannot starve
+    the others. A waiter that is not admitted within its lane's deadline
+    gets QueueTimeout.
+    """
+
+    def __init__(self, max_concurrency: int = 8, lanes: Sequence[str] = ("emergency", "normal"),
+                 deadlines: Optional[Dict[str, float]] = None, sample_size: int = 1024):
+        self.max_concurrency = max_concurrency
+        self.lanes = tuple(lanes)
+        self.deadlines = {lane: 5.0 for lane in self.lanes}
+        self.deadlines.update(deadlines or {})
+        self.active = 0
+        # lane -> session key -> waiting futures, sessions in turn order
+        self._queues: Dict[str, "OrderedDict[Any, Deque[asyncio.Future]]"] = {
+            lane: OrderedDict() for lane in self.lanes
+        }
+        self._waits: Dict[str, Deque[float]] = {lane: deque(maxlen=sample_size) for lane in self.lanes}
+        self.admitted = {lane: 0 for lane in self.lanes}
+        self.timeouts = {lane: 0 for lane in self.lanes}
+        self.max_wait = {lane: 0.0 for lane in self.lanes}
+
+    def queued(self, lane: Optional[str] = None) -> int:
+        lanes = self.lanes if lane is None else (lane,)
+        return sum(len(w) for name in lanes for w in self._queues[name].values())
+
+    async def acquire(self, lane: str = "normal", session_id: Optional[str] = None) -> float:
+        """Wait for a slot; returns the seconds spent queued. Pair with release()."""
+        if lane not in self._queues:
+            lane = self.lanes[-1]
+        started = time.perf_counter()
+        if self.active < self.max_concurrency and not self.queued():
+            self.active += 1
+            return self._admitted(lane, started)
+
+        future = asyncio.get_running_loop().create_future()
+        # Anonymous requests are each their own session
+        key = session_id or id(future)
+        self._queues[lane].setdefault(key, deque()).append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.deadlines[lane])
+        except asyncio.TimeoutError:
+            if not (future.done() and not future.cancelled()):
+                future.cancel()
+                self._remove(lane, key, future)
+                self.timeouts[lane] += 1
+                raise QueueTimeout(f"{lane} lane wait exceeded {self.deadlines[lane]}s") from None
+            # The slot was handed over just as the deadline hit: keep it
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+                self._remove(lane, key, future)
+            raise
+        return self._admitted(lane, started)
+
+    def release(self):
+        """Free a slot, handing it straight to the next waiter if there is one"""
+        for lane in self.lanes:
+            queue = self._queues[lane]
+            while queue:
+                key, waiters = next(iter(queue.items()))
+                future = waiters.popleft()
+                if waiters:
+                    queue.move_to_end(key)   # next turn goes to another session
+                else:
+                    del queue[key]
+                if not future.done():
+                    future.set_result(None)  # slot passes over without changing active
+                    return
+        self.active -= 1
+
+    def releaser(self) -> Callable[[], None]:
+        """release() that does nothing after its first call, for slots handed to other code"""
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+        return release
+
+    def _remove(self, lane: str, key: Any, future: asyncio.Future):
+        waiters = self._queues[lane].get(key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._queues[lane][key]
+
+    def _admitted(self, lane: str, started: float) -> float:
+        waited = time.perf_counter() - started
+        self.admitted[lane] += 1
+        self._waits[lane].append(waited)
+        self.max_wait[lane] = max(self.max_wait[lane], waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane in self.lanes:
+            waits = np.array(self._waits[lane]) * 1000 if self._waits[lane] else np.zeros(1)
+            p50, p95 = np.percentile(waits, [50, 95])
+            lanes[lane] = {
+                "queued": self.queued(lane),
+                "sessions_waiting": len(self._queues[lane]),
+                "admitted": self.admitted[lane],
+                "timeouts": self.timeouts[lane],
+                "deadline_s": self.deadlines[lane],
+                "wait_ms_p50": round(float(p50), 1),
+                "wait_ms_p95": round(float(p95), 1),
+                "wait_ms_max": round(self.max_wait[lane] * 1000, 1),
+            }
+        return {
+            "name": "llm_scheduler",
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued(),
+            "lanes": lanes,
+        }
@@ -0,0 +1,175 @@
+# logsetup.py - Structured logging through a background queue, with sampling for chatty lines
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+# Attributes every LogRecord has; anything else came in through extra= and is logged as a field
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def extra_fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {k: v for k, v in record.__dict__.items() if k not in _RESERVED and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(extra_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with extra= fields appended as key=value"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = extra_fields(record)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+FORMATTERS = {
+    "json": JsonFormatter,
+    "text": lambda: TextFormatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"),
+    "plain": lambda: TextFormatter("%(message)s"),
+}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in every N records at or below max_level, counted per call site,
+    so a debug line in a hot path costs one counter bump most of the time.
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.max_level = max_level
+        self._seen: Dict[Tuple[str, int], int] = {}
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        if not self.every:
+            self.dropped += 1
+            return False
+        site = (record.pathname, record.lineno)
+        count = self._seen.get(site, 0)
+        self._seen[site] = count + 1
+        if count % self.every:
+            self.dropped += 1
+            return False
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: when the queue is full the record is dropped and counted"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback here, keeping extra= fields for the formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+_lock = threading.Lock()
+
+
+def setup_logging(default_format: str = "json") -> logging.Logger:
+    """
+    Route the root logger through a bounded queue to a stdout writer thread.
+    Configured from LOG_LEVEL, LOG_FORMAT (json / text / plain),
+    LOG_DEBUG_SAMPLE_RATE and LOG_QUEUE_SIZE. Safe to call more than once.
+    """
+    global _listener, _queue_handler, _sampler
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            return root
+
+        formatter = FORMATTERS.get(os.getenv("LOG_FORMAT", default_format), FORMATTERS["json"])()
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(formatter)
+
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+        _sampler = SamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01")))
+        _queue_handler.addFilter(_sampler)
+
+        root.handlers = [_queue_handler]
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        # httpx logs every request at INFO; upstream calls are covered by metrics instead
+        for name in ("httpx", "httpcore"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        os.register_at_fork(after_in_child=_restart_after_fork)
+        return root
+
+
+def _restart_after_fork():
+    """The writer thread doesn't survive fork (prefork workers): give the child its own queue and thread"""
+    global _listener
+    if _listener is None:
+        return
+    _queue_handler.queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_listener.handlers,
+                                               respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped_queue_full": _queue_handler.dropped if _queue_handler else 0,
+        "dropped_sampled": _sampler.dropped if _sampler else 0,
+    }
@@ -20,6 +20,13 @@ import requests
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import logging
+from logsetup import setup_logging
+
+# Same queue-based logging as the API; plain lines keep the report layout
+setup_logging(default_format="plain")
+log = logging.getLogger("jolbondhu.ml")
+
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import roc_auc_score, f1_score, classification_report
 
@@ -32,9 +39,9 @@ from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 
-print(f"TensorFlow : {tf.__version__}")
-print(f"XGBoost    : {xgb.__version__}")
-print("Imports done.")
+log.info(f"TensorFlow : {tf.__version__}")
+log.info(f"XGBoost    : {xgb.__version__}")
+log.info("Imports done.")
 
 import shutil
 import pathlib
@@ -54,7 +61,7 @@ CACHE_DIR.mkdir(exist_ok=True)
 WEATHER_CACHE_DIR.mkdir(exist_ok=True)
 #CACHE_DIR.mkdir(exist_ok=True)
 
-print(f"Grid: {GRID_ROWS} × {GRID_COLS}  (both divisible by 4: OK)")
+log.info(f"Grid: {GRID_ROWS} × {GRID_COLS}  (both divisible by 4: OK)")
 
 #shutil.rmtree("osm_cache/weather", ignore_errors=True)
 #pathlib.Path("osm_cache/weather").mkdir(exist_ok=True)
@@ -86,10 +93,10 @@ def fetch_osm_rivers(bbox=BD_BBOX, cache_file=CACHE_DIR / "osm_rivers.json"):
     Uses disk cache — first call takes ~60s, subsequent calls instant.
     """
     if cache_file.exists():
-        print("  Loading OSM rivers from cache ...")
+        log.info("  Loading OSM rivers from cache ...")
         return json.loads(cache_file.read_text())
 
-    print("  Querying OSM Overpass API for Bangladesh rivers ...")
+    log.info("  Querying OSM Overpass API for Bangladesh rivers ...")
     south, west, north, east = bbox
 
     # Overpass QL query:
@@ -108,7 +115,7 @@ def fetch_osm_rivers(bbox=BD_BBOX, cache_file=CACHE_DIR / "osm_rivers.json"):
         r.raise_for_status()
         data = r.json()
     except Exception as e:
-        print(f"  Overpass failed: {e}. Using fallback stations.")
+        log.warning(f"  Overpass failed: {e}. Using fallback stations.")
         return _fallback_stations()
 
     rivers = {}
@@ -131,7 +138,7 @@ def fetch_osm_rivers(bbox=BD_BBOX, cache_file=CACHE_DIR / "osm_rivers.json"):
                 last_lat = p['lat']
         stations.extend(sampled[:8])   # cap per river to avoid too many API calls
 
-    print(f"  Discovered {len(stations)} monitoring points across {len(rivers)} rivers.")
+    log.info(f"  Discovered {len(stations)} monitoring points across {len(rivers)} rivers.")
     cache_file.write_text(json.dumps(stations))
     return stations
 
@@ -151,14 +158,14 @@ def fetch_elevations(stations, cache_file=CACHE_DIR / "elevations.json"):
     no flood history.
     """
     if cache_file.exists():
-        print("  Loading elevations from cache ...")
+        log.info("  Loading elevations from cache ...")
         elev_map = json.loads(cache_file.read_text())
         for st in stations:
             key = f"{st['lat']:.4f},{st['lon']:.4f}"
             st['elevation_m'] = elev_map.get(key, 10.0)
         return stations
 
-    print("  Fetching SRTM elevations from OpenTopoData ...")
+    log.info("  Fetching SRTM elevations from OpenTopoData ...")
     elev_map = {}
     batch_size = 80   # API allows 100; use 80 to stay safe
 
@@ -173,7 +180,7 @@ def fetch_elevations(stations, cache_file=CACHE_DIR / "elevations.json"):
                 key = f"{st['lat']:.4f},{st['lon']:.4f}"
                 elev_map[key] = res.get('elevation', 10.0)
         except Exception as e:
-            print(f"  Elevation batch failed: {e}")
+            log.warning(f"  Elevation batch failed: {e}")
             for st in batch:
                 key = f"{st['lat']:.4f},{st['lon']:.4f}"
                 elev_map[key] = 10.0
@@ -514,7 +521,7 @@ def fetch_weather(lat, lon, start_date, end_date, name=""):
         return df
 
     except Exception as e:
-        print(f"  [WEATHER WARN] {name}: {e}")
+        log.warning(f"  [WEATHER WARN] {name}: {e}")
         return None
 
 # ================================================================
@@ -598,9 +605,9 @@ BANGLADESH_STATIONS = [
      'lat': 22.341, 'lon': 91.830, 'elev_hint': 10},
 ]
 
-print(f"Station list: {len(BANGLADESH_STATIONS)} verified stations")
-print(f"Rivers: {len(set(s['name'] for s in BANGLADESH_STATIONS))} unique")
-print(f"Districts: {len(set(s['district'] for s in BANGLADESH_STATIONS))} unique")
+log.info(f"Station list: {len(BANGLADESH_STATIONS)} verified stations")
+log.info(f"Rivers: {len(set(s['name'] for s in BANGLADESH_STATIONS))} unique")
+log.info(f"Districts: {len(set(s['district'] for s in BANGLADESH_STATIONS))} unique")
 
 # NEW — DISK CACHE HELPERS  (three small functions)
 # ================================================================
@@ -691,15 +698,15 @@ def fetch_nasa_power(lat, lon, start_date, end_date,
             # NASA returns 429 very rarely but handle it anyway
             if r.status_code == 429:
                 wait = 30 * attempt
-                print(f"  [429] NASA rate limit — waiting {wait}s ...")
+                log.warning(f"  [429] NASA rate limit — waiting {wait}s ...")
                 time.sleep(wait)
                 continue
 
             # NASA sometimes returns 5xx on server load
             if r.status_code >= 500:
                 wait = 20 * attempt
-                print(f"  [{r.status_code}] NASA server busy — "
-                      f"waiting {wait}s (attempt {attempt}) ...")
+                log.warning(f"  [{r.status_code}] NASA server busy — "
+                            f"waiting {wait}s (attempt {attempt}) ...")
                 time.sleep(wait)
                 continue
 
@@ -740,22 +747,22 @@ def fetch_nasa_power(lat, lon, start_date, end_date,
             return df, elevation_m
 
         except requests.exceptions.Timeout:
-            print(f"  [TIMEOUT] {name} — attempt {attempt}/{max_retries} ...")
+            log.warning(f"  [TIMEOUT] {name} — attempt {attempt}/{max_retries} ...")
             time.sleep(15 * attempt)
 
         except requests.exceptions.ConnectionError as e:
-            print(f"  [CONN ERR] {name}: {e}")
+            log.warning(f"  [CONN ERR] {name}: {e}")
             time.sleep(10 * attempt)
 
         except KeyError as e:
-            print(f"  [PARSE ERR] {name}: missing key {e} in NASA response")
+            log.warning(f"  [PARSE ERR] {name}: missing key {e} in NASA response")
             return None, elevation_m
 
         except Exception as e:
-            print(f"  [ERR] {name}: {e}")
+            log.warning(f"  [ERR] {name}: {e}")
             return None, elevation_m
 
-    print(f"  [SKIP] {name}: all {max_retries} retries exhausted.")
+    log.warning(f"  [SKIP] {name}: all {max_retries} retries exhausted.")
     return None, elevation_m
 
 
@@ -801,7 +808,7 @@ def fetch_forecast(lat, lon, name="", days=7):
             df['station'] = name
             return df.set_index('date')
         except Exception as e:
-            print(f"  [FORECAST WARN] {name}: {e}")
+            log.warning(f"  [FORECAST WARN] {name}: {e}")
     return None
 
 
@@ -876,42 +883,42 @@ def load_all_data():
         if not _cache_csv(f"{s['name']}_{s['district']}").exists()
     ]
 
-    print("\n" + "=" * 62)
-    print(" STEP 1: Station List  (NASA POWER API + disk cache)")
-    print("=" * 62)
-    print(f"  Total stations      : {len(BANGLADESH_STATIONS)}")
-    print(f"  Already cached      : {len(cached_labels)}  → instant load")
-    print(f"  Need fetching       : {len(missing_labels)}  → NASA POWER API")
+    log.info("\n" + "=" * 62)
+    log.info(" STEP 1: Station List  (NASA POWER API + disk cache)")
+    log.info("=" * 62)
+    log.info(f"  Total stations      : {len(BANGLADESH_STATIONS)}")
+    log.info(f"  Already cached      : {len(cached_labels)}  → instant load")
+    log.info(f"  Need fetching       : {len(missing_labels)}  → NASA POWER API")
     if missing_labels:
-        print(f"  Will fetch: {missing_labels}")
+        log.info(f"  Will fetch: {missing_labels}")
 
-    print("\n" + "=" * 62)
-    print(" STEP 2: Upstream Catchment Data  (India / Nepal)")
-    print("=" * 62)
+    log.info("\n" + "=" * 62)
+    log.info(" STEP 2: Upstream Catchment Data  (India / Nepal)")
+    log.info("=" * 62)
     upstream_data = {}
 
     for name, info in UPSTREAM_FIXED.items():
         cached_df, cached_elev = load_from_cache(name)
         if cached_df is not None:
             upstream_data[name] = cached_df
-            print(f"  {name:<26} CACHED  rows={len(cached_df)}")
+            log.info(f"  {name:<26} CACHED  rows={len(cached_df)}")
             continue
 
-        print(f"  Fetching {name} via NASA POWER ...", end=' ', flush=True)
+        log.info(f"  {name:<26} fetching via NASA POWER ...")
         df, elev = fetch_nasa_power(
             info['lat'], info['lon'],
             TRAIN_START, VAL_END,
             name=name, elevation_m=50)
         if df is not None:
             upstream_data[name] = df
-            print(f"OK  rows={len(df)}")
+            log.info(f"  {name:<26} OK  rows={len(df)}")
         else:
-            print("FAILED")
+            log.warning(f"  {name:<26} FAILED")
         time.sleep(2.0)   # polite delay — NASA asks for reasonable pauses
 
-    print("\n" + "=" * 62)
-    print(" STEP 3: Bangladesh Station Weather")
-    print("=" * 62)
+    log.info("\n" + "=" * 62)
+    log.info(" STEP 3: Bangladesh Station Weather")
+    log.info("=" * 62)
 
     station_data  = {}
     station_metas = []
@@ -928,12 +935,12 @@ def load_all_data():
             station_data[label]  = (cached_df, info)
             station_metas.append(info)
             flood_pct = cached_df['flood_occurred'].mean() * 100
-            print(f"  {label:<36} CACHED  "
-                  f"elev={cached_elev:4.0f}m  flood={flood_pct:.1f}%")
+            log.info(f"  {label:<36} CACHED  "
+                     f"elev={cached_elev:4.0f}m  flood={flood_pct:.1f}%")
             continue
 
         # ── Fetch from NASA POWER ─────────────────────────────
-        print(f"  {label:<36} ...", end=' ', flush=True)
+        log.info(f"  {label:<36} fetching ...")
         df, elev = fetch_nasa_power(
             st['lat'], st['lon'],
             TRAIN_START, VAL_END,
@@ -948,10 +955,10 @@ def load_all_data():
             station_data[label]  = (df, info)
             station_metas.append(info)
             flood_pct = df['flood_occurred'].mean() * 100
-            print(f"OK  elev={elev_hint:4}m  "
-                  f"rows={len(df)}  flood={flood_pct:.1f}%")
+            log.info(f"  {label:<36} OK  elev={elev_hint:4}m  "
+                     f"rows={len(df)}  flood={flood_pct:.1f}%")
         else:
-            print("FAILED — re-run to retry")
+            log.warning(f"  {label:<36} FAILED — re-run to retry")
 
         time.sleep(2.0)   # 2s between requests is sufficient for NASA
 
@@ -968,10 +975,10 @@ def load_all_data():
         if station_data else 0.0
     )
 
-    print(f"\n{'─'*65}")
-    print(f"  Loaded   : {len(station_data)} / {len(BANGLADESH_STATIONS)} stations")
-    print(f"  Upstream : {len(upstream_data)} catchments")
-    print(f"  Flood rate: {overall_flood:.1f}%  (target 12–18%)")
+    log.info(f"\n{'─'*65}")
+    log.info(f"  Loaded   : {len(station_data)} / {len(BANGLADESH_STATIONS)} stations")
+    log.info(f"  Upstream : {len(upstream_data)} catchments")
+    log.info(f"  Flood rate: {overall_flood:.1f}%  (target 12–18%)")
 
     if len(station_data) < len(BANGLADESH_STATIONS):
         still_missing = [
@@ -979,19 +986,19 @@ def load_all_data():
             for s in BANGLADESH_STATIONS
             if f"{s['name']}_{s['district']}" not in station_data
         ]
-        print(f"\n  Still missing ({len(still_missing)}):")
+        log.warning(f"\n  Still missing ({len(still_missing)}):")
         for m in still_missing:
-            print(f"    - {m}")
-        print(f"\n  Re-run this cell to fetch remaining stations.")
-        print(f"  Cached stations load in milliseconds.")
+            log.info(f"    - {m}")
+        log.info(f"\n  Re-run this cell to fetch remaining stations.")
+        log.info(f"  Cached stations load in milliseconds.")
 
-    print(f"\n  {'Station':<36} {'Elev':>5}  {'Rows':>6}  {'Flood%':>8}")
-    print(f"  {'─'*62}")
+    log.info(f"\n  {'Station':<36} {'Elev':>5}  {'Rows':>6}  {'Flood%':>8}")
+    log.info(f"  {'─'*62}")
     for label, (df, info) in station_data.items():
-        print(f"  {label:<36} "
-              f"{info.get('elevation_m', 0):>4.0f}m  "
-              f"{len(df):>6}  "
-              f"{df['flood_occurred'].mean()*100:>7.1f}%")
+        log.info(f"  {label:<36} "
+                 f"{info.get('elevation_m', 0):>4.0f}m  "
+                 f"{len(df):>6}  "
+                 f"{df['flood_occurred'].mean()*100:>7.1f}%")
 
     return station_data, upstream_data, station_metas
 
@@ -1049,7 +1056,7 @@ def build_dataset(station_data, upstream_data):
 
     combined = pd.concat(all_dfs).sort_index().fillna(method='ffill').fillna(0)
     flood_rate = combined['flood_occurred'].mean() * 100
-    print(f"Combined dataset: {combined.shape}  |  Flood rate: {flood_rate:.1f}%")
+    log.info(f"Combined dataset: {combined.shape}  |  Flood rate: {flood_rate:.1f}%")
     return combined
 
 
@@ -1066,14 +1073,14 @@ val   = combined_df[combined_df.index >= VAL_START]
 X_train = train[FEATURE_COLS];  y_train = train['flood_occurred']
 X_val   = val[FEATURE_COLS];    y_val   = val['flood_occurred']
 flood_weight = float((y_train == 0).sum() / max((y_train == 1).sum(), 1))
-print(f"Train: {len(X_train):,}  Val: {len(X_val):,}  Flood weight: {flood_weight:.1f}x")
+log.info(f"Train: {len(X_train):,}  Val: {len(X_val):,}  Flood weight: {flood_weight:.1f}x")
 
 # SECTION 8 — XGBoost (unchanged architecture, new features)
 # ================================================================
 
-print("\n" + "="*55)
-print(" MODEL 1: XGBOOST")
-print("="*55)
+log.info("\n" + "="*55)
+log.info(" MODEL 1: XGBOOST")
+log.info("="*55)
 
 xgb_model = xgb.XGBClassifier(
     n_estimators=600, learning_rate=0.04, max_depth=6,
@@ -1095,9 +1102,9 @@ xgb_probs = xgb_model.predict_proba(X_val)[:, 1]
 
 feat_imp = pd.Series(xgb_model.feature_importances_,
                      index=FEATURE_COLS).sort_values(ascending=False)
-print("\nTop 10 features:")
+log.info("\nTop 10 features:")
 for f, s in feat_imp.head(10).items():
-    print(f"  {f:<40} {s:.5f}")
+    log.info(f"  {f:<40} {s:.5f}")
 
 import os, time, json, warnings
 warnings.filterwarnings('ignore')
@@ -1121,16 +1128,16 @@ from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 
-print(f"TensorFlow : {tf.__version__}")
-print(f"XGBoost    : {xgb.__version__}")
-print("Imports done.")
+log.info(f"TensorFlow : {tf.__version__}")
+log.info(f"XGBoost    : {xgb.__version__}")
+log.info("Imports done.")
 
 # SECTION 9 — LSTM  (unchanged architecture, new physics features)
 # ================================================================
 
-print("\n" + "="*55)
-print(" MODEL 2: LSTM")
-print("="*55)
+log.info("\n" + "="*55)
+log.info(" MODEL 2: LSTM")
+log.info("="*55)
 
 scaler_lstm = MinMaxScaler()
 X_tr_sc = scaler_lstm.fit_transform(X_train)
@@ -1194,7 +1201,7 @@ lstm_model.fit(
 lstm_probs = lstm_model.predict(X_va_seq, verbose=0).flatten()
 lstm_auc   = roc_auc_score(y_va_seq, lstm_probs)
 lstm_f1    = f1_score(y_va_seq, (lstm_probs > 0.5).astype(int))
-print(f"  AUC: {lstm_auc:.4f}   F1: {lstm_f1:.4f}")
+log.info(f"  AUC: {lstm_auc:.4f}   F1: {lstm_f1:.4f}")
 
 #  VERIFICATION
 # checking that both fixes are working or not
@@ -1205,29 +1212,29 @@ def verify_fixes(combined_df, X_train):
     Checks that the new features exist and sample weights
     are distributed correctly.
     """
-    print("=" * 55)
-    print(" VERIFICATION — climate fixes")
-    print("=" * 55)
+    log.info("=" * 55)
+    log.info(" VERIFICATION — climate fixes")
+    log.info("=" * 55)
 
     # Check new features exist
     required = ['pct_rain_7d', 'pct_api', 'pct_water_level',
                 'climate_shock_idx', 'days_from_monsoon_peak']
     missing  = [f for f in required if f not in combined_df.columns]
     if missing:
-        print(f"  MISSING features: {missing}")
+        log.warning(f"  MISSING features: {missing}")
     else:
-        print("  New climate-agnostic features: OK")
-        print(f"    climate_shock_idx range: "
-              f"{combined_df['climate_shock_idx'].min():.3f} – "
-              f"{combined_df['climate_shock_idx'].max():.3f}")
+        log.info("  New climate-agnostic features: OK")
+        log.info(f"    climate_shock_idx range: "
+                 f"{combined_df['climate_shock_idx'].min():.3f} – "
+                 f"{combined_df['climate_shock_idx'].max():.3f}")
 
     # Confirm hard seasonal flags are gone
     blocked = ['is_monsoon', 'is_premonsoon', 'is_postmonsoon']
     present = [f for f in blocked if f in combined_df.columns]
     if present:
-        print(f"  WARNING: seasonal blocking flags still present: {present}")
+        log.warning(f"  WARNING: seasonal blocking flags still present: {present}")
     else:
-        print("  Hard seasonal blocking flags: removed OK")
+        log.info("  Hard seasonal blocking flags: removed OK")
 
     # Check sample weight distribution
     sw = temporal_sample_weights(X_train.index)
@@ -1242,9 +1249,9 @@ def verify_fixes(combined_df, X_train):
         n    = mask.sum()
         if n > 0:
             w_mean = sw[mask].mean()
-            print(f"  {decade}: {n:6,} rows  mean weight = {w_mean:.2f}")
+            log.info(f"  {decade}: {n:6,} rows  mean weight = {w_mean:.2f}")
 
-    print("=" * 55)
+    log.info("=" * 55)
 
 #  MODEL 3 FIX — UNet Concatenate shape mismatch
 # ================================================================
@@ -1340,8 +1347,8 @@ sp_std  = X_sp_tr.std( axis=(0, 1, 2), keepdims=True) + 1e-8
 X_sp_tr = (X_sp_tr - sp_mean) / sp_std
 X_sp_va = (X_sp_va - sp_mean) / sp_std
 
-print(f"Spatial train: {X_sp_tr.shape}   val: {X_sp_va.shape}")
-print(f"Label  train: {y_sp_tr.shape}   val: {y_sp_va.shape}")
+log.info(f"Spatial train: {X_sp_tr.shape}   val: {X_sp_va.shape}")
+log.info(f"Label  train: {y_sp_tr.shape}   val: {y_sp_va.shape}")
 
 
 # ================================================================
@@ -1456,10 +1463,10 @@ unet_hist = unet_model.fit(
 
 # ── Quick sanity check ──
 sample_preds = unet_model.predict(X_sp_va[:4], verbose=0)
-print(f"\nUNet output shape : {sample_preds.shape}")
-print(f"Mean flood prob   : {sample_preds.mean():.3f}")
-print(f"Min / Max         : {sample_preds.min():.3f} / {sample_preds.max():.3f}")
-print("UNet training complete.")
+log.info(f"\nUNet output shape : {sample_preds.shape}")
+log.info(f"Mean flood prob   : {sample_preds.mean():.3f}")
+log.info(f"Min / Max         : {sample_preds.min():.3f} / {sample_preds.max():.3f}")
+log.info("UNet training complete.")
 
 # ================================================================
 # REMINDER
@@ -1501,7 +1508,7 @@ def predict_any_location(lat, lon, location_name=None, days_forecast=3):
             matched_station_info = st_info
             break
 
-    print(f"\n[ REAL-TIME ] Predicting for: {location_name} (Internal label: {actual_name})")
+    log.info(f"\n[ REAL-TIME ] Predicting for: {location_name} (Internal label: {actual_name})")
 
     # Step 1 — get elevation for this exact coordinate
     try:
@@ -1509,7 +1516,7 @@ def predict_any_location(lat, lon, location_name=None, days_forecast=3):
         elevation_m = r.json()['results'][0].get('elevation', 10.0)
     except:
         elevation_m = 10.0
-        print("  Could not fetch elevation — using 10m default")
+        log.warning("  Could not fetch elevation — using 10m default")
 
     # Estimate slope from 4 nearby points
     offsets = [(0.05, 0), (-0.05, 0), (0, 0.05), (0, -0.05)]
@@ -1523,7 +1530,7 @@ def predict_any_location(lat, lon, location_name=None, days_forecast=3):
     except:
         slope = 0.001
 
-    print(f"  Elevation: {elevation_m:.1f}m   Slope: {slope:.6f}")
+    log.info(f"  Elevation: {elevation_m:.1f}m   Slope: {slope:.6f}")
 
     # Step 2 — fetch weather history using NASA POWER API
     # Ensure dates are in the past for archive API
@@ -1535,7 +1542,7 @@ def predict_any_location(lat, lon, location_name=None, days_forecast=3):
     # Pass the determined actual_name to fetch_nasa_power
     hist, _ = fetch_nasa_power(lat, lon, hist_st, hist_en, name=actual_name, elevation_m=elevation_m)
     if hist is None:
-        print("  NASA POWER API unavailable for historical data. Cannot predict.")
+        log.warning("  NASA POWER API unavailable for historical data. Cannot predict.")
         return None
 
     hist = simulate_water_level(hist, elevation_m)
@@ -1558,7 +1565,7 @@ def predict_any_location(lat, lon, location_name=None, days_forecast=3):
     feat_df = feat_df.fillna(method='ffill').fillna(0)
 
     if len(feat_df) < SEQUENCE_LENGTH + 2:
-        print(f"  Not enough history ({len(feat_df)} rows).")
+        log.warning(f"  Not enough history ({len(feat_df)} rows).")
         return None
 
     # Step 4 — XGBoost prediction
@@ -1597,24 +1604,24 @@ def predict_any_location(lat, lon, location_name=None, days_forecast=3):
     sat = float(feat_df['saturation_idx'].iloc[-1])
     anom = float(feat_df['rain_anomaly'].iloc[-1])
 
-    print("\n" + "=" * 55)
-    print(f"  FLOOD RISK — {location_name.upper()}")
-    print("=" * 55)
-    print(f"  RISK LEVEL     : {colour}[ {level} ]{rst}")
-    print(f"  Final score    : {final_score:.1%}")
-    print(f"  ├─ ML model    : {model_p:.1%}  (XGBoost + LSTM + UNet)")
-    print(f"  └─ Physics     : {dynamic_score:.1%}  (live conditions vs seasonal norm)")
-    print(f"\n  Physics breakdown:")
-    print(f"  ├─ Elevation        : {elevation_m:.1f} m")
-    print(f"  ├─ Flood susc. idx  : {fsi:.3f}  (0=safe, 1=very vulnerable)")
-    print(f"  ├─ Soil saturation  : {sat:.3f}  (0=dry, 1=waterlogged)")
-    print(f"  └─ Rainfall anomaly : {anom:.2f}x  (vs seasonal normal)")
+    log.info("\n" + "=" * 55)
+    log.info(f"  FLOOD RISK — {location_name.upper()}")
+    log.info("=" * 55)
+    log.info(f"  RISK LEVEL     : {colour}[ {level} ]{rst}")
+    log.info(f"  Final score    : {final_score:.1%}")
+    log.info(f"  ├─ ML model    : {model_p:.1%}  (XGBoost + LSTM + UNet)")
+    log.info(f"  └─ Physics     : {dynamic_score:.1%}  (live conditions vs seasonal norm)")
+    log.info(f"\n  Physics breakdown:")
+    log.info(f"  ├─ Elevation        : {elevation_m:.1f} m")
+    log.info(f"  ├─ Flood susc. idx  : {fsi:.3f}  (0=safe, 1=very vulnerable)")
+    log.info(f"  ├─ Soil saturation  : {sat:.3f}  (0=dry, 1=waterlogged)")
+    log.info(f"  └─ Rainfall anomaly : {anom:.2f}x  (vs seasonal normal)")
 
     if fcast is not None:
-        print(f"\n  Forecast (next {days_forecast} days):")
+        log.info(f"\n  Forecast (next {days_forecast} days):")
         for dt, row in fcast.head(days_forecast).iterrows():
             bar = '#' * max(0, int(row['rainfall_mm'] / 5))
-            print(f"    {dt.strftime('%b %d')} : {row['rainfall_mm']:5.1f} mm  {bar}")
+            log.info(f"    {dt.strftime('%b %d')} : {row['rainfall_mm']:5.1f} mm  {bar}")
 
     return {
         'location': location_name, 'lat': lat, 'lon': lon,
@@ -1710,14 +1717,14 @@ def plot_dashboard(results_list):
     out = 'flood_v2_dashboard.png'
     plt.savefig(out, dpi=150, bbox_inches='tight')
     plt.show()
-    print(f"Dashboard saved: {out}")
+    log.info(f"Dashboard saved: {out}")
 
 # SECTION 13 — RUN PREDICTIONS
 # ================================================================
 
-print("\n" + "="*55)
-print(" REAL-TIME PREDICTIONS")
-print("="*55)
+log.info("\n" + "="*55)
+log.info(" REAL-TIME PREDICTIONS")
+log.info("="*55)
 
 # Named districts — same as before
 named_locations = [
@@ -1737,6 +1744,6 @@ for name, lat, lon in named_locations + arbitrary_locs:
     if r:
         results.append(r)
 
-print("\nGenerating dashboard ...")
+log.info("\nGenerating dashboard ...")
 plot_dashboard(results)
 
@@ -0,0 +1,138 @@
+# mock_deepseek.py - Local DeepSeek/OpenAI-compatible chat completions server for load tests
+#
+# Usage:
+#   python mock_deepseek.py                                  # port 8010, 0.3s latency, 50 tok/s
+#   python mock_deepseek.py --latency 0.8 --tps 30 --error-rate 0.05
+#
+# Then point the API at it:
+#   DEEPSEEK_API_URL=http://127.0.0.1:8010/v1/chat/completions DEEPSEEK_API_KEY=test python run.py
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from session_memory import estimate_tokens
+
+# Defaults, overridden from the command line
+SETTINGS = {
+    "latency": 0.3,        # seconds before the first token (non-stream: before the body)
+    "jitter": 0.1,         # +/- fraction applied to latency
+    "tps": 50.0,           # completion tokens per second
+    "answer_tokens": 300,  # completion length, capped by the request's max_tokens
+    "error_rate": 0.0,     # fraction of requests that fail
+    "error_status": 503,
+}
+
+# Bengali filler, about one token per word
+ANSWER_WORDS = ("ধান", "চাষে", "সঠিক", "সময়ে", "সেচ", "দিন", "এবং", "জৈব", "সার", "ব্যবহার",
+                "করুন।", "বন্যার", "আগে", "বীজতলা", "উঁচু", "জমিতে", "তৈরি", "রাখুন।")
+
+app = FastAPI(title="Mock DeepSeek API")
+seen_prefixes = set()
+stats = {"requests": 0, "streams": 0, "errors": 0, "completion_tokens": 0}
+
+
+def prompt_usage(messages):
+    """(prompt tokens, tokens served from the simulated prefix cache)"""
+    prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+    system = messages[0].get("content", "") if messages else ""
+    digest = hashlib.sha256(system.encode("utf-8")).hexdigest()
+    hit = estimate_tokens(system) if digest in seen_prefixes else 0
+    seen_prefixes.add(digest)
+    return prompt_tokens, hit
+
+
+def usage_block(prompt_tokens, hit, completion_tokens):
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_cache_hit_tokens": hit,
+        "prompt_cache_miss_tokens": prompt_tokens - hit,
+    }
+
+
+async def first_token_delay():
+    jitter = SETTINGS["jitter"]
+    await asyncio.sleep(max(0.0, SETTINGS["latency"] * random.uniform(1 - jitter, 1 + jitter)))
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    stats["requests"] += 1
+    if random.random() < SETTINGS["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "injected failure", "type": "server_error"}},
+                            status_code=SETTINGS["error_status"])
+
+    completion_tokens = min(SETTINGS["answer_tokens"], int(payload.get("max_tokens") or 4096))
+    words = [random.choice(ANSWER_WORDS) for _ in range(completion_tokens)]
+    prompt_tokens, hit = prompt_usage(payload.get("messages", []))
+    model = payload.get("model", "deepseek-chat")
+    completion_id = f"chatcmpl-mock-{stats['requests']}"
+    stats["completion_tokens"] += completion_tokens
+
+    if not payload.get("stream"):
+        await first_token_delay()
+        await asyncio.sleep(completion_tokens / SETTINGS["tps"])
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": " ".join(words)}}],
+            "usage": usage_block(prompt_tokens, hit, completion_tokens),
+        }
+
+    stats["streams"] += 1
+    include_usage = (payload.get("stream_options") or {}).get("include_usage", False)
+
+    def chunk(delta, finish_reason=None):
+        return "data: " + json.dumps({
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }, ensure_ascii=False) + "\n\n"
+
+    async def events():
+        await first_token_delay()
+        yield chunk({"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            yield chunk({"content": word if i == 0 else " " + word})
+            await asyncio.sleep(1.0 / SETTINGS["tps"])
+        yield chunk({}, "stop")
+        if include_usage:
+            yield "data: " + json.dumps({"id": completion_id, "object": "chat.completion.chunk",
+                                         "model": model, "choices": [],
+                                         "usage": usage_block(prompt_tokens, hit, completion_tokens)}) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "settings": SETTINGS}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DeepSeek-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", type=float, default=SETTINGS["latency"], help="seconds to first token")
+    parser.add_argument("--jitter", type=float, default=SETTINGS["jitter"], help="latency jitter fraction")
+    parser.add_argument("--tps", type=float, default=SETTINGS["tps"], help="completion tokens per second")
+    parser.add_argument("--answer-tokens", type=int, default=SETTINGS["answer_tokens"])
+    parser.add_argument("--error-rate", type=float, default=SETTINGS["error_rate"], help="0..1")
+    parser.add_argument("--error-status", type=int, default=SETTINGS["error_status"])
+    args = parser.parse_args()
+    SETTINGS.update({key: getattr(args, key) for key in SETTINGS})
+    print(f"🧪 Mock DeepSeek on http://{args.host}:{args.port}/v1/chat/completions {SETTINGS}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,139 @@
+# offline_geocoder.py - District lookup from bundled boundary polygons
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_name(name: str) -> str:
+    """NFC-normalize a Bengali place name and drop a trailing 'জেলা' (district)"""
+    name = unicodedata.normalize("NFC", name or "").strip()
+    suffix = unicodedata.normalize("NFC", "জেলা")
+    if name.endswith(suffix):
+        name = name[: -len(suffix)].strip()
+    return name
+
+
+class DistrictBoundaryIndex:
+    """
+    Point-in-polygon district lookup over a GeoJSON FeatureCollection.
+    A uniform grid over the bounding box maps each cell to the polygons whose
+    bounding boxes overlap it, so a lookup only tests one or two polygons.
+    """
+
+    def __init__(self, features: List[dict], cell_deg: float = 0.1):
+        self.names: List[str] = []
+        self.divisions: List[str] = []
+        # per polygon: list of rings, each ring an (n, 2) array of lon/lat; first ring is the shell
+        self.polygons: List[List[np.ndarray]] = []
+        self.polygon_owner: List[int] = []
+
+        for feature in features:
+            props = feature.get("properties", {})
+            geometry = feature.get("geometry") or {}
+            owner = len(self.names)
+            self.names.append(props["name"])
+            self.divisions.append(props.get("division", ""))
+
+            if geometry.get("type") == "Polygon":
+                parts = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPolygon":
+                parts = geometry["coordinates"]
+            else:
+                continue
+            for rings in parts:
+                self.polygons.append([np.asarray(ring, dtype=np.float64)[:, :2] for ring in rings])
+                self.polygon_owner.append(owner)
+
+        bboxes = np.array([[p[0][:, 0].min(), p[0][:, 1].min(), p[0][:, 0].max(), p[0][:, 1].max()]
+                           for p in self.polygons])
+        self.bboxes = bboxes
+        self.cell_deg = cell_deg
+        self.min_lon, self.min_lat = bboxes[:, 0].min(), bboxes[:, 1].min()
+
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        for i, (x0, y0, x1, y1) in enumerate(bboxes):
+            c0, r0 = self._cell(x0, y0)
+            c1, r1 = self._cell(x1, y1)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    self.grid.setdefault((r, c), []).append(i)
+
+    @classmethod
+    def from_file(cls, path: str, cell_deg: float = 0.1) -> "DistrictBoundaryIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["features"], cell_deg=cell_deg)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def bounds(self, name: str) -> List[Tuple[float, float, float, float]]:
+        """(min_lon, min_lat, max_lon, max_lat) of each polygon of the named district"""
+        owners = {i for i, n in enumerate(self.names) if n == name}
+        return [tuple(self.bboxes[i]) for i, owner in enumerate(self.polygon_owner) if owner in owners]
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        return int((lon - self.min_lon) // self.cell_deg), int((lat - self.min_lat) // self.cell_deg)
+
+    def lookup(self, lat: float, lon: float) -> Optional[Tuple[str, str]]:
+        """(district, division) containing the point, or None"""
+        c, r = self._cell(lon, lat)
+        for i in self.grid.get((r, c), ()):
+            x0, y0, x1, y1 = self.bboxes[i]
+            if x0 <= lon <= x1 and y0 <= lat <= y1 and _in_polygon(self.polygons[i], lon, lat):
+                owner = self.polygon_owner[i]
+                return self.names[owner], self.divisions[owner]
+        return None
+
+
+def _in_polygon(rings: List[np.ndarray], x: float, y: float) -> bool:
+    """Even-odd rule over the shell and holes together"""
+    inside = False
+    for ring in rings:
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at_y = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        if np.count_nonzero(crosses & (x < x_at_y)) % 2:
+            inside = not inside
+    return inside
+
+
+class GeocodeMemo:
+    """Persistent memo of online reverse-geocoding answers keyed by rounded coordinates"""
+
+    def __init__(self, path: str, precision: int = 2):
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS geocode_memo (
+                    key TEXT PRIMARY KEY,
+                    district TEXT NOT NULL,     -- '' when the service had no district
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def key(self, lat: float, lon: float) -> str:
+        return f"{lat:.{self.precision}f}_{lon:.{self.precision}f}"
+
+    def get(self, lat: float, lon: float) -> Optional[str]:
+        """Memoized district name ('' for a known miss) or None if never looked up"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT district FROM geocode_memo WHERE key = ?", (self.key(lat, lon),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, lat: float, lon: float, district: Optional[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_memo (key, district, created_at) VALUES (?, ?, ?)",
+                (self.key(lat, lon), district or "", time.time()),
+            )
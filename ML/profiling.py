@@ -0,0 +1,177 @@
+# profiling.py - Run a single request under a profiler and return the profile instead of the payload
+import asyncio
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cprofile", "sample")
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every interval seconds from a helper thread
+    and counts identical stacks, giving folded output for flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def pstats_text(profile: cProfile.Profile, sort: str = "cumulative", lines: int = 60) -> str:
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).strip_dirs().sort_stats(sort).print_stats(lines)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles one HTTP request when asked with ?profile=cprofile|sample (or an
+    X-Profile header) and a matching X-Profile-Token. The route runs as usual,
+    streams included, but its body is discarded and the profile is returned:
+    pstats text for cprofile, folded stacks for sample. Both profilers watch the
+    event loop thread, so requests served concurrently show up too; one profile
+    runs at a time.
+    """
+
+    def __init__(self, app, token: str, output_dir: str = "", sample_interval: float = 0.005):
+        self.app = app
+        self.token = token.encode("utf-8")
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self._busy = asyncio.Lock()
+
+    def _requested_mode(self, scope) -> Tuple[Optional[str], bool]:
+        """(mode or None, token ok)"""
+        headers = dict(scope.get("headers") or [])
+        mode = headers.get(b"x-profile", b"").decode("latin-1")
+        if not mode and scope.get("query_string"):
+            mode = (parse_qs(scope["query_string"].decode("latin-1")).get("profile") or [""])[0]
+        if not mode:
+            return None, False
+        return mode, hmac.compare_digest(headers.get(b"x-profile-token", b""), self.token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode, authorized = self._requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if not authorized:
+            await self._reply(send, 403, b"profiling needs a valid X-Profile-Token\n")
+            return
+        if mode not in MODES:
+            await self._reply(send, 400, f"profile must be one of {', '.join(MODES)}\n".encode())
+            return
+        if self._busy.locked():
+            await self._reply(send, 409, b"another request is being profiled\n")
+            return
+
+        async with self._busy:
+            body, headers = await self._profile(scope, receive, mode)
+        await self._reply(send, 200, body, headers)
+
+    async def _profile(self, scope, receive, mode: str) -> Tuple[bytes, List[Tuple[bytes, bytes]]]:
+        status = {"code": 500, "bytes": 0}
+
+        async def discard(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                status["bytes"] += len(message.get("body", b""))
+
+        started = time.perf_counter()
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.disable()
+            body = pstats_text(profiler)
+        else:
+            sampler = StackSampler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                await asyncio.to_thread(sampler.stop)
+            body = sampler.folded()
+            samples = sampler.samples
+        elapsed = time.perf_counter() - started
+
+        headers = [
+            (b"x-profiled-status", str(status["code"]).encode()),
+            (b"x-profiled-bytes", str(status["bytes"]).encode()),
+            (b"x-profiled-seconds", f"{elapsed:.4f}".encode()),
+        ]
+        if mode == "sample":
+            headers.append((b"x-profile-samples", str(samples).encode()))
+        if self.output_dir:
+            path = await asyncio.to_thread(self._save, scope, mode, profiler if mode == "cprofile" else body)
+            headers.append((b"x-profile-file", path.encode("utf-8")))
+        logger.info("🔬 Profiled %s %s with %s in %.3fs", scope["method"], scope["path"], mode, elapsed,
+                    extra={"status": status["code"]})
+        return body.encode("utf-8"), headers
+
+    def _save(self, scope, mode: str, result) -> str:
+        """cprofile -> .prof (pstats / snakeviz), sample -> .folded (flamegraph.pl / speedscope)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        route = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"{now % 1:.3f}"[1:]
+        if mode == "cprofile":
+            path = os.path.join(self.output_dir, f"{stamp}_{route}.prof")
+            result.dump_stats(path)
+        else:
+            path = os.path.join(self.output_dir, f"{stamp}_{route}.folded")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(result)
+        return path
+
+    @staticmethod
+    async def _reply(send, status: int, body: bytes, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"text/plain; charset=utf-8"),
+                                (b"content-length", str(len(body)).encode())] + (headers or [])})
+        await send({"type": "http.response.body", "body": body})
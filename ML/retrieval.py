@@ -0,0 +1,118 @@
+# retrieval.py - Character n-gram TF-IDF retrieval over the chatbot knowledge base
+import hashlib
+import json
+import os
+import pickle
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# How much the question side (topic, answer key, patterns) counts against the answer text
+QUESTION_WEIGHT = 0.7
+ANSWER_WEIGHT = 0.3
+
+
+class AnswerRetriever:
+    """
+    Fuzzy question -> answer lookup over knowledge-base entries.
+    Each document is the weighted sum of two L2-normalised TF-IDF rows
+    (question side and answer text), so one sparse product scores them all.
+    """
+
+    def __init__(self, docs: List[dict], ngram_range=(1, 3)):
+        self.docs = docs
+        self.ngram_range = ngram_range
+        self.kinds = np.array([d["kind"] for d in docs])
+        self.topics = np.array([d["topic"] for d in docs])
+        vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=ngram_range,
+                                     sublinear_tf=True, lowercase=True)
+        vectorizer.fit([f"{d['question']} {d['answer']}" for d in docs])
+        matrix = (QUESTION_WEIGHT * vectorizer.transform([d["question"] for d in docs])
+                  + ANSWER_WEIGHT * vectorizer.transform([d["answer"] for d in docs]))
+        # Term-major CSR: a query only reads the rows of its own n-grams
+        self.term_matrix = matrix.T.tocsr()
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = vectorizer.idf_
+        self._analyzer = vectorizer.build_analyzer()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_analyzer"]  # a closure; rebuilt on load
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._analyzer = TfidfVectorizer(analyzer="char_wb", ngram_range=self.ngram_range,
+                                         lowercase=True).build_analyzer()
+
+    @staticmethod
+    def documents(data: dict) -> List[dict]:
+        """One document per topic answer and per fallback response in chatbot_knowledge.json"""
+        docs = []
+        for t in data["topics"]:
+            for key, answer in t["answers"].items():
+                docs.append({"kind": "topic", "topic": t["topic"], "key": key,
+                             "question": " ".join([t["topic"], key, *t["patterns"]]), "answer": answer})
+        for r in data["fallback"]["responses"]:
+            docs.append({"kind": "fallback", "topic": r["keyword"], "key": r["keyword"],
+                         "question": r["keyword"], "answer": r["answer"]})
+        return docs
+
+    def scores(self, question: str) -> np.ndarray:
+        """Cosine-style similarity of the question against every document"""
+        counts = Counter(g for g in self._analyzer(question) if g.strip() and g in self.vocabulary)
+        if not counts:
+            return np.zeros(len(self.docs))
+        terms = np.fromiter((self.vocabulary[g] for g in counts), dtype=np.int64, count=len(counts))
+        weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * self.idf[terms]
+        weights /= np.linalg.norm(weights)
+
+        # Sparse dot product without scipy slicing overhead: gather the
+        # nonzeros of the query's term rows and sum them per document
+        m = self.term_matrix
+        starts, ends = m.indptr[terms], m.indptr[terms + 1]
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(m.indices[offsets], weights=m.data[offsets] * np.repeat(weights, lengths),
+                           minlength=len(self.docs))
+
+    def search(self, question: str, k: int = 3, kind: Optional[str] = None,
+               topic: Optional[str] = None) -> List[Tuple[dict, float]]:
+        """Top-k (document, similarity), best first, optionally within one kind / topic"""
+        scores = self.scores(question)
+        if kind is not None:
+            scores = np.where(self.kinds == kind, scores, -1.0)
+        if topic is not None:
+            scores = np.where(self.topics == topic, scores, -1.0)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.docs[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def best(self, question: str, kind: Optional[str] = None,
+             topic: Optional[str] = None) -> Tuple[Optional[dict], float]:
+        hits = self.search(question, k=1, kind=kind, topic=topic)
+        return hits[0] if hits else (None, 0.0)
+
+    @classmethod
+    def load_or_build(cls, knowledge_path: str, cache_path: str) -> "AnswerRetriever":
+        """Reuse the pickled index while chatbot_knowledge.json is unchanged"""
+        with open(knowledge_path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "rb") as f:
+                    cached = pickle.load(f)
+                if cached.get("digest") == digest:
+                    return cached["retriever"]
+            except Exception:
+                pass
+
+        retriever = cls(cls.documents(json.loads(raw.decode("utf-8"))))
+        with open(cache_path, "wb") as f:
+            pickle.dump({"digest": digest, "retriever": retriever}, f)
+        return retriever
@@ -0,0 +1,62 @@
+# risk_raster.py - Precomputed zone / river-distance / elevation grid over Bangladesh
+import json
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Layer order in the stored (n_layers, rows, cols) float32 array
+LAYERS = ("zone_code", "river_km", "elevation_m")
+ZONE, RIVER_KM, ELEVATION = range(len(LAYERS))
+
+
+class RiskRaster:
+    """
+    Memory-mapped static risk layers. Row 0 is the southern edge, column 0
+    the western edge; cell (r, c) covers [south + r*res, south + (r+1)*res).
+    """
+
+    def __init__(self, data: np.ndarray, bbox: Tuple[float, float, float, float], res: float):
+        self.data = data
+        self.south, self.west, self.north, self.east = bbox
+        self.res = res
+        self.rows, self.cols = data.shape[1:]
+
+    @classmethod
+    def load(cls, path: str) -> "RiskRaster":
+        """Open <path> (.npy) with its <path minus .npy>.json metadata; nothing is read until used"""
+        with open(path[:-4] + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if tuple(meta["layers"]) != LAYERS:
+            raise ValueError(f"unexpected raster layers {meta['layers']}")
+        return cls(np.load(path, mmap_mode="r"), tuple(meta["bbox"]), meta["res"])
+
+    @staticmethod
+    def save(path: str, data: np.ndarray, bbox: Tuple[float, float, float, float], res: float):
+        np.save(path, data.astype(np.float32))
+        with open(path[:-4] + ".json", "w", encoding="utf-8") as f:
+            json.dump({"layers": list(LAYERS), "bbox": list(bbox), "res": res,
+                       "shape": list(data.shape)}, f)
+
+    def contains(self, lat: float, lon: float) -> bool:
+        return self.south <= lat < self.north and self.west <= lon < self.east
+
+    def cell(self, lat, lon):
+        """Grid indices for scalars or arrays, clipped to the raster"""
+        row = np.clip(((np.asarray(lat) - self.south) / self.res).astype(np.int64), 0, self.rows - 1)
+        col = np.clip(((np.asarray(lon) - self.west) / self.res).astype(np.int64), 0, self.cols - 1)
+        return row, col
+
+    def sample(self, lat: float, lon: float) -> Optional[np.ndarray]:
+        """All layers at one point, or None outside the raster"""
+        if not self.contains(lat, lon):
+            return None
+        row = min(int((lat - self.south) / self.res), self.rows - 1)
+        col = min(int((lon - self.west) / self.res), self.cols - 1)
+        return self.data[:, row, col]
+
+    def sample_many(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(layers (n_layers, n_points), inside mask) for arrays of points"""
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        inside = (lat >= self.south) & (lat < self.north) & (lon >= self.west) & (lon < self.east)
+        row, col = self.cell(lat, lon)
+        return np.asarray(self.data[:, row, col]), inside
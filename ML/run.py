@@ -1,15 +1,88 @@
 # run.py - Separate runner file
+#
+# Usage:
+#   python run.py                      # development: one process, auto-reload on code changes
+#   python run.py --prod               # production: gunicorn prefork, one worker per core
+#   python run.py --prod --workers 8 --host 0.0.0.0
+#
+# Production mode needs gunicorn (pip install gunicorn). The model and lookup
+# tables are loaded once in the parent and frozen out of the garbage collector
+# before forking, so workers share those pages copy-on-write.
+# Graceful restarts: kill -HUP <master pid> starts a fresh set of workers and then
+# gracefully stops all the old ones (the code is preloaded, so HUP does not pick
+# up code changes); kill -USR2 <master pid> starts a new master on fresh code,
+# then -TERM the old one.
+#
+# Periodic jobs (the /alldistricts snapshot, answer warm-up) run in one worker,
+# whichever holds the scheduler lease in the shared cache. /metrics, /cache/stats
+# and /llm/stats describe the worker that answered, not the whole server.
+import argparse
+import gc
+import os
+
 import uvicorn
 
-if __name__ == "__main__":
-    print("🚀 Starting JolBondhu API server...")
-    print("📡 API Documentation: http://127.0.0.1:8000/docs")
-    print("🌐 Frontend: http://localhost:3000")
-    
+
+def default_workers() -> int:
+    """Cores this process may run on (respects CPU affinity / container limits)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def run_dev(host: str, port: int):
     uvicorn.run(
         "index:app",
-        host="127.0.0.1",
-        port=8000,
+        host=host,
+        port=port,
         reload=True,
         log_level="info"
-    )
\ No newline at end of file
+    )
+
+
+def run_prod(host: str, port: int, workers: int, timeout: int):
+    from gunicorn.app.base import BaseApplication
+
+    import index
+
+    index.load_static_data()
+    # Keep the GC from writing to (and so un-sharing) the preloaded objects in every worker
+    gc.collect()
+    gc.freeze()
+
+    class JolBondhuServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("timeout", timeout)
+            self.cfg.set("graceful_timeout", timeout)
+            self.cfg.set("keepalive", 5)
+            # Recycle workers now and then so slow leaks can't build up
+            self.cfg.set("max_requests", 10000)
+            self.cfg.set("max_requests_jitter", 1000)
+
+        def load(self):
+            return index.app
+
+    print(f"🚀 Starting JolBondhu API with {workers} workers on http://{host}:{port}")
+    JolBondhuServer().run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JolBondhu API server")
+    parser.add_argument("--prod", action="store_true", help="prefork workers instead of the auto-reloading dev server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or default_workers())
+    parser.add_argument("--timeout", type=int, default=60, help="seconds before a stuck worker is restarted")
+    args = parser.parse_args()
+
+    if args.prod:
+        run_prod(args.host, args.port, args.workers, args.timeout)
+    else:
+        print("🚀 Starting JolBondhu API server...")
+        print(f"📡 API Documentation: http://{args.host}:{args.port}/docs")
+        print("🌐 Frontend: http://localhost:3000")
+        run_dev(args.host, args.port)
@@ -0,0 +1,162 @@
+# session_memory.py - Bounded per-session chat history for LLM prompts
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count without a tokenizer: about 4 UTF-8 bytes per token,
+    which puts Bengali (3 bytes per character) near 1.3 characters per token.
+    """
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+class Session:
+    __slots__ = ("turns", "summary", "tokens", "last_used")
+
+    def __init__(self):
+        # (question, answer, tokens) oldest first
+        self.turns: Deque[Tuple[str, str, int]] = deque()
+        # Earlier questions whose turns were dropped, oldest first
+        self.summary: Deque[Tuple[str, int]] = deque()
+        self.tokens = 0
+        self.last_used = time.time()
+
+
+class SessionMemory:
+    """
+    Recent chat turns per session_id, trimmed to a token budget.
+    Turns that no longer fit are reduced to their question and kept in a
+    short "earlier questions" summary, which is itself capped. Idle
+    sessions expire after ttl; the least recently used session is evicted
+    when there are too many sessions or too many tokens held overall.
+    """
+
+    def __init__(self, max_sessions: int = 5000, ttl: float = 3600.0, token_budget: int = 1500,
+                 summary_budget: int = 200, max_total_tokens: int = 2_000_000, max_question_chars: int = 200):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_total_tokens = max_total_tokens
+        self.max_question_chars = max_question_chars
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_tokens = 0
+
+        self.evictions = 0
+        self.expirations = 0
+        self.trimmed_turns = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def messages(self, session_id: str) -> List[Dict[str, str]]:
+        """Chat messages (summary first, then turns) to place before the new question"""
+        with self._lock:
+            session = self._live_locked(session_id)
+            if session is None:
+                return []
+            session.last_used = time.time()
+            self._sessions.move_to_end(session_id)
+            messages = []
+            if session.summary:
+                earlier = "; ".join(q for q, _ in session.summary)
+                messages.append({"role": "system", "content": f"Earlier questions from this farmer: {earlier}"})
+            for question, answer, _ in session.turns:
+                messages.append({"role": "user", "content": question})
+                messages.append({"role": "assistant", "content": answer})
+            return messages
+
+    def append(self, session_id: str, question: str, answer: str):
+        """Record a finished turn, then trim this session and the store"""
+        tokens = estimate_tokens(question) + estimate_tokens(answer)
+        with self._lock:
+            session = self._live_locked(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session()
+            session.turns.append((question, answer, tokens))
+            session.tokens += tokens
+            session.last_used = time.time()
+            self._total_tokens += tokens
+            self._sessions.move_to_end(session_id)
+            self._trim_session_locked(session)
+            self._enforce_limits_locked()
+
+    def clear(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._total_tokens -= session.tokens
+            return True
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge_expired_locked()
+
+    def _purge_expired_locked(self) -> int:
+        # Sessions are kept in last-used order, so expired ones sit at the front
+        cutoff = time.time() - self.ttl
+        count = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used > cutoff:
+                break
+            self._drop_locked(session_id)
+            count += 1
+        self.expirations += count
+        return count
+
+    def _live_locked(self, session_id: str):
+        session = self._sessions.get(session_id)
+        if session is not None and session.last_used <= time.time() - self.ttl:
+            self._drop_locked(session_id)
+            self.expirations += 1
+            session = None
+        return session
+
+    def _drop_locked(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._total_tokens -= session.tokens
+
+    def _trim_session_locked(self, session: Session):
+        # Always keep the newest turn, even if it alone is over budget
+        while len(session.turns) > 1 and session.tokens > self.token_budget:
+            question, _, tokens = session.turns.popleft()
+            session.tokens -= tokens
+            self._total_tokens -= tokens
+            self.trimmed_turns += 1
+
+            question = question[:self.max_question_chars]
+            q_tokens = estimate_tokens(question)
+            session.summary.append((question, q_tokens))
+            session.tokens += q_tokens
+            self._total_tokens += q_tokens
+            while session.summary and sum(t for _, t in session.summary) > self.summary_budget:
+                _, dropped = session.summary.popleft()
+                session.tokens -= dropped
+                self._total_tokens -= dropped
+
+    def _enforce_limits_locked(self):
+        self._purge_expired_locked()
+        while self._sessions and (len(self._sessions) > self.max_sessions
+                                  or self._total_tokens > self.max_total_tokens):
+            self._drop_locked(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": "session_memory",
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_s": self.ttl,
+            "tokens": self._total_tokens,
+            "max_total_tokens": self.max_total_tokens,
+            "token_budget": self.token_budget,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "trimmed_turns": self.trimmed_turns,
+        }
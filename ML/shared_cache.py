@@ -0,0 +1,235 @@
+# shared_cache.py - TTL cache in a SQLite (WAL) file shared by every worker process on the host
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple, Union
+
+_MISSING = object()
+
+
+class SharedCache:
+    """
+    One namespace of a cross-process cache. Values are JSON with a per-entry
+    expiry and optional tags. A miss is filled under a lease row, so only one
+    worker runs the loader for a key; the others poll until the value lands
+    or the lease runs out (a crashed owner), then try again themselves.
+    Every trim_every writes, expired entries are deleted and, with max_entries
+    set, the oldest entries beyond it. Each process opens its own connection.
+    """
+
+    def __init__(self, path: str, namespace: str, lease_s: float = 30.0,
+                 poll_s: Tuple[float, float] = (0.025, 0.25), max_entries: int = 0, trim_every: int = 100):
+        self.path = path
+        self.namespace = namespace
+        self.lease_s = lease_s
+        self.max_entries = max_entries  # 0: no cap
+        self.trim_every = trim_every
+        self._writes = 0
+        self.poll_min, self.poll_max = poll_s
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        # WAL: readers never block the writer; NORMAL sync is durable enough for a cache
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    ns TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,        -- JSON
+                    tags TEXT NOT NULL,         -- |tag|tag|, matched with instr()
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (ns, key)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_age ON cache_entries (ns, created_at)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_leases (
+                    ns TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (ns, key)
+                )
+            """)
+
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.lease_waits = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: str, default: Any = None, count: bool = True) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache_entries WHERE ns = ? AND key = ? AND expires_at > ?",
+                (self.namespace, key, time.time()),
+            ).fetchone()
+        if count:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        now = time.time()
+        tag_text = "|" + "|".join(tags) + "|" if tags else ""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (ns, key, value, tags, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), tag_text, now, now + ttl),
+            )
+            self._writes += 1
+            due = self._writes % self.trim_every == 0
+        if due:
+            self.trim()
+
+    def try_lease(self, key: str) -> bool:
+        """Take the fill lease for key unless another live owner holds it"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO cache_leases (ns, key, owner, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE cache_leases.expires_at <= ?",
+                (self.namespace, key, self.owner, now + self.lease_s, now),
+            )
+        return cursor.rowcount == 1
+
+    def hold_lease(self, key: str, lease_s: float) -> bool:
+        """Take key's lease or extend our own; elects the one worker that runs periodic jobs"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO cache_leases (ns, key, owner, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE cache_leases.expires_at <= ? OR cache_leases.owner = excluded.owner",
+                (self.namespace, key, self.owner, now + lease_s, now),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_leases WHERE ns = ? AND key = ? AND owner = ?",
+                               (self.namespace, key, self.owner))
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: Union[float, Callable[[Any], float]],
+                          tags: Iterable[str] = ()) -> Tuple[Any, bool]:
+        """
+        Return (value, from_cache). A miss runs the loader in at most one
+        process at a time; if the loader raises, the lease is dropped and
+        nothing is stored.
+        """
+        value = await asyncio.to_thread(self.get, key, _MISSING)
+        if value is not _MISSING:
+            return value, True
+        delay = self.poll_min
+        waited = False
+        while not await asyncio.to_thread(self.try_lease, key):
+            if not waited:
+                self.lease_waits += 1
+                waited = True
+            await asyncio.sleep(delay)
+            value = await asyncio.to_thread(self.get, key, _MISSING, False)
+            if value is not _MISSING:
+                return value, True
+            delay = min(delay * 2, self.poll_max)
+
+        try:
+            # Filled between our miss and taking the lease
+            value = await asyncio.to_thread(self.get, key, _MISSING, False)
+            if value is not _MISSING:
+                return value, True
+            value = await loader()
+            await asyncio.to_thread(self.set, key, value, ttl(value) if callable(ttl) else ttl, tags)
+            self.fills += 1
+            return value, False
+        finally:
+            await asyncio.to_thread(self.release, key)
+
+    def load_live(self, limit: int) -> List[Tuple[str, Any, float]]:
+        """Up to limit unexpired (key, value, expires_at), newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, expires_at FROM cache_entries WHERE ns = ? AND expires_at > ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (self.namespace, time.time(), limit),
+            ).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def invalidate(self, key: str) -> bool:
+        return self._delete("key = ?", (key,)) > 0
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        return self._delete("substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def invalidate_tag(self, tag: str) -> int:
+        return self._delete("instr(tags, ?) > 0", (f"|{tag}|",))
+
+    def clear(self) -> int:
+        return self._delete("1", ())
+
+    def prune(self) -> int:
+        """Delete expired entries and abandoned leases"""
+        now = time.time()
+        count = self._delete("expires_at <= ?", (now,))
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_leases WHERE ns = ? AND expires_at <= ?", (self.namespace, now))
+        self.expirations += count
+        return count
+
+    def trim(self) -> int:
+        """prune(), then evict the oldest entries over max_entries"""
+        removed = self.prune()
+        if self.max_entries:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache_entries WHERE ns = ? AND key IN ("
+                    "SELECT key FROM cache_entries WHERE ns = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries),
+                )
+            self.evictions += cursor.rowcount
+            removed += cursor.rowcount
+        return removed
+
+    def _delete(self, where: str, params: tuple) -> int:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM cache_entries WHERE ns = ? AND {where}",
+                                        (self.namespace, *params))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache_entries WHERE ns = ? AND expires_at > ?",
+                                      (self.namespace, time.time())).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters are this process's; size is the shared entry count (a query, so call it off the event loop)"""
+        hits, misses = self.hits, self.misses   # updated from worker threads
+        lookups = hits + misses
+        return {
+            "name": f"shared_{self.namespace}",
+            "path": self.path,
+            "size": len(self),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "fills": self.fills,
+            "lease_waits": self.lease_waits,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,58 @@
+# spatial.py - Haversine nearest-neighbour index over fixed point sets
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class HaversineIndex:
+    """
+    Ball tree over (lat, lon) points using great-circle distance.
+    Queries accept scalars or arrays and return distances in km.
+    """
+
+    def __init__(self, names: Sequence[str], lats: Sequence[float], lons: Sequence[float],
+                 items: Sequence[Any] = None):
+        self.names: List[str] = list(names)
+        self.items: List[Any] = list(items) if items is not None else [None] * len(self.names)
+        self.coords = np.column_stack([np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)])
+        self._tree = BallTree(np.radians(self.coords), metric="haversine")
+
+    @classmethod
+    def from_records(cls, records: Dict[str, Dict[str, Any]]) -> "HaversineIndex":
+        """Index a {name: {"lat": .., "lon": .., ...}} mapping"""
+        names = list(records)
+        return cls(names, [records[n]["lat"] for n in names], [records[n]["lon"] for n in names],
+                   [records[n] for n in names])
+
+    @classmethod
+    def from_list(cls, records: List[Dict[str, Any]], name_key: str = "name") -> "HaversineIndex":
+        """Index a list of dicts that each carry name/lat/lon"""
+        return cls([r[name_key] for r in records], [r["lat"] for r in records],
+                   [r["lon"] for r in records], records)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def query(self, lat, lon, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """(distances_km, indices), each shaped (n_points, k), nearest first"""
+        points = np.radians(np.column_stack([np.atleast_1d(lat), np.atleast_1d(lon)]).astype(np.float64))
+        dist, idx = self._tree.query(points, k=min(k, len(self.names)))
+        return dist * EARTH_RADIUS_KM, idx
+
+    def nearest(self, lat: float, lon: float) -> Tuple[str, Any, float]:
+        """(name, item, distance_km) of the closest point"""
+        dist, idx = self.query(lat, lon)
+        i = int(idx[0, 0])
+        return self.names[i], self.items[i], float(dist[0, 0])
+
+    def k_nearest(self, lat: float, lon: float, k: int) -> List[Tuple[str, Any, float]]:
+        dist, idx = self.query(lat, lon, k=k)
+        return [(self.names[i], self.items[i], float(d)) for i, d in zip(idx[0], dist[0])]
+
+    def nearest_names(self, lats, lons) -> List[str]:
+        """Closest point name for every query point in a batch"""
+        _, idx = self.query(lats, lons)
+        return [self.names[i] for i in idx[:, 0]]
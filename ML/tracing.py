@@ -0,0 +1,189 @@
+# tracing.py - Per-request timing spans, sent back as Server-Timing and optionally saved as a Chrome trace
+import asyncio
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar("request_trace", default=None)
+_request_ids = itertools.count(1)
+
+
+class RequestTrace:
+    """Spans recorded while serving one request, as (name, start offset s, duration s)"""
+
+    __slots__ = ("name", "wall", "started", "spans", "tid")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.tid = next(_request_ids)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Spans summed by name, in first-seen order, plus the time to the response headers"""
+        totals: Dict[str, List[float]] = {}
+        for name, _, duration in self.spans:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += duration
+            entry[1] += 1
+        parts = [f"{name};dur={seconds * 1000:.1f}" + (f';desc="{count} calls"' if count > 1 else "")
+                 for name, (seconds, count) in totals.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def chrome_events(self, duration: float) -> List[dict]:
+        """Complete ("X") events in the Chrome Trace Event Format, one row per request"""
+        pid = os.getpid()
+        base = self.wall * 1e6
+        events = [{"name": self.name, "cat": "request", "ph": "X", "ts": round(base),
+                   "dur": round(duration * 1e6), "pid": pid, "tid": self.tid}]
+        for name, offset, span_duration in self.spans:
+            events.append({"name": name, "cat": "span", "ph": "X", "ts": round(base + offset * 1e6),
+                           "dur": round(span_duration * 1e6), "pid": pid, "tid": self.tid})
+        return events
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block as a span of the current request; a no-op outside requests"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((name, started - trace.started, time.perf_counter() - started))
+
+
+def traced(name: str):
+    """Decorator form of span() for plain and async functions"""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def background_task(coro) -> asyncio.Task:
+    """
+    create_task() without the caller's context, so a job a request merely
+    started (a snapshot rebuild, a warm-up) records no spans into that request
+    """
+    return asyncio.get_running_loop().create_task(coro, context=contextvars.Context())
+
+
+class TraceFileWriter:
+    """
+    Appends trace events to a JSON array file from a background thread.
+    The closing bracket is left off, which chrome://tracing and Perfetto accept,
+    so the file stays loadable while the server keeps appending.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self.max_queue = max_queue
+        self._start()
+        # Prefork workers inherit the writer but not its thread
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, events: Sequence[dict]):
+        try:
+            self._queue.put_nowait(events)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            if f.tell() == 0:
+                f.write("[\n")
+            while True:
+                events = self._queue.get()
+                if events is None:
+                    break
+                try:
+                    f.write("".join(json.dumps(event, ensure_ascii=False) + ",\n" for event in events))
+                    if self._queue.empty():
+                        f.flush()
+                except Exception as e:
+                    logger.warning("⚠️ Trace write failed: %s", e)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware giving each HTTP request a RequestTrace. Spans finished before
+    the response starts go out in a Server-Timing header; with a writer, every
+    request (streams to their last byte) is also appended to the trace file.
+    """
+
+    def __init__(self, app, server_timing: bool = True, writer: Optional[TraceFileWriter] = None,
+                 timing_allow_origins: Sequence[str] = ()):
+        self.app = app
+        self.server_timing = server_timing
+        self.writer = writer
+        self.timing_allow_origin = ", ".join(timing_allow_origins).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.server_timing or self.writer):
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(f'{scope["method"]} {scope["path"]}')
+        token = _current.set(trace)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                if self.timing_allow_origin:
+                    headers.append((b"timing-allow-origin", self.timing_allow_origin))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if self.writer is not None:
+                route = scope.get("route")
+                if route is not None:
+                    trace.name = f'{scope["method"]} {route.path}'
+                self.writer.write(trace.chrome_events(trace.elapsed()))
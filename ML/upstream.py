@@ -0,0 +1,127 @@
+# upstream.py - Shared async HTTP clients for NASA POWER, Nominatim and DeepSeek
+import time
+from typing import Awaitable, Dict, Any, Optional
+
+import httpx
+
+from metrics import Histogram
+from tracing import span
+
+NASA_POWER_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+
+USER_AGENT = "jolbondhu_app"
+
+UPSTREAM_LATENCY = Histogram(
+    "jolbondhu_upstream_request_seconds",
+    "Upstream HTTP call latency (streams: until response headers)",
+    ["upstream", "call", "outcome"],
+)
+
+# One pooled client per upstream, so a stalled NASA POWER call can never
+# exhaust the connections that DeepSeek or Nominatim requests need.
+UPSTREAM_SETTINGS = {
+    "nasa": {"timeout": 30.0, "max_connections": 32, "max_keepalive": 16},
+    "nominatim": {"timeout": 5.0, "max_connections": 4, "max_keepalive": 2},
+    "deepseek": {"timeout": 60.0, "max_connections": 64, "max_keepalive": 16},
+}
+
+
+class UpstreamClient:
+    """Keep-alive connection pools for every external API the server calls"""
+
+    def __init__(self, settings: Optional[Dict[str, Dict[str, float]]] = None):
+        self.settings = settings or UPSTREAM_SETTINGS
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _client(self, name: str) -> httpx.AsyncClient:
+        # Created lazily so scripts that never hit startup still work
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            cfg = self.settings[name]
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(cfg["timeout"], connect=min(10.0, cfg["timeout"])),
+                limits=httpx.Limits(
+                    max_connections=int(cfg["max_connections"]),
+                    max_keepalive_connections=int(cfg["max_keepalive"]),
+                    keepalive_expiry=30.0,
+                ),
+                headers={"User-Agent": USER_AGENT},
+            )
+            self._clients[name] = client
+        return client
+
+    async def start(self):
+        """Open all connection pools"""
+        for name in self.settings:
+            self._client(name)
+
+    async def close(self):
+        """Close all connection pools"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+    async def _timed(self, upstream: str, call: str, request: Awaitable[httpx.Response]) -> httpx.Response:
+        """Await one upstream request, recording its latency and status (or error type)"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with span(upstream):
+                response = await request
+            outcome = str(response.status_code)
+            return response
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, upstream=upstream, call=call, outcome=outcome)
+
+    async def nasa_power_daily(self, lat: float, lon: float, start: str, end: str,
+                               parameters: str = "PRECTOTCORR,T2M,RH2M") -> Dict[str, Any]:
+        """Daily point data from NASA POWER (dates as YYYYMMDD)"""
+        request = self._client("nasa").get(NASA_POWER_URL, params={
+            "parameters": parameters,
+            "community": "ag",
+            "latitude": lat,
+            "longitude": lon,
+            "start": start,
+            "end": end,
+            "format": "JSON",
+        })
+        response = await self._timed("nasa_power", "daily_point", request)
+        return response.json()
+
+    async def nominatim_reverse(self, lat: float, lon: float, language: str = "bn") -> Dict[str, Any]:
+        """Reverse geocode a point with public Nominatim"""
+        request = self._client("nominatim").get(NOMINATIM_REVERSE_URL, params={
+            "lat": lat,
+            "lon": lon,
+            "format": "json",
+            "addressdetails": 1,
+            "accept-language": language,
+        })
+        response = await self._timed("nominatim", "reverse", request)
+        response.raise_for_status()
+        return response.json()
+
+    async def deepseek_chat(self, url: str, api_key: str, payload: Dict[str, Any]) -> httpx.Response:
+        """Non-streaming chat completion request"""
+        request = self._client("deepseek").post(url, headers=_auth_headers(api_key), json=payload)
+        return await self._timed("deepseek", "chat", request)
+
+    async def deepseek_stream(self, url: str, api_key: str, payload: Dict[str, Any]) -> httpx.Response:
+        """Open a streaming chat completion; the caller must aclose() the response"""
+        client = self._client("deepseek")
+        request = client.build_request("POST", url, headers=_auth_headers(api_key), json=payload)
+        return await self._timed("deepseek", "stream", client.send(request, stream=True))
+
+
+def _auth_headers(api_key: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+upstream = UpstreamClient()
@@ -0,0 +1,85 @@
+# weather_store.py - Persistent daily NASA POWER values per grid cell (SQLite)
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# (precipitation_mm, t2m, rh2m); any of them may be None if NASA had no value yet
+DailyValues = Tuple[Optional[float], Optional[float], Optional[float]]
+
+
+class WeatherStore:
+    """Daily PRECTOTCORR/T2M/RH2M values keyed by NASA POWER cell and date"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_weather (
+                    cell TEXT NOT NULL,
+                    day TEXT NOT NULL,          -- YYYYMMDD
+                    precip REAL,
+                    t2m REAL,
+                    rh2m REAL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (cell, day)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cell_checks (
+                    cell TEXT PRIMARY KEY,
+                    checked_at REAL NOT NULL
+                )
+            """)
+
+    def get_days(self, cell: str, start: str, end: str) -> Dict[str, DailyValues]:
+        """Stored days for a cell in [start, end], complete or not"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, precip, t2m, rh2m FROM daily_weather "
+                "WHERE cell = ? AND day BETWEEN ? AND ? ORDER BY day",
+                (cell, start, end),
+            ).fetchall()
+        return {day: (precip, t2m, rh2m) for day, precip, t2m, rh2m in rows}
+
+    def put_days(self, cell: str, days: Dict[str, DailyValues], checked_at: Optional[float] = None):
+        """Upsert fetched days and record when the cell was last checked"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO daily_weather (cell, day, precip, t2m, rh2m, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(cell, day, *values, now) for day, values in days.items()],
+            )
+            if checked_at is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cell_checks (cell, checked_at) VALUES (?, ?)",
+                    (cell, checked_at),
+                )
+
+    def last_checked(self, cell: str) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checked_at FROM cell_checks WHERE cell = ?", (cell,)
+            ).fetchone()
+        return row[0] if row else 0.0
+
+    def prune(self, before_day: str) -> int:
+        """Delete days older than before_day (YYYYMMDD)"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM daily_weather WHERE day < ?", (before_day,))
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def is_complete(values: DailyValues) -> bool:
+    return all(v is not None for v in values)
+
+
+def complete_days(days: Iterable[str], stored: Dict[str, DailyValues]) -> Dict[str, DailyValues]:
+    return {day: stored[day] for day in days if day in stored and is_complete(stored[day])}